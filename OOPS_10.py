@@ -27,13 +27,15 @@ class Customer:
         self.name = new_name
         self.address.edit_address(new_city, new_pin, new_state)
 
-# Create Address object
-add1 = Address('Gurgaon', 122011, 'Haryana')
+# Usage
+if __name__ == "__main__":
+    # Create Address object
+    add1 = Address('Gurgaon', 122011, 'Haryana')
 
-# Create Customer with Address
-cust = Customer('Nitish', 'male', add1)
-cust.print_address()  # Gurgaon, 122011, Haryana
+    # Create Customer with Address
+    cust = Customer('Nitish', 'male', add1)
+    cust.print_address()  # Gurgaon, 122011, Haryana
 
-# Edit through Customer
-cust.edit_profile('Ankit', 'Mumbai', 111111, 'Maharashtra')
-cust.print_address()  # Mumbai, 111111, Maharashtra
\ No newline at end of file
+    # Edit through Customer
+    cust.edit_profile('Ankit', 'Mumbai', 111111, 'Maharashtra')
+    cust.print_address()  # Mumbai, 111111, Maharashtra
\ No newline at end of file
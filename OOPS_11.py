@@ -1,12 +1,17 @@
+import os
+from contextlib import contextmanager, redirect_stdout
+
+from OOPS_17 import IdAllocator
+
+
 class Atm:
     """ATM system with encapsulation"""
-    __counter = 1
+    __counter = IdAllocator(start=1)  # Thread-safe customer id counter
     
     def __init__(self):
         self.pin = ''
         self.__balance = 0
-        self.cid = Atm.__counter
-        Atm.__counter += 1
+        self.cid = Atm.__counter.next_id()
     
     def get_balance(self):
         """Getter for private balance"""
@@ -58,11 +63,30 @@ class Atm:
     
     @staticmethod
     def get_counter():
-        return Atm.__counter
+        return Atm.__counter.peek()
+
+    @staticmethod
+    def set_counter_allocator(allocator):
+        """Replace the id allocator (e.g. a persistent one)"""
+        Atm.__counter = allocator
+
+    @staticmethod
+    def advance_counter(value):
+        """Never hand out ids below value (e.g. after recovering accounts)"""
+        Atm.__counter.advance(value)
+
+
+@contextmanager
+def quiet():
+    """Silences Atm's prints (for benchmarks that call it millions of times)"""
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+        yield
+
 
 # Usage
-atm1 = Atm()
-atm1.create_pin('1234', 1000)
-atm1.check_balance('1234')  # Your balance is: $1000
-atm1.withdraw('1234', 200)  # Withdrawal successful
-atm1.check_balance('1234')  # Your balance is: $800
\ No newline at end of file
+if __name__ == "__main__":
+    atm1 = Atm()
+    atm1.create_pin('1234', 1000)
+    atm1.check_balance('1234')  # Your balance is: $1000
+    atm1.withdraw('1234', 200)  # Withdrawal successful
+    atm1.check_balance('1234')  # Your balance is: $800
\ No newline at end of file
@@ -40,13 +40,14 @@ class Line:
         return numerator / denominator
 
 # Usage
-p1 = Point(1, 2)
-p2 = Point(4, 6)
-print(f"Point 1: {p1}")
-print(f"Point 2: {p2}")
-print(f"Distance: {p1.euclidean_distance(p2):.2f}")
+if __name__ == "__main__":
+    p1 = Point(1, 2)
+    p2 = Point(4, 6)
+    print(f"Point 1: {p1}")
+    print(f"Point 2: {p2}")
+    print(f"Distance: {p1.euclidean_distance(p2):.2f}")
 
-line = Line(1, 1, -3)  # x + y - 3 = 0
-print(f"Line: {line}")
-print(f"Point on line: {line.point_on_line(p1)}")
-print(f"Distance to line: {line.shortest_distance(p1):.2f}")
\ No newline at end of file
+    line = Line(1, 1, -3)  # x + y - 3 = 0
+    print(f"Line: {line}")
+    print(f"Point on line: {line.point_on_line(p1)}")
+    print(f"Distance to line: {line.shortest_distance(p1):.2f}")
\ No newline at end of file
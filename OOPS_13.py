@@ -0,0 +1,230 @@
+# ============================================================================
+# USER REGISTRY: LOOKING UP CHATBOOK USERS ACROSS THE SYSTEM
+# ============================================================================
+"""
+Every chatbook object (OOPS_3.py) only knows its own username/password, so one
+user can never find another. UserRegistry keeps all of them in one place:
+
+    username  --(hash index: dict)-->  user id  --(hash index: dict)-->  chatbook
+
+- Duplicate-signup check  : one dict lookup           -> O(1)
+- Sign in                 : two dict lookups + compare -> O(1)
+- Lookup by id            : one dict lookup           -> O(1)
+
+Ids are keys, not positions: they may arrive in any order and with gaps
+(per-thread id blocks, ids reserved for bulk imports - OOPS_17.py).
+
+The cost does not grow with the number of registered users.
+"""
+import json
+import resource
+import subprocess
+import sys
+import time
+
+from OOPS_3 import chatbook
+
+
+def resident_memory_mb():
+    """
+    Peak resident memory (RSS) of this process in megabytes.
+    Logic: ru_maxrss is reported in kilobytes on Linux.
+    """
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def measure_memory(script, kind, n):
+    """
+    Runs `script --measure kind n` in a fresh interpreter, so the peak
+    resident memory of one measurement does not hide the next.
+    Logic: Returns the JSON printed by serve_measure(); raises RuntimeError
+    with the child's last error line if it failed.
+    """
+    result = subprocess.run([sys.executable, script, "--measure", kind, str(n)],
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1:])
+    return json.loads(result.stdout)
+
+
+def serve_measure(build):
+    """
+    Child side of measure_memory(): when started as `--measure kind n`,
+    prints the resident memory growth of build(kind, n) as JSON and exits.
+    """
+    if len(sys.argv) == 4 and sys.argv[1] == "--measure":
+        kind, n = sys.argv[2], int(sys.argv[3])
+        before = resident_memory_mb()
+        built = build(kind, n)
+        after = resident_memory_mb()
+        print(json.dumps({"kind": kind, "n": n, "mb": after - before, "built": len(built)}))
+        sys.exit()
+
+
+class UserRegistry:
+    """
+    In-memory registry of chatbook users.
+    Logic:
+    - __ids maps username -> user id (hash index for O(1) lookups by name)
+    - __users maps user id -> chatbook record (hash index, any id order)
+    """
+
+    def __init__(self):
+        self.__ids = {}  # username -> user id
+        self.__users = {}  # user id -> chatbook record
+
+    def __len__(self):
+        return len(self.__ids)
+
+    def __contains__(self, username):
+        return username in self.__ids
+
+    def add(self, user):
+        """
+        Registers an existing chatbook object.
+        Logic:
+        - Rejects the user (returns False) if the username or the id is
+          already taken
+        """
+        if user.username in self.__ids or user.id in self.__users:
+            return False
+
+        self.__users[user.id] = user
+        self.__ids[user.username] = user.id
+        return True
+
+    def signup(self, username, password):
+        """
+        Creates and registers a new chatbook user without any input().
+        Logic: Returns the new user, or None if the username is already taken.
+        """
+        if username in self.__ids:
+            return None
+
+        user = chatbook()
+        user.username = username
+        user.password = password
+        self.add(user)
+        return user
+
+    def get(self, user_id):
+        """
+        Returns the user with the given id (or None).
+        Logic: One dict lookup by id.
+        """
+        return self.__users.get(user_id)
+
+    def find(self, username):
+        """
+        Returns the user registered under this username (or None).
+        Logic: dict lookup for the id, then dict lookup for the record.
+        """
+        user_id = self.__ids.get(username)
+        if user_id is None:
+            return None
+        return self.__users[user_id]
+
+    def signin(self, username, password):
+        """
+        Authenticates a user.
+        Logic:
+        - Finds the record through the hash index
+        - Compares the password and sets the loggedin flag on success
+        - Returns the signed-in user, or None for wrong credentials
+        """
+        user = self.find(username)
+        if user is None or user.password != password:
+            return None
+
+        user.loggedin = True
+        return user
+
+
+class RegisteredChatbook(chatbook):
+    """
+    chatbook session whose sign up / sign in go through a shared UserRegistry.
+    Logic:
+    - Sign up refuses usernames that are already registered by anyone
+    - Every sign up registers a fresh user record (the session is not the
+      record), so signing up again never renames an earlier user
+    - Sign in accepts any registered user, not just the one stored on this object
+    - After a sign up or sign in the session acts as that record: it takes
+      the record's id, username and password, so posts and messages are
+      attributed to the signed-in user
+    """
+    registry = UserRegistry()  # Shared by all sessions (class variable)
+
+    def __bind(self, user):
+        self.id = user.id
+        self.username = user.username
+        self.password = user.password
+
+    def signup(self):
+        email = self.ask("Enter your email here -> ")
+        pwd = self.ask("Setup your password here -> ")
+
+        if email in self.registry:
+            self.say("This email is already registered, please sign in instead")
+            return
+
+        user = self.registry.signup(email, pwd)
+        if user is None:  # registered by another session meanwhile
+            self.say("This email is already registered, please sign in instead")
+            return
+        self.__bind(user)
+        self.say("You have signed up successfully !!")
+
+    def signin(self):
+        if len(self.registry) == 0:
+            self.say("Please signup first by pressing 1 in the main menu")
+            return
+
+        uname = self.ask("Enter your email/username here -> ")
+        pwd = self.ask("Enter your password here -> ")
+
+        user = self.registry.signin(uname, pwd)
+        if user is not None:
+            self.__bind(user)
+            self.say("You have signed in successfully !!")
+            self.loggedin = True
+        else:
+            self.say("Please input correct credentials..")
+
+
+def benchmark(n=1_000_000):
+    """
+    Signs up and signs in n users and reports ops/sec and resident memory.
+    Logic: Both phases are timed separately; every sign in must succeed.
+    """
+    registry = UserRegistry()
+    usernames = [f"user{i}@chatbook.com" for i in range(n)]
+
+    start = time.perf_counter()
+    for name in usernames:
+        registry.signup(name, "secret")
+    signup_secs = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for name in usernames:
+        if registry.signin(name, "secret") is None:
+            raise AssertionError(f"sign in failed for {name}")
+    signin_secs = time.perf_counter() - start
+
+    # Duplicate signups must be rejected
+    assert registry.signup(usernames[0], "other") is None
+
+    print(f"users registered : {len(registry):,}")
+    print(f"signup           : {n / signup_secs:,.0f} ops/sec")
+    print(f"signin           : {n / signin_secs:,.0f} ops/sec")
+    print(f"resident memory  : {resident_memory_mb():,.1f} MB")
+
+
+if __name__ == "__main__":
+    registry = UserRegistry()
+    registry.signup("nitish@gmail.com", "1234")
+    print(registry.find("nitish@gmail.com").id)
+    print(registry.signin("nitish@gmail.com", "1234") is not None)  # True
+    print(registry.signin("nitish@gmail.com", "0000") is not None)  # False
+    print(registry.signup("nitish@gmail.com", "abcd"))  # None (duplicate)
+
+    benchmark()
@@ -0,0 +1,205 @@
+# ============================================================================
+# PASSWORD HASHING ON A PROCESS POOL
+# ============================================================================
+"""
+chatbook (OOPS_3.py) stores plaintext passwords and signs in with ==.
+Real password hashing (scrypt) is deliberately slow and CPU-bound, so running
+it on the main thread caps sign-in at a few hundred per second, and threads do
+not help because of the GIL. PasswordHasher runs hashing and verification in a
+ProcessPoolExecutor instead, so throughput scales with the number of cores.
+
+Stored format: "scrypt$<n>$<r>$<p>$<salt hex>$<hash hex>"
+- n (the cost parameter) is kept with each hash, so raising the cost later
+  does not break verification of old passwords.
+"""
+import asyncio
+import hashlib
+import hmac
+import os
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from OOPS_13 import UserRegistry
+
+DEFAULT_COST = 2**14  # scrypt n (CPU/memory cost), must be a power of two
+
+
+def hash_password(password, cost=DEFAULT_COST, salt=None):
+    """
+    Hashes a password with scrypt and a random 16-byte salt.
+    Logic: Module-level function so worker processes can unpickle it.
+    """
+    salt = os.urandom(16) if salt is None else salt
+    r, p = 8, 1
+    digest = hashlib.scrypt(password.encode(), salt=salt, n=cost, r=r, p=p,
+                            maxmem=256 * r * cost)
+    return f"scrypt${cost}${r}${p}${salt.hex()}${digest.hex()}"
+
+
+def verify_password(password, encoded):
+    """
+    Checks a password against a stored hash.
+    Logic:
+    - Re-hashes with the salt and cost stored in the hash
+    - Compares in constant time (hmac.compare_digest) to avoid timing leaks
+    """
+    try:
+        scheme, n, r, p, salt, digest = encoded.split("$")
+    except (AttributeError, ValueError):
+        return False
+    if scheme != "scrypt":
+        return False
+
+    n, r, p = int(n), int(r), int(p)
+    candidate = hashlib.scrypt(password.encode(), salt=bytes.fromhex(salt),
+                               n=n, r=r, p=p, maxmem=256 * r * n)
+    return hmac.compare_digest(candidate.hex(), digest)
+
+
+class PasswordHasher:
+    """
+    Hashing and verification service backed by a process pool.
+    Logic:
+    - hash()/verify() submit one job and hand back a concurrent.futures.Future
+    - hash_async()/verify_async() return awaitables for asyncio code
+    - hash_batch()/verify_batch() send jobs to the workers in chunks, which
+      saves one round trip per password on large batches
+    """
+
+    def __init__(self, workers=None, cost=DEFAULT_COST):
+        if cost < 2 or cost & (cost - 1):
+            raise ValueError("cost must be a power of two greater than 1")
+
+        self.cost = cost
+        self.workers = workers or os.cpu_count() or 1
+        self.__pool = ProcessPoolExecutor(max_workers=self.workers)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.__pool.shutdown()
+
+    def hash(self, password):
+        return self.__pool.submit(hash_password, password, self.cost)
+
+    def verify(self, password, encoded):
+        return self.__pool.submit(verify_password, password, encoded)
+
+    async def hash_async(self, password):
+        return await asyncio.wrap_future(self.hash(password))
+
+    async def verify_async(self, password, encoded):
+        return await asyncio.wrap_future(self.verify(password, encoded))
+
+    def hash_batch(self, passwords, chunksize=32):
+        """
+        Hashes many passwords; yields the hashes in input order.
+        """
+        passwords = list(passwords)
+        return self.__pool.map(hash_password, passwords,
+                               [self.cost] * len(passwords), chunksize=chunksize)
+
+    def verify_batch(self, passwords, hashes, chunksize=32):
+        """
+        Verifies many (password, hash) pairs; yields booleans in input order.
+        """
+        return self.__pool.map(verify_password, passwords, hashes, chunksize=chunksize)
+
+
+class HashedUserRegistry(UserRegistry):
+    """
+    UserRegistry that only ever stores scrypt hashes.
+    Logic:
+    - user.password holds the encoded hash, never the plaintext
+    - signin() keeps the blocking API of UserRegistry
+    - signin_future()/signin_async() return immediately so many sign ins can
+      be verified on the pool at the same time
+    """
+
+    def __init__(self, hasher):
+        super().__init__()
+        self.hasher = hasher
+
+    def signup(self, username, password):
+        if username in self:
+            return None
+        return super().signup(username, self.hasher.hash(password).result())
+
+    def signup_batch(self, credentials):
+        """
+        Signs up many (username, password) pairs, hashing them in parallel.
+        Logic: Returns the list of new users (None for taken usernames).
+        """
+        credentials = list(credentials)
+        hashes = self.hasher.hash_batch(pwd for _, pwd in credentials)
+        users = []
+        for (name, _), encoded in zip(credentials, hashes):
+            users.append(super().signup(name, encoded))
+        return users
+
+    def signin(self, username, password):
+        return self.signin_future(username, password).result()
+
+    def signin_future(self, username, password):
+        """
+        Starts a sign in; the Future resolves to the user or None.
+        """
+        result = Future()
+        user = self.find(username)
+        if user is None:
+            result.set_result(None)
+            return result
+
+        def finish(verified):
+            if verified.exception() is not None:
+                result.set_exception(verified.exception())
+            elif verified.result():
+                user.loggedin = True
+                result.set_result(user)
+            else:
+                result.set_result(None)
+
+        self.hasher.verify(password, user.password).add_done_callback(finish)
+        return result
+
+    async def signin_async(self, username, password):
+        return await asyncio.wrap_future(self.signin_future(username, password))
+
+
+def benchmark(n=2_000, cost=2**12):
+    """
+    Sign-in throughput on the main thread vs. on the process pool.
+    Logic: The pool is measured with 1 worker and with one worker per core.
+    """
+    credentials = [(f"user{i}@chatbook.com", f"pwd{i}") for i in range(n)]
+    hashes = [hash_password(pwd, cost) for _, pwd in credentials]
+
+    start = time.perf_counter()
+    assert all(verify_password(pwd, h) for (_, pwd), h in zip(credentials, hashes))
+    print(f"main thread     : {n / (time.perf_counter() - start):,.0f} signins/sec")
+
+    for workers in sorted({1, os.cpu_count() or 1}):
+        with PasswordHasher(workers=workers, cost=cost) as hasher:
+            registry = HashedUserRegistry(hasher)
+            registry.signup_batch(credentials)
+
+            start = time.perf_counter()
+            futures = [registry.signin_future(name, pwd) for name, pwd in credentials]
+            assert all(f.result() is not None for f in futures)
+            secs = time.perf_counter() - start
+        print(f"pool, {workers:>2} worker(s): {n / secs:,.0f} signins/sec")
+
+
+if __name__ == "__main__":
+    with PasswordHasher(workers=2) as hasher:
+        registry = HashedUserRegistry(hasher)
+        user = registry.signup("nitish@gmail.com", "1234")
+        print(user.password)  # scrypt$16384$8$1$<salt>$<hash>
+        print(registry.signin("nitish@gmail.com", "1234") is not None)  # True
+        print(asyncio.run(registry.signin_async("nitish@gmail.com", "0000")))  # None
+
+    benchmark()
@@ -0,0 +1,399 @@
+# ============================================================================
+# APPEND-ONLY POST LOG WITH MEMORY-MAPPED FEED READS
+# ============================================================================
+"""
+chatbook.my_post (OOPS_3.py) prints a post and throws it away. PostLog keeps
+every post on local disk in an append-only segment log:
+
+    posts/
+      00000000000000000001.log   <- segment (file name = id of its first post)
+      00000000000000000001.idx   <- sparse offset index of that segment
+      00000000000000052417.log   <- next segment, started once the previous
+      00000000000000052417.idx      one grew past segment_bytes
+
+Record layout (little endian, length-prefixed):
+    | text length (4) | post id (8) | user id (8) | timestamp (8) | text (utf-8) |
+
+- Appends only ever add bytes at the end of the active segment; a batch of
+  posts is written with a single write() call.
+- Reads go through mmap, so paging through a feed only decodes the records
+  that are actually returned - nothing else becomes a Python object.
+- The sparse index remembers (post id, timestamp, offset) roughly every
+  index_interval bytes. A seek bisects it (O(log n)) and then scans at most
+  index_interval bytes forward.
+"""
+import mmap
+import os
+import struct
+import time
+from bisect import bisect_left, bisect_right
+
+from OOPS_3 import chatbook
+
+RECORD = struct.Struct("<IQQd")  # text length, post id, user id, timestamp
+INDEX = struct.Struct("<Qdq")  # post id, timestamp, offset within the segment
+
+
+class PostLog:
+    """
+    Append-only, segmented log of chatbook posts.
+    Logic:
+    - Post ids are consecutive, starting at 1
+    - Timestamps never go backwards, so both ids and timestamps are sorted
+      and can be searched with bisect
+    - A torn record at the end of the last segment (crash in the middle of a
+      write) is cut off when the log is reopened
+    """
+
+    def __init__(self, directory, segment_bytes=64 * 1024 * 1024, index_interval=4096):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.index_interval = index_interval
+        os.makedirs(directory, exist_ok=True)
+
+        self.__segments = []  # file path (without extension) of every segment
+        self.__maps = {}  # segment number -> (mapped size, mmap)
+
+        # Sparse index, one entry per indexed record, across all segments
+        self.__index_ids = []
+        self.__index_times = []
+        self.__index_positions = []  # (segment number, offset)
+
+        self.__next_id = 1
+        self.__last_time = 0.0
+        self.__size = 0  # bytes in the active segment
+        self.__last_indexed = 0  # offset of the last indexed record in the active segment
+        self.__log = None
+        self.__idx = None
+
+        self.__load()
+
+    def __len__(self):
+        return self.__next_id - 1
+
+    # ------------------------------------------------------------------
+    # Opening an existing log
+    # ------------------------------------------------------------------
+
+    def __load(self):
+        names = sorted(f[:-4] for f in os.listdir(self.directory) if f.endswith(".log"))
+        for name in names:
+            self.__segments.append(os.path.join(self.directory, name))
+
+        for seg, base in enumerate(self.__segments):
+            last = seg == len(self.__segments) - 1
+            entries = self.__read_index(base + ".idx")
+            if not entries or last:
+                # The active segment may have records newer than its index
+                entries = self.__scan(seg, base, entries)
+            for post_id, ts, offset in entries:
+                self.__add_index_entry(post_id, ts, seg, offset)
+                self.__last_time = max(self.__last_time, ts)
+
+        if self.__segments:
+            self.__open_active()
+        else:
+            self.__roll()
+
+    @staticmethod
+    def __read_index(path):
+        if not os.path.exists(path):
+            return []
+        with open(path, "rb") as f:
+            data = f.read()
+        usable = len(data) - len(data) % INDEX.size
+        return list(INDEX.iter_unpack(data[:usable]))
+
+    def __scan(self, seg, base, entries):
+        """
+        Walks the records of one segment, starting at its last index entry.
+        Logic: Rebuilds missing index entries, finds the next post id and
+        truncates a partially written record at the end of the file.
+        """
+        entries = [e for e in entries if e[2] <= os.path.getsize(base + ".log")]
+        offset = entries[-1][2] if entries else 0
+        last_indexed = offset if entries else -self.index_interval
+
+        with open(base + ".log", "rb") as f:
+            data = f.read()
+
+        # The file name is the id of the segment's first post
+        self.__next_id = max(self.__next_id, int(os.path.basename(base)))
+        end = offset
+        while end + RECORD.size <= len(data):
+            length, post_id, _, ts = RECORD.unpack_from(data, end)
+            if end + RECORD.size + length > len(data):
+                break  # torn write
+            if end - last_indexed >= self.index_interval:
+                entries.append((post_id, ts, end))
+                last_indexed = end
+            self.__next_id = post_id + 1
+            self.__last_time = ts
+            end += RECORD.size + length
+
+        if end < len(data):
+            with open(base + ".log", "r+b") as f:
+                f.truncate(end)
+
+        # Rewrite the sidecar index so it matches the (possibly repaired) segment
+        with open(base + ".idx", "wb") as f:
+            f.write(b"".join(INDEX.pack(*e) for e in entries))
+
+        self.__size = end
+        self.__last_indexed = last_indexed
+        return entries
+
+    def __add_index_entry(self, post_id, ts, seg, offset):
+        self.__index_ids.append(post_id)
+        self.__index_times.append(ts)
+        self.__index_positions.append((seg, offset))
+
+    # ------------------------------------------------------------------
+    # Writing
+    # ------------------------------------------------------------------
+
+    def __open_active(self):
+        base = self.__segments[-1]
+        self.__log = open(base + ".log", "ab")
+        self.__idx = open(base + ".idx", "ab")
+
+    def __roll(self):
+        """
+        Seals the active segment and starts a new one named after the next id.
+        """
+        if self.__log is not None:
+            self.__log.close()
+            self.__idx.close()
+            # The sealed segment gets remapped at its final size on next read
+            self.__maps.pop(len(self.__segments) - 1, None)
+
+        self.__segments.append(os.path.join(self.directory, f"{self.__next_id:020d}"))
+        self.__size = 0
+        self.__last_indexed = -self.index_interval
+        self.__open_active()
+
+    def append(self, user_id, text, timestamp=None):
+        """
+        Appends one post and returns its post id.
+        """
+        return self.append_batch([(user_id, text, timestamp)])[0]
+
+    def append_batch(self, posts):
+        """
+        Appends many (user_id, text[, timestamp]) posts and returns their ids.
+        Logic:
+        - Records for the same segment are packed into one buffer and written
+          with a single write() call
+        - The segment is rolled between records once it reaches segment_bytes
+        """
+        ids = []
+        buf = bytearray()
+        index_buf = bytearray()
+
+        for post in posts:
+            user_id, text = post[0], post[1]
+            ts = post[2] if len(post) > 2 and post[2] is not None else time.time()
+            ts = max(ts, self.__last_time)  # keep timestamps sorted
+
+            if self.__size >= self.segment_bytes:
+                self.__write(buf, index_buf)
+                buf, index_buf = bytearray(), bytearray()
+                self.__roll()
+
+            payload = text.encode()
+            post_id = self.__next_id
+            offset = self.__size
+
+            if offset - self.__last_indexed >= self.index_interval:
+                index_buf += INDEX.pack(post_id, ts, offset)
+                self.__add_index_entry(post_id, ts, len(self.__segments) - 1, offset)
+                self.__last_indexed = offset
+
+            buf += RECORD.pack(len(payload), post_id, user_id, ts)
+            buf += payload
+
+            self.__size += RECORD.size + len(payload)
+            self.__next_id += 1
+            self.__last_time = ts
+            ids.append(post_id)
+
+        self.__write(buf, index_buf)
+        return ids
+
+    def __write(self, buf, index_buf):
+        if buf:
+            self.__log.write(buf)
+            self.__log.flush()
+        if index_buf:
+            self.__idx.write(index_buf)
+            self.__idx.flush()
+
+    # ------------------------------------------------------------------
+    # Reading
+    # ------------------------------------------------------------------
+
+    def __view(self, seg):
+        """
+        Returns an mmap of a segment, remapping the active one when it grew.
+        """
+        active = seg == len(self.__segments) - 1
+        size = self.__size if active else None
+
+        cached = self.__maps.get(seg)
+        if cached is not None and (size is None or cached[0] >= size):
+            return cached[1]
+
+        with open(self.__segments[seg] + ".log", "rb") as f:
+            length = size if size is not None else os.fstat(f.fileno()).st_size
+            if length == 0:
+                return b""
+            view = mmap.mmap(f.fileno(), length, access=mmap.ACCESS_READ)
+
+        self.__maps[seg] = (length, view)
+        return view
+
+    def __records(self, seg, offset):
+        """
+        Yields (post_id, user_id, timestamp, view, text offset, text length)
+        for every record from the given position to the end of the log.
+        """
+        while seg < len(self.__segments):
+            view = self.__view(seg)
+            end = len(view)
+            while offset + RECORD.size <= end:
+                length, post_id, user_id, ts = RECORD.unpack_from(view, offset)
+                yield post_id, user_id, ts, view, offset + RECORD.size, length
+                offset += RECORD.size + length
+            seg += 1
+            offset = 0
+
+    def __start(self, keys, key):
+        """
+        Position of the last indexed record whose key is <= key.
+        """
+        i = bisect_right(keys, key) - 1
+        return self.__index_positions[max(i, 0)] if self.__index_positions else (0, 0)
+
+    def feed(self, start_id=1, user_id=None):
+        """
+        Lazily yields (post_id, user_id, timestamp, text) from start_id onwards.
+        Logic:
+        - Seeks with the sparse index, then walks the mmapped segments
+        - Optional user_id filter skips other users' posts without decoding them
+        """
+        seg, offset = self.__start(self.__index_ids, start_id)
+        for post_id, author, ts, view, pos, length in self.__records(seg, offset):
+            if post_id < start_id or (user_id is not None and author != user_id):
+                continue
+            yield post_id, author, ts, view[pos:pos + length].decode()
+
+    def page(self, start_id=1, limit=50, user_id=None):
+        """
+        Returns one page of the feed as a list.
+        """
+        posts = []
+        for post in self.feed(start_id, user_id):
+            posts.append(post)
+            if len(posts) == limit:
+                break
+        return posts
+
+    def get(self, post_id):
+        """
+        Returns a single post (or None).
+        """
+        if not 1 <= post_id < self.__next_id:
+            return None
+        for post in self.feed(post_id):
+            return post
+        return None
+
+    def seek_time(self, timestamp):
+        """
+        Id of the first post written at or after timestamp (or None).
+        """
+        i = bisect_left(self.__index_times, timestamp) - 1
+        seg, offset = self.__index_positions[max(i, 0)] if self.__index_positions else (0, 0)
+        for post_id, _, ts, _, _, _ in self.__records(seg, offset):
+            if ts >= timestamp:
+                return post_id
+        return None
+
+    def since(self, timestamp, limit=50, user_id=None):
+        """
+        One page of posts written at or after timestamp.
+        """
+        post_id = self.seek_time(timestamp)
+        return [] if post_id is None else self.page(post_id, limit, user_id)
+
+    def close(self):
+        for _, view in self.__maps.values():
+            view.close()
+        self.__maps.clear()
+        self.__log.close()
+        self.__idx.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class PostLogMixin:
+    """
+    Cooperative mixin that stores every published post in a PostLog.
+    Logic: Appends to the log, then calls super().publish() so the rest of the
+    MRO (e.g. chatbook's confirmation message) still runs.
+    """
+    post_log = None  # Assign a PostLog (shared by all users of the class)
+
+    def publish(self, txt):
+        self.last_post_id = self.post_log.append(self.id, txt)
+        super().publish(txt)
+
+
+class LoggedChatbook(PostLogMixin, chatbook):
+    """chatbook whose posts are kept in a PostLog"""
+
+
+def benchmark(directory, n=1_000_000, batch=1_000):
+    """
+    Batched appends, then a full feed scan and random seeks.
+    """
+    import random
+    import shutil
+
+    shutil.rmtree(directory, ignore_errors=True)
+    with PostLog(directory, segment_bytes=16 * 1024 * 1024) as log:
+        start = time.perf_counter()
+        for first in range(0, n, batch):
+            log.append_batch([(i % 1000, f"post number {i}") for i in range(first, first + batch)])
+        secs = time.perf_counter() - start
+        print(f"append  : {n / secs:,.0f} posts/sec")
+
+        start = time.perf_counter()
+        count = sum(1 for _ in log.feed())
+        secs = time.perf_counter() - start
+        print(f"scan    : {count / secs:,.0f} posts/sec")
+
+        ids = [random.randint(1, n) for _ in range(10_000)]
+        start = time.perf_counter()
+        for post_id in ids:
+            assert log.get(post_id)[0] == post_id
+        secs = time.perf_counter() - start
+        print(f"seek    : {len(ids) / secs:,.0f} lookups/sec")
+    shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    import tempfile
+
+    LoggedChatbook.post_log = PostLog(os.path.join(tempfile.gettempdir(), "chatbook_posts"))
+    user = LoggedChatbook()
+    user.menu(["1", "nitish@gmail.com", "1234", "2", "nitish@gmail.com", "1234",
+               "3", "Hello Chatbook !!", "5"])
+    print(LoggedChatbook.post_log.get(user.last_post_id))
+    LoggedChatbook.post_log.close()
+
+    benchmark(os.path.join(tempfile.gettempdir(), "chatbook_posts_bench"))
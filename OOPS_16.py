@@ -0,0 +1,340 @@
+# ============================================================================
+# ASYNCIO MESSAGE DELIVERY FOR CHATBOOK.SENDMSG
+# ============================================================================
+"""
+chatbook.sendmsg (OOPS_3.py) only prints "message has been sent".
+DeliveryEngine actually delivers messages into per-recipient inboxes:
+
+    senders --send()--> [ bounded ingress queue ] --delivery task--> Inbox(frnd)
+                                                     (batches)          |
+                                                            async for msg in inbox
+
+- Backpressure: the ingress queue and every inbox are bounded. send()
+  reserves room in the recipient's inbox before queueing, so a sender to a
+  recipient that stops reading waits in send() - at most send_timeout
+  seconds, then TimeoutError tells it the message was not sent.
+- Isolation: room is reserved up front, so the delivery task never waits for
+  an inbox and never drops a message; one full inbox only holds up the
+  senders writing to it.
+- Coalescing: the delivery task takes everything already queued (up to
+  batch_size) in one go, groups it by recipient and writes each group to its
+  inbox with one extend() and one reader wake-up.
+- Reading is cheap: an inbox is a deque, and the async iterator only suspends
+  when the deque is empty.
+"""
+import asyncio
+import time
+from collections import defaultdict, deque
+
+from OOPS_3 import chatbook
+
+
+class Inbox:
+    """
+    Bounded inbox of one recipient.
+    Logic:
+    - Messages are (sender, text, timestamp) tuples kept in a deque
+    - __reserved counts messages accepted by send() but not delivered yet;
+      messages + reserved never exceed maxsize
+    - Readers wait on __readable, senders wait on __writable
+    - `async for msg in inbox` yields messages until the engine is closed
+      and the inbox is empty
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.__messages = deque()
+        self.__reserved = 0
+        self.__readable = asyncio.Event()
+        self.__writable = asyncio.Event()
+        self.__writable.set()
+        self.closed = False
+
+    def __len__(self):
+        return len(self.__messages)
+
+    def full(self):
+        """
+        True when stored plus reserved messages leave no room.
+        """
+        return len(self.__messages) + self.__reserved >= self.maxsize
+
+    async def _reserve(self):
+        """
+        Claims room for one message, waiting while the inbox is full.
+        """
+        while self.full():
+            self.__writable.clear()
+            await self.__writable.wait()
+        self.__reserved += 1
+
+    def _reserve_nowait(self):
+        if self.full():
+            raise asyncio.QueueFull
+        self.__reserved += 1
+
+    def _release(self):
+        """
+        Gives back a reservation whose message was never queued.
+        """
+        self.__reserved -= 1
+        self.__writable.set()
+
+    def _put_batch(self, batch):
+        """
+        Adds a batch of messages whose room send() reserved (never waits).
+        """
+        self.__reserved -= len(batch)
+        self.__messages.extend(batch)
+        self.__readable.set()
+
+    def _close(self):
+        self.closed = True
+        self.__readable.set()
+
+    def drain(self):
+        """
+        Takes every message currently in the inbox (without waiting).
+        """
+        messages = list(self.__messages)
+        self.__messages.clear()
+        self.__writable.set()
+        return messages
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        while not self.__messages:
+            if self.closed:
+                raise StopAsyncIteration
+            self.__readable.clear()
+            await self.__readable.wait()
+
+        message = self.__messages.popleft()
+        if not self.full():
+            self.__writable.set()
+        return message
+
+
+class DeliveryEngine:
+    """
+    Delivers chatbook messages into per-recipient inboxes.
+    Logic:
+    - send() puts (sender, recipient, text, timestamp) on the bounded ingress queue
+    - One delivery task moves queued messages into inboxes in batches
+    - send_timeout: seconds a sender waits for room (None: no limit)
+    - dropped counts messages still queued when close() timed out
+    - Must be started inside a running event loop (start() / async with)
+    """
+
+    def __init__(self, queue_size=10_000, inbox_size=10_000, batch_size=1_000,
+                 send_timeout=5.0):
+        self.inbox_size = inbox_size
+        self.batch_size = batch_size
+        self.send_timeout = send_timeout
+        self.delivered = 0
+        self.dropped = 0
+        self.closed = False
+        self.__queue_size = queue_size
+        self.__queue = None
+        self.__inboxes = {}
+        self.__task = None
+        self.__loop = None
+
+    async def __aenter__(self):
+        self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    def start(self):
+        self.__loop = asyncio.get_running_loop()
+        self.__queue = asyncio.Queue(self.__queue_size)
+        self.__task = asyncio.create_task(self.__deliver())
+
+    def inbox(self, recipient):
+        """
+        Returns (creating if needed) the inbox of a recipient.
+        """
+        box = self.__inboxes.get(recipient)
+        if box is None:
+            box = self.__inboxes[recipient] = Inbox(self.inbox_size)
+            if self.closed:
+                box._close()
+        return box
+
+    async def send(self, sender, recipient, text):
+        """
+        Queues a message; waits while the recipient's inbox or the ingress
+        queue is full (backpressure). Raises TimeoutError after send_timeout
+        seconds - the message is then not sent.
+        """
+        box = self.inbox(recipient)
+        if not box.full() and not self.__queue.full():
+            # Room everywhere: no timer needed
+            box._reserve_nowait()
+            self.__queue.put_nowait((sender, recipient, text, time.time()))
+            return
+        async with asyncio.timeout(self.send_timeout):
+            await box._reserve()
+            try:
+                await self.__queue.put((sender, recipient, text, time.time()))
+            except BaseException:
+                box._release()
+                raise
+
+    def send_nowait(self, sender, recipient, text):
+        """
+        Queues a message; raises asyncio.QueueFull instead of waiting.
+        """
+        box = self.inbox(recipient)
+        box._reserve_nowait()
+        try:
+            self.__queue.put_nowait((sender, recipient, text, time.time()))
+        except asyncio.QueueFull:
+            box._release()
+            raise
+
+    def send_threadsafe(self, sender, recipient, text):
+        """
+        Queues a message from another thread (e.g. the blocking chatbook menu).
+        Logic: Returns a concurrent.futures.Future that resolves once queued
+        (or fails with TimeoutError, see send()).
+        """
+        return asyncio.run_coroutine_threadsafe(self.send(sender, recipient, text), self.__loop)
+
+    async def __deliver(self):
+        queue = self.__queue
+        while True:
+            first = await queue.get()
+            if first is None:
+                break
+
+            # Coalesce everything that is already waiting into one batch
+            batch = [first]
+            stop = False
+            while len(batch) < self.batch_size and not queue.empty():
+                message = queue.get_nowait()
+                if message is None:
+                    stop = True
+                    break
+                batch.append(message)
+
+            groups = defaultdict(list)
+            for sender, recipient, text, ts in batch:
+                groups[recipient].append((sender, text, ts))
+            for recipient, messages in groups.items():
+                self.inbox(recipient)._put_batch(messages)
+
+            self.delivered += len(batch)
+            if stop:
+                break
+
+    async def __finish(self):
+        await self.__queue.put(None)
+        await self.__task
+
+    async def close(self, timeout=10.0):
+        """
+        Delivers everything still queued, then ends all inbox iterators.
+        Logic: If that takes longer than timeout seconds, the delivery task is
+        cancelled, messages still queued are counted as dropped and
+        TimeoutError is raised; the inboxes are closed either way.
+        """
+        try:
+            await asyncio.wait_for(self.__finish(), timeout)
+        except TimeoutError:
+            self.__task.cancel()
+            while not self.__queue.empty():
+                if self.__queue.get_nowait() is not None:
+                    self.dropped += 1
+            raise
+        finally:
+            self.closed = True
+            for box in self.__inboxes.values():
+                box._close()
+
+
+class InboxMixin:
+    """
+    Cooperative mixin that hands sent messages to a DeliveryEngine.
+    Logic: The menu is blocking code, so the message is queued thread-safely
+    on the engine's event loop before super().deliver() confirms it; a
+    message that could not be queued is reported instead of confirmed.
+    """
+    delivery = None  # Assign a running DeliveryEngine
+
+    def deliver(self, frnd, txt):
+        try:
+            self.delivery.send_threadsafe(self.username, frnd, txt).result()
+        except (TimeoutError, asyncio.QueueFull):
+            self.say(f"{frnd}'s inbox is full, your message was not sent")
+            return
+        super().deliver(frnd, txt)
+
+
+class MessagingChatbook(InboxMixin, chatbook):
+    """chatbook whose direct messages are delivered to real inboxes"""
+
+
+async def benchmark(senders=1_000, messages_per_sender=200, recipients=100):
+    """
+    Many concurrent senders, one reader task per recipient inbox.
+    Logic:
+    - Reports delivered messages/sec from the first send to the last read
+    - Then fills the inbox of an "offline" recipient nobody reads: sending to
+      it times out (the message is reported as not sent) while a send to
+      somebody else still goes through right away
+    """
+    total = senders * messages_per_sender
+    received = 0
+
+    async def sender(i):
+        for j in range(messages_per_sender):
+            await engine.send(i, (i + j) % recipients, "hello")
+
+    async def reader(recipient):
+        nonlocal received
+        async for _ in engine.inbox(recipient):
+            received += 1
+
+    async with DeliveryEngine() as engine:
+        readers = [asyncio.create_task(reader(r)) for r in range(recipients)]
+        start = time.perf_counter()
+        await asyncio.gather(*(sender(i) for i in range(senders)))
+    await asyncio.gather(*readers)
+    secs = time.perf_counter() - start
+
+    assert received == total == engine.delivered
+    print(f"delivered : {total:,} messages from {senders:,} senders")
+    print(f"throughput: {total / secs:,.0f} messages/sec")
+
+    async with DeliveryEngine(inbox_size=100, send_timeout=0.05) as engine:
+        for _ in range(100):
+            await engine.send("nitish", "offline", "hello")
+        t0 = time.perf_counter()
+        try:
+            await engine.send("nitish", "offline", "hello")
+            refused = False
+        except TimeoutError:
+            refused = True
+        waited = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        await engine.send("nitish", "online", "hello")
+        other = time.perf_counter() - t0
+    assert refused
+    print(f"full inbox: send refused after {waited * 1000:.0f} ms, "
+          f"send to another recipient {other * 1e6:.0f} us")
+
+if __name__ == "__main__":
+    async def demo():
+        async with DeliveryEngine() as engine:
+            await engine.send("nitish@gmail.com", "ankit@gmail.com", "Hi Ankit !!")
+            await engine.send("rahul@gmail.com", "ankit@gmail.com", "Hello")
+        async for sender, text, _ in engine.inbox("ankit@gmail.com"):
+            print(f"{sender} -> {text}")
+
+    asyncio.run(demo())
+    asyncio.run(benchmark())
@@ -0,0 +1,179 @@
+# ============================================================================
+# THREAD-SAFE BLOCK-ALLOCATING ID GENERATOR
+# ============================================================================
+"""
+chatbook (OOPS_3.py) and Atm (OOPS_11.py) used to hand out ids with
+
+    self.id = chatbook.__user_id
+    chatbook.__user_id += 1
+
+Two threads can read the same value before either writes it back, so both
+objects get the same id. Wrapping it in one global lock fixes that but makes
+every constructor in every thread wait on the same lock.
+
+IdAllocator hands each thread a whole block of ids instead:
+
+    thread 1:  [1 .. 1024]      thread 2:  [1025 .. 2048]     thread 1: [2049 ..
+
+- Taking the next id from the thread's own block needs no lock at all
+- The lock is only taken once per block_size ids, to reserve the next block
+- With a path, the end of the last reserved block (the high-water mark) is
+  written to disk, so after a restart no id is ever handed out twice
+  (unused ids of the last blocks are simply skipped)
+"""
+import os
+import threading
+import time
+
+
+class _Block(threading.local):
+    """Per-thread block of reserved ids: next <= id < end"""
+    next = 0
+    end = 0
+    generation = -1
+
+
+class IdAllocator:
+    """
+    Hands out unique, increasing-per-thread integer ids.
+    Logic:
+    - next_id() is lock-free while the calling thread's block lasts
+    - peek() returns the id the calling thread will get next
+    - reset() restarts numbering (invalidates every thread's block)
+    """
+
+    def __init__(self, start=1, block_size=1024, path=None):
+        self.block_size = block_size
+        self.path = path
+        self.__lock = threading.Lock()
+        self.__block = _Block()
+        self.__generation = 0
+        self.__next_block = max(start, self.__load())
+
+    def __load(self):
+        """
+        Reads the persisted high-water mark (0 if there is none).
+        """
+        if self.path is None or not os.path.exists(self.path):
+            return 0
+        with open(self.path) as f:
+            return int(f.read().strip() or 0)
+
+    def __save(self, high_water_mark):
+        """
+        Atomically replaces the persisted high-water mark.
+        """
+        if self.path is None:
+            return
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            f.write(str(high_water_mark))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+
+    def next_id(self):
+        block = self.__block
+        if block.generation == self.__generation and block.next < block.end:
+            new_id = block.next
+            block.next = new_id + 1
+            return new_id
+        return self.__refill(block)
+
+    def __refill(self, block):
+        """
+        Reserves a fresh block for the calling thread and returns its first id.
+        """
+        with self.__lock:
+            start = self.__next_block
+            self.__next_block = start + self.block_size
+            self.__save(self.__next_block)
+            block.generation = self.__generation
+
+        block.next = start + 1
+        block.end = start + self.block_size
+        return start
+
+    def reserve(self, count):
+        """
+        Reserves count consecutive ids in one step (for bulk creation).
+        Logic: Returns a range; the ids never overlap with any thread's block.
+        """
+        with self.__lock:
+            start = self.__next_block
+            self.__next_block = start + count
+            self.__save(self.__next_block)
+        return range(start, start + count)
+
+    def peek(self):
+        block = self.__block
+        if block.generation == self.__generation and block.next < block.end:
+            return block.next
+        return self.__next_block
+
+    def advance(self, value):
+        """
+        Makes sure no id below value is handed out from now on (e.g. after
+        ids were recovered from elsewhere); never moves numbering back.
+        """
+        with self.__lock:
+            if self.__next_block < value:
+                self.__next_block = value
+                self.__generation += 1  # blocks below value are dropped
+                self.__save(value)
+
+    def reset(self, value):
+        with self.__lock:
+            self.__next_block = value
+            self.__generation += 1
+            self.__save(value)
+
+
+def benchmark(threads=8, per_thread=100_000):
+    """
+    Creates chatbook and Atm objects from many threads at once.
+    Logic: Checks that every id is unique and reports objects/sec.
+    """
+    from OOPS_3 import chatbook
+    from OOPS_11 import Atm
+
+    for cls, attr in ((chatbook, "id"), (Atm, "cid")):
+        ids = [None] * threads
+
+        def work(t):
+            ids[t] = [getattr(cls(), attr) for _ in range(per_thread)]
+
+        workers = [threading.Thread(target=work, args=(t,)) for t in range(threads)]
+        start = time.perf_counter()
+        for w in workers:
+            w.start()
+        for w in workers:
+            w.join()
+        secs = time.perf_counter() - start
+
+        all_ids = [i for chunk in ids for i in chunk]
+        assert len(set(all_ids)) == len(all_ids), "duplicate ids handed out"
+        print(f"{cls.__name__:<8}: {len(all_ids):,} unique ids, "
+              f"{len(all_ids) / secs:,.0f} objects/sec over {threads} threads")
+
+    allocator = IdAllocator()
+    start = time.perf_counter()
+    for _ in range(1_000_000):
+        allocator.next_id()
+    print(f"next_id : {1_000_000 / (time.perf_counter() - start):,.0f} ids/sec (one thread)")
+
+
+if __name__ == "__main__":
+    import tempfile
+
+    path = os.path.join(tempfile.gettempdir(), "chatbook_ids")
+    if os.path.exists(path):
+        os.remove(path)
+
+    ids = IdAllocator(path=path, block_size=100)
+    print(ids.next_id(), ids.next_id(), ids.peek())  # 1 2 3
+
+    restarted = IdAllocator(path=path, block_size=100)  # e.g. after a restart
+    print(restarted.next_id())  # 101 - never reuses 1..100
+
+    benchmark()
@@ -0,0 +1,330 @@
+# ============================================================================
+# TIMELINE CACHE WITH LRU EVICTION FOR CHATBOOK FEEDS
+# ============================================================================
+"""
+A user's home timeline = the newest posts of everyone they follow.
+Building it from scratch on every read gets slower the more people a user
+follows, so TimelineService keeps built timelines instead of rebuilding them.
+
+Two ways to keep timelines up to date (pick one with `strategy`):
+
+FAN-OUT-ON-WRITE ("write")
+    post() pushes the new post id into the stored home timeline of every
+    follower. Reads are a copy of an already-built list, but a post by a user
+    with a million followers costs a million updates. Every user's timeline
+    is stored, so memory grows with users x timeline_length; the LRU cache is
+    not used (nothing could be evicted without losing the timeline).
+
+FAN-OUT-ON-READ ("read")
+    post() only records the post under its author. A read merges the recent
+    posts of everyone the reader follows (heapq.merge). Posting is O(1), reads
+    cost O(followees) on a cache miss. Hot timelines are kept in an LRU cache
+    bounded by cache_bytes, and a cached timeline is updated incrementally
+    when someone it follows posts (the new id is pushed onto the front), so a
+    cached read never has to be rebuilt just because of a new post.
+
+Post ids come from PostLog (OOPS_15.py) and only ever grow, so "newest first"
+is simply "largest id first".
+"""
+import heapq
+import itertools
+import random
+import sys
+import time
+from collections import OrderedDict, defaultdict, deque
+
+from OOPS_3 import chatbook
+from OOPS_15 import PostLogMixin
+
+
+def timeline_bytes(timeline):
+    """
+    Approximate memory of a cached timeline (container + one int per post).
+    """
+    return sys.getsizeof(timeline) + 32 * len(timeline)
+
+
+class LRUCache:
+    """
+    Least-recently-used cache bounded by total (estimated) bytes.
+    Logic:
+    - OrderedDict keeps keys from least to most recently used
+    - get() moves a key to the most-recent end
+    - put() evicts from the least-recent end until the cache fits max_bytes
+    - hits/misses/evictions/evicted_bytes are kept as statistics
+    """
+
+    def __init__(self, max_bytes, sizeof=timeline_bytes):
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.evicted_bytes = 0
+        self.__entries = OrderedDict()  # key -> [value, size]
+
+    def __len__(self):
+        return len(self.__entries)
+
+    def __contains__(self, key):
+        return key in self.__entries
+
+    def get(self, key):
+        entry = self.__entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.__entries.move_to_end(key)
+        return entry[0]
+
+    def peek(self, key):
+        """
+        Returns a value without counting a hit or changing its recency.
+        """
+        entry = self.__entries.get(key)
+        return None if entry is None else entry[0]
+
+    def put(self, key, value):
+        old = self.__entries.pop(key, None)
+        if old is not None:
+            self.bytes -= old[1]
+
+        size = self.sizeof(value)
+        self.__entries[key] = [value, size]
+        self.bytes += size
+        self.__evict()
+
+    def resize(self, key):
+        """
+        Re-measures a value that was changed in place.
+        """
+        entry = self.__entries.get(key)
+        if entry is not None:
+            size = self.sizeof(entry[0])
+            self.bytes += size - entry[1]
+            entry[1] = size
+            self.__evict()
+
+    def discard(self, key):
+        entry = self.__entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry[1]
+
+    def __evict(self):
+        while self.bytes > self.max_bytes and self.__entries:
+            _, (_, size) = self.__entries.popitem(last=False)
+            self.bytes -= size
+            self.evictions += 1
+            self.evicted_bytes += size
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.__entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "evicted_bytes": self.evicted_bytes,
+        }
+
+
+class TimelineService:
+    """
+    Home timelines for chatbook users.
+    Logic:
+    - __following / __followers keep the follow graph in both directions
+    - __authored keeps the newest timeline_length post ids of every author
+    - __homes (fan-out-on-write only) keeps every user's built home timeline
+    - cache (fan-out-on-read only, else None) holds hot timelines as deques,
+      newest post first
+    """
+
+    def __init__(self, strategy="write", cache_bytes=64 * 1024 * 1024, timeline_length=100):
+        if strategy not in ("write", "read"):
+            raise ValueError("strategy must be 'write' or 'read'")
+
+        self.strategy = strategy
+        self.timeline_length = timeline_length
+        self.cache = LRUCache(cache_bytes) if strategy == "read" else None
+        self.__following = defaultdict(set)
+        self.__followers = defaultdict(set)
+        self.__authored = defaultdict(lambda: deque(maxlen=timeline_length))
+        self.__homes = defaultdict(lambda: deque(maxlen=timeline_length))
+
+    def follow(self, follower, followee):
+        if followee in self.__following[follower]:
+            return
+        self.__following[follower].add(followee)
+        self.__followers[followee].add(follower)
+        self.__rebuild(follower)
+
+    def unfollow(self, follower, followee):
+        if followee not in self.__following[follower]:
+            return
+        self.__following[follower].discard(followee)
+        self.__followers[followee].discard(follower)
+        self.__rebuild(follower)
+
+    def __rebuild(self, user):
+        """
+        The set of followed authors changed: the home timeline has to be rebuilt.
+        """
+        if self.strategy == "write":
+            self.__homes[user] = self.__merge(user)
+        else:
+            self.cache.discard(user)
+
+    def post(self, author, post_id):
+        """
+        Records a new post and updates the affected timelines incrementally.
+        """
+        self.__authored[author].appendleft(post_id)
+
+        if self.strategy == "write":
+            homes = self.__homes
+            for follower in self.__followers.get(author, ()):
+                homes[follower].appendleft(post_id)
+        else:
+            cache = self.cache
+            for follower in self.__followers.get(author, ()):
+                cached = cache.peek(follower)
+                if cached is not None:
+                    cached.appendleft(post_id)
+                    cache.resize(follower)
+
+    def __merge(self, user):
+        """
+        Builds a home timeline from the authored posts of everyone followed.
+        """
+        sources = [self.__authored[a] for a in self.__following.get(user, ())
+                   if a in self.__authored]
+        newest = heapq.merge(*sources, reverse=True)
+        return deque(itertools.islice(newest, self.timeline_length), maxlen=self.timeline_length)
+
+    def home(self, user, limit=20):
+        """
+        Returns the newest `limit` post ids of a user's home timeline.
+        """
+        if self.strategy == "write":
+            timeline = self.__homes[user]
+        else:
+            timeline = self.cache.get(user)
+            if timeline is None:
+                timeline = self.__merge(user)
+                self.cache.put(user, timeline)
+        return list(itertools.islice(timeline, limit))
+
+    def timeline_bytes(self):
+        """
+        Estimated memory of all kept home timelines.
+        """
+        if self.strategy == "write":
+            return sum(timeline_bytes(t) for t in self.__homes.values())
+        return self.cache.bytes
+
+
+class TimelineMixin:
+    """
+    Cooperative mixin that feeds new posts into a TimelineService.
+    Logic: Must come before PostLogMixin in the MRO - super().publish() stores
+    the post first, then the new post id is fanned out.
+    """
+    timelines = None  # Assign a TimelineService
+
+    def publish(self, txt):
+        super().publish(txt)
+        self.timelines.post(self.id, self.last_post_id)
+
+    def home(self, limit=20):
+        return self.timelines.home(self.id, limit)
+
+
+class TimelineChatbook(TimelineMixin, PostLogMixin, chatbook):
+    """chatbook with stored posts and cached home timelines"""
+
+
+def _percentile(samples, pct):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * pct / 100))]
+
+
+def benchmark(users=20_000, follows_per_user=20, posts=50_000, reads=100_000, seed=7):
+    """
+    Compares fan-out-on-write and fan-out-on-read for two follower distributions.
+    Logic:
+    - "uniform": everyone is equally likely to be followed
+    - "power-law": a few celebrities collect most followers (Zipf-like)
+    - Every user is equally likely to post, so both distributions cost the same
+      number of fan-out updates on average - only their spread differs
+    - Reports throughput and p50/p99 latency of posts and reads, the memory of
+      the kept timelines, plus cache stats for fan-out-on-read
+    """
+    rng = random.Random(seed)
+    population = range(users)
+    zipf = list(itertools.accumulate(1 / (rank + 1) ** 1.1 for rank in population))
+    distributions = {"uniform": None, "power-law": zipf}
+
+    # Readers are skewed in both cases: a hot set of users reads most often
+    readers = rng.choices(population, cum_weights=zipf, k=reads)
+
+    for distribution, cum_weights in distributions.items():
+        edges = set()
+        for follower in population:
+            for followee in rng.choices(population, cum_weights=cum_weights, k=follows_per_user):
+                if followee != follower:
+                    edges.add((follower, followee))
+        authors = rng.choices(population, k=posts)
+
+        for strategy in ("write", "read"):
+            service = TimelineService(strategy, cache_bytes=4 * 1024 * 1024)
+            for follower, followee in edges:
+                service.follow(follower, followee)
+
+            # Warm the cache, then interleave posts with reads
+            for user in readers[:reads // 10]:
+                service.home(user)
+
+            clock = time.perf_counter_ns
+            post_ns, read_ns = [], []
+            per_post = max(1, reads // posts)
+            for post_id, author in enumerate(authors, 1):
+                t0 = clock()
+                service.post(author, post_id)
+                post_ns.append(clock() - t0)
+                start = post_id * per_post % reads
+                for user in readers[start:start + per_post]:
+                    t0 = clock()
+                    service.home(user)
+                    read_ns.append(clock() - t0)
+
+            if service.cache is None:
+                cached = "all timelines stored"
+            else:
+                stats = service.cache.stats()
+                cached = f"hit ratio {stats['hit_ratio']:.2f} evictions {stats['evictions']:,}"
+            print(f"{distribution:<9} fan-out-on-{strategy:<5}: "
+                  f"posts {1e9 * len(post_ns) / sum(post_ns):>9,.0f}/sec "
+                  f"p99 {_percentile(post_ns, 99) / 1000:8.1f} us | "
+                  f"reads {1e9 * len(read_ns) / sum(read_ns):>9,.0f}/sec "
+                  f"p50 {_percentile(read_ns, 50) / 1000:5.1f} us "
+                  f"p99 {_percentile(read_ns, 99) / 1000:6.1f} us | "
+                  f"{service.timeline_bytes() / 2**20:5.1f} MB, {cached}")
+
+
+if __name__ == "__main__":
+    service = TimelineService("read")
+    service.follow("ankit", "nitish")
+    service.follow("ankit", "rahul")
+    service.post("nitish", 1)
+    service.post("rahul", 2)
+    print(service.home("ankit"))  # [2, 1]
+    service.post("nitish", 3)  # cached timeline is updated in place
+    print(service.home("ankit"))  # [3, 2, 1]
+    print(service.cache.stats())
+
+    benchmark()
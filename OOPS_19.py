@@ -0,0 +1,215 @@
+# ============================================================================
+# STREAMING BULK USER IMPORT FOR CHATBOOK
+# ============================================================================
+"""
+The only way to create a chatbook user (OOPS_3.py) is the interactive
+signup(), which asks for the email and password with input(). BulkImporter
+loads partner accounts from a CSV or JSONL file instead:
+
+    file --read_rows()--> rows --chunked()--> chunks --import_chunk()--> UserRegistry
+         (one row at a     (chunk_size rows    (validate, dedupe, reserve
+          time)             at a time)          a block of ids, register)
+
+- Every stage is a generator, so only one chunk of rows is in memory at a
+  time, however large the file is
+- Ids are reserved from the chatbook counter once per chunk
+  (chatbook.reserve_ids), not once per user
+- Expected columns/keys: email (or username), password, optional name
+"""
+import csv
+import json
+import os
+import re
+import time
+from itertools import islice
+
+from OOPS_3 import chatbook
+from OOPS_13 import UserRegistry, resident_memory_mb
+
+EMAIL = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+
+
+def read_rows(source, fmt=None):
+    """
+    Lazily yields one dict per row of a CSV or JSONL file.
+    Logic:
+    - source is a path or an open text file
+    - fmt is "csv" or "jsonl"; by default it is taken from the file extension
+    - A JSONL line that is not valid JSON yields None (counted as a malformed
+      record later), so one bad line does not abort the import
+    """
+    if isinstance(source, (str, os.PathLike)):
+        fmt = fmt or os.path.splitext(source)[1].lstrip(".").lower()
+        with open(source, newline="", encoding="utf-8") as f:
+            yield from read_rows(f, fmt)
+        return
+
+    if fmt == "csv":
+        yield from csv.DictReader(source)
+    elif fmt in ("jsonl", "ndjson"):
+        for line in source:
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                yield None
+    else:
+        raise ValueError(f"unsupported import format: {fmt!r}")
+
+
+def chunked(rows, size):
+    """
+    Groups an iterable into lists of at most size items.
+    """
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class BulkImporter:
+    """
+    Imports users into a UserRegistry without any input().
+    Logic:
+    - Invalid rows (bad email, empty password, malformed record) are counted
+      and skipped; the first max_errors of them are kept with a reason
+    - Duplicates are skipped, both against the registry and within the file
+    - rows/imported/invalid/duplicates counters accumulate over runs
+    """
+
+    def __init__(self, registry, chunk_size=10_000, max_errors=100):
+        self.registry = registry
+        self.chunk_size = chunk_size
+        self.max_errors = max_errors
+        self.errors = []  # (row number, reason)
+        self.rows = 0
+        self.imported = 0
+        self.invalid = 0
+        self.duplicates = 0
+
+    def __reject(self, row_number, reason):
+        self.invalid += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append((row_number, reason))
+
+    def __validate(self, chunk, first_row):
+        """
+        Returns the valid, not-yet-registered (email, password, name) records.
+        """
+        valid = []
+        seen = set()
+        for row_number, row in enumerate(chunk, first_row):
+            try:
+                email = (row.get("email") or row.get("username") or "").strip()
+                password = row.get("password") or ""
+                name = row.get("name")
+            except AttributeError:
+                self.__reject(row_number, "malformed record")
+                continue
+
+            if not EMAIL.match(email):
+                self.__reject(row_number, f"invalid email {email!r}")
+            elif not password:
+                self.__reject(row_number, "empty password")
+            elif email in seen or email in self.registry:
+                self.duplicates += 1
+            else:
+                seen.add(email)
+                valid.append((email, password, name))
+        return valid
+
+    def import_chunk(self, chunk, first_row=1):
+        """
+        Validates, dedupes and registers one chunk of rows.
+        """
+        self.rows += len(chunk)
+        valid = self.__validate(chunk, first_row)
+
+        for user_id, (email, password, name) in zip(chatbook.reserve_ids(len(valid)), valid):
+            user = chatbook(user_id=user_id)
+            user.username = email
+            user.password = password
+            if name:
+                user.set_name(name)
+            self.registry.add(user)
+
+        self.imported += len(valid)
+        return len(valid)
+
+    def run(self, source, fmt=None, progress=None):
+        """
+        Streams a whole file through the pipeline and returns a report.
+        Logic: progress (optional) is called with the report after every chunk.
+        """
+        start = time.perf_counter()
+        first_row = 1
+        for chunk in chunked(read_rows(source, fmt), self.chunk_size):
+            self.import_chunk(chunk, first_row)
+            first_row += len(chunk)
+            if progress is not None:
+                progress(self.report(time.perf_counter() - start))
+        return self.report(time.perf_counter() - start)
+
+    def report(self, seconds):
+        return {
+            "rows": self.rows,
+            "imported": self.imported,
+            "invalid": self.invalid,
+            "duplicates": self.duplicates,
+            "seconds": round(seconds, 3),
+            "rows_per_sec": round(self.rows / seconds) if seconds else 0,
+        }
+
+
+def write_sample(path, n):
+    """
+    Streams n generated accounts (with a few bad and duplicate rows) to a file.
+    """
+    jsonl = path.endswith(".jsonl")
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = None if jsonl else csv.writer(f)
+        if writer:
+            writer.writerow(["email", "password", "name"])
+        for i in range(n):
+            email = f"user{i}@partner.com" if i % 1000 else f"user{i - 1}@partner.com"
+            if i % 5000 == 1:
+                email = "not-an-email"
+            if jsonl:
+                f.write(json.dumps({"email": email, "password": f"pwd{i}", "name": f"User {i}"}) + "\n")
+            else:
+                writer.writerow([email, f"pwd{i}", f"User {i}"])
+
+
+def benchmark(n=1_000_000):
+    """
+    Imports n generated accounts from CSV and from JSONL.
+    """
+    import tempfile
+
+    for ext in ("csv", "jsonl"):
+        path = os.path.join(tempfile.gettempdir(), f"chatbook_import.{ext}")
+        write_sample(path, n)
+        report = BulkImporter(UserRegistry()).run(path)
+        os.remove(path)
+        print(f"{ext:<5}: {report}")
+    print(f"resident memory: {resident_memory_mb():,.1f} MB")
+
+
+if __name__ == "__main__":
+    import io
+
+    registry = UserRegistry()
+    importer = BulkImporter(registry)
+    sample = io.StringIO("email,password,name\n"
+                         "nitish@gmail.com,1234,Nitish\n"
+                         "ankit@gmail.com,abcd,Ankit\n"
+                         "nitish@gmail.com,5678,Nitish again\n"
+                         "broken-email,0000,Nobody\n")
+    print(importer.run(sample, fmt="csv"))
+    print(importer.errors)  # [(4, "invalid email 'broken-email'")]
+    print(registry.find("ankit@gmail.com").get_name())  # Ankit
+
+    benchmark()
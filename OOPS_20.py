@@ -0,0 +1,218 @@
+# ============================================================================
+# SESSION TOKEN STORE WITH TIMING-WHEEL EXPIRY
+# ============================================================================
+"""
+chatbook.loggedin (OOPS_3.py) is a bool on one object: another process can't
+check it, and it never expires. SessionStore issues random session tokens
+instead and checks them against a hash table:
+
+    __sessions:  token -> (user id, expiry tick)          check() = 1 dict lookup
+
+Expiry uses a timing wheel instead of scanning every session:
+
+    wheel (one slot per tick, ttl/tick + 1 slots, used as a ring)
+    +-----+-----+-----+-----+-----+-----+
+    | t0  | t1  | t2  | ... |     |     |   slot = expiry tick % number of slots
+    +-----+-----+-----+-----+-----+-----+
+       ^ current tick: when the clock moves past a slot, only the tokens in
+         that slot are looked at and removed
+
+- Work per tick is proportional to the sessions that expire in that tick,
+  not to the number of live sessions
+- refresh() (sliding expiry) just puts the token in a later slot; the stale
+  entry in the old slot is skipped when that slot comes round
+- max_sessions bounds memory: when full, the sessions closest to expiry are
+  dropped first
+"""
+import secrets
+import time
+
+from OOPS_3 import chatbook
+from OOPS_13 import resident_memory_mb
+
+
+class SessionStore:
+    """
+    Issues, checks and expires chatbook session tokens.
+    Logic:
+    - ttl and tick are in seconds; expiry is accurate to one tick
+    - clock is injectable (time.monotonic by default) so tests can move time
+    """
+
+    def __init__(self, ttl=1800, tick=1.0, max_sessions=None, clock=time.monotonic):
+        self.ttl = ttl
+        self.tick = tick
+        self.max_sessions = max_sessions
+        self.clock = clock
+        self.expired = 0
+
+        self.__sessions = {}  # token -> (user id, expiry tick)
+        self.__wheel = [[] for _ in range(int(ttl / tick) + 2)]
+        self.__ttl_ticks = int(ttl / tick) + 1
+        self.__now = int(clock() / tick)  # current tick
+
+    def __len__(self):
+        return len(self.__sessions)
+
+    def advance(self):
+        """
+        Moves the wheel up to the current time and expires due sessions.
+        Logic: After a long idle period at most one full turn of the wheel is
+        processed, because every live session sits somewhere on it.
+        """
+        target = int(self.clock() / self.tick)
+        if target <= self.__now:
+            return
+
+        slots = len(self.__wheel)
+        steps = min(target - self.__now, slots)
+        for step in range(1, steps + 1):
+            self.__expire_slot((self.__now + step) % slots, target)
+        self.__now = target
+
+    def __expire_slot(self, slot, now):
+        bucket = self.__wheel[slot]
+        sessions = self.__sessions
+        for token in bucket:
+            entry = sessions.get(token)
+            # Skip tokens that were revoked or refreshed into a later slot
+            if entry is not None and entry[1] <= now:
+                del sessions[token]
+                self.expired += 1
+        bucket.clear()
+
+    def __schedule(self, token, user_id):
+        expires = self.__now + self.__ttl_ticks
+        self.__sessions[token] = (user_id, expires)
+        self.__wheel[expires % len(self.__wheel)].append(token)
+
+    def issue(self, user_id):
+        """
+        Starts a session and returns its token.
+        """
+        self.advance()
+        if self.max_sessions is not None and len(self.__sessions) >= self.max_sessions:
+            self.__evict_oldest()
+
+        token = secrets.token_urlsafe(16)
+        self.__schedule(token, user_id)
+        return token
+
+    def __evict_oldest(self):
+        """
+        Drops the sessions of the slots closest to expiry until there is room.
+        """
+        slots = len(self.__wheel)
+        for step in range(1, slots + 1):
+            self.__expire_slot((self.__now + step) % slots, self.__now + step)
+            if len(self.__sessions) < self.max_sessions:
+                return
+
+    def check(self, token):
+        """
+        Returns the user id of a live session, or None.
+        """
+        entry = self.__sessions.get(token)
+        if entry is None:
+            return None
+        self.advance()
+        if entry[1] <= self.__now:
+            return None
+        return entry[0]
+
+    def refresh(self, token):
+        """
+        Extends a live session by a full ttl (sliding expiry).
+        """
+        user_id = self.check(token)
+        if user_id is None:
+            return False
+        self.__schedule(token, user_id)
+        return True
+
+    def revoke(self, token):
+        return self.__sessions.pop(token, None) is not None
+
+
+class SessionMixin:
+    """
+    Cooperative mixin that replaces the loggedin flag with a session token.
+    Logic:
+    - A successful signin() issues a token; the flag itself is reset
+    - is_authorized() (used by my_post and sendmsg) checks the token
+    """
+    sessions = None  # Assign a SessionStore
+    token = None
+
+    def signin(self):
+        super().signin()
+        if self.loggedin:
+            self.token = self.sessions.issue(self.id)
+            self.loggedin = False  # The token is the only proof of login now
+
+    def is_authorized(self):
+        return self.token is not None and self.sessions.check(self.token) == self.id
+
+    def logout(self):
+        if self.token is not None:
+            self.sessions.revoke(self.token)
+            self.token = None
+
+
+class SessionChatbook(SessionMixin, chatbook):
+    """chatbook that authorizes posts and messages with session tokens"""
+
+
+def benchmark(n=1_000_000, ttl=600):
+    """
+    Issues n sessions, checks them all, then lets them expire tick by tick.
+    Logic: A fake clock drives the store so expiry runs without waiting;
+    run with n=10_000_000 for the full-size test.
+    """
+    now = [0.0]
+    store = SessionStore(ttl=ttl, tick=1.0, clock=lambda: now[0])
+    base_memory = resident_memory_mb()
+
+    # Sessions arrive evenly over one ttl
+    tokens = []
+    start = time.perf_counter()
+    for i in range(n):
+        now[0] = i * ttl / n
+        tokens.append(store.issue(i))
+    secs = time.perf_counter() - start
+    print(f"issue  : {n / secs:,.0f} sessions/sec")
+    print(f"memory : {(resident_memory_mb() - base_memory) * 1024 * 1024 / n:,.0f} bytes/session "
+          f"({len(store):,} live)")
+
+    start = time.perf_counter()
+    for i, token in enumerate(tokens):
+        if store.check(token) != i:
+            raise AssertionError("live session not found")
+    secs = time.perf_counter() - start
+    print(f"check  : {n / secs:,.0f} checks/sec")
+
+    # Move time forward one tick at a time and time each expiry step
+    worst = 0.0
+    start = time.perf_counter()
+    for second in range(ttl, 2 * ttl + 2):
+        now[0] = second
+        t0 = time.perf_counter()
+        store.advance()
+        worst = max(worst, time.perf_counter() - t0)
+    secs = time.perf_counter() - start
+    assert len(store) == 0
+    print(f"expire : {store.expired:,} sessions in {secs:.2f}s, "
+          f"worst tick {worst * 1000:.2f} ms (~{n // ttl:,} expiries/tick)")
+
+
+if __name__ == "__main__":
+    now = [0.0]
+    SessionChatbook.sessions = SessionStore(ttl=60, clock=lambda: now[0])
+    user = SessionChatbook()
+    user.menu(["1", "nitish@gmail.com", "1234", "2", "nitish@gmail.com", "1234",
+               "3", "Hello !!", "5"])  # post allowed - token is live
+
+    now[0] = 120  # two minutes later the session has expired
+    user.menu(["3", "5"])  # You need to signin first to post something...
+
+    benchmark()
@@ -0,0 +1,460 @@
+# ============================================================================
+# INVERTED-INDEX FULL-TEXT SEARCH OVER CHATBOOK POSTS
+# ============================================================================
+"""
+SearchIndex makes the text of chatbook posts (OOPS_15.py PostLog) searchable:
+
+    "Hello Chatbook !!"  --tokenize-->  hello(0) chatbook(1)
+    inverted index:      term -> posting list of (post id, tf, positions)
+
+Posting lists are compressed: post ids and positions are stored as the
+difference to the previous one (delta encoding), and every number is written
+as a varint (7 bits per byte, high bit = "more bytes follow"), so small gaps
+take a single byte.
+
+    post ids 1000, 1003, 1010  ->  deltas 1000, 3, 7  ->  bytes e8 07 03 07
+
+Segments
+- New posts go into the small, mutable active segment (incremental updates)
+- Every segment_docs posts the active segment is sealed (never changes again)
+- A background thread merges sealed segments once there are more than
+  max_segments of them, so a query never has to visit many segments.
+  Segments cover increasing post id ranges, so merging posting lists is a
+  concatenation - only the first delta of each appended list is re-encoded.
+
+Queries
+- hello chatbook          -> AND (every term must appear)
+- hello OR chatbook       -> OR  (any term may appear)
+- "hello chatbook"        -> phrase (terms next to each other, in order)
+- Ranked with BM25, best k picked with a heap (heapq.nlargest)
+- Sealed segments never change, so their decoded posting lists go into one
+  LRU cache (OOPS_18.py) bounded by cache_bytes; the compressed lists stay
+  the storage, and only hot terms are kept decoded
+- AND queries start from the rarest term and only look up the surviving post
+  ids in the other lists, so the work follows the rarest term, not the corpus
+"""
+import heapq
+import itertools
+from bisect import bisect_right
+import math
+import random
+import re
+import sys
+import threading
+import time
+
+from OOPS_3 import chatbook
+from OOPS_15 import PostLogMixin
+from OOPS_18 import LRUCache
+
+TOKEN = re.compile(r"\w+")
+QUERY = re.compile(r'"([^"]*)"|(\S+)')
+
+
+def tokenize(text):
+    return TOKEN.findall(text.lower())
+
+
+def put_varint(buf, n):
+    while n >= 0x80:
+        buf.append((n & 0x7F) | 0x80)
+        n >>= 7
+    buf.append(n)
+
+
+def get_varint(data, pos):
+    """
+    Decodes one varint; returns (value, position after it).
+    """
+    result = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+
+def decode_postings(data):
+    """
+    Yields (post id, term frequency, positions) from an encoded posting list.
+    """
+    pos = doc = 0
+    end = len(data)
+    while pos < end:
+        delta, pos = get_varint(data, pos)
+        doc += delta
+        tf, pos = get_varint(data, pos)
+        positions = []
+        last = 0
+        for _ in range(tf):
+            gap, pos = get_varint(data, pos)
+            last += gap
+            positions.append(last)
+        yield doc, tf, positions
+
+
+def decoded_bytes(found):
+    """
+    Approximate memory of a decoded posting list (dict + tuple + positions list).
+    """
+    return sys.getsizeof(found) + sum(120 + 8 * tf for tf, _ in found.values())
+
+
+class Segment:
+    """
+    One piece of the index.
+    Logic:
+    - postings: term -> bytearray (delta + varint encoded)
+    - last_doc: term -> newest post id in its posting list (for the next delta)
+    - doc_lengths: post id -> number of tokens (needed by BM25)
+    - sealed: set once the segment never changes again
+    - Post ids must be added in increasing order (deltas are never negative)
+    """
+
+    def __init__(self):
+        self.postings = {}
+        self.last_doc = {}
+        self.doc_lengths = {}
+        self.total_length = 0
+        self.sealed = False
+
+    def __len__(self):
+        return len(self.doc_lengths)
+
+    def add(self, post_id, tokens):
+        positions = {}
+        for i, term in enumerate(tokens):
+            positions.setdefault(term, []).append(i)
+
+        for term, where in positions.items():
+            buf = self.postings.get(term)
+            if buf is None:
+                buf = self.postings[term] = bytearray()
+            put_varint(buf, post_id - self.last_doc.get(term, 0))
+            put_varint(buf, len(where))
+            last = 0
+            for p in where:
+                put_varint(buf, p - last)
+                last = p
+            self.last_doc[term] = post_id
+
+        self.doc_lengths[post_id] = len(tokens)
+        self.total_length += len(tokens)
+
+    def matches(self, term):
+        """
+        post id -> (tf, positions) for one term in this segment.
+        """
+        data = self.postings.get(term)
+        if data is None:
+            return {}
+        return {doc: (tf, positions) for doc, tf, positions in decode_postings(data)}
+
+    @staticmethod
+    def merge(segments):
+        """
+        Concatenates segments (given in post id order) into a new one.
+        """
+        merged = Segment()
+        for seg in segments:
+            for term, data in seg.postings.items():
+                buf = merged.postings.get(term)
+                if buf is None:
+                    merged.postings[term] = bytearray(data)
+                else:
+                    # Only the first delta changes: it was relative to 0
+                    first, pos = get_varint(data, 0)
+                    put_varint(buf, first - merged.last_doc[term])
+                    buf += data[pos:]
+                merged.last_doc[term] = seg.last_doc[term]
+            merged.doc_lengths.update(seg.doc_lengths)
+            merged.total_length += seg.total_length
+        merged.sealed = True
+        return merged
+
+
+class Postings:
+    """
+    Matches of one term over several segments.
+    Logic: Segments cover increasing post id ranges, so a lookup bisects the
+    first post id of every part and probes one dict; no merged copy of the
+    whole posting list is built per query.
+    """
+    __slots__ = ("parts", "firsts", "df")
+
+    def __init__(self, parts):
+        self.parts = [part for part in parts if part]
+        self.firsts = [next(iter(part)) for part in self.parts]
+        self.df = sum(map(len, self.parts))  # document frequency
+
+    def __len__(self):
+        return self.df
+
+    def __iter__(self):
+        return itertools.chain.from_iterable(self.parts)
+
+    def items(self):
+        return itertools.chain.from_iterable(part.items() for part in self.parts)
+
+    def get(self, doc):
+        i = bisect_right(self.firsts, doc) - 1
+        return self.parts[i].get(doc) if i >= 0 else None
+
+
+class SearchIndex:
+    """
+    Incremental, segmented full-text index with BM25 ranking.
+    Logic:
+    - add() indexes one post into the active segment; post ids must be
+      positive and strictly increasing (PostLog ids are), else ValueError
+    - search() parses a query, collects matches from every segment and returns
+      the top k (score, post id) pairs, best first
+    - cache: (sealed segment, term) -> decoded postings, at most cache_bytes;
+      entries of merged-away segments are discarded with them
+    """
+
+    def __init__(self, segment_docs=10_000, max_segments=8, k1=1.2, b=0.75,
+                 background=True, cache_bytes=64 * 1024 * 1024):
+        self.segment_docs = segment_docs
+        self.max_segments = max_segments
+        self.k1 = k1
+        self.b = b
+        self.background = background
+        self.merges = 0
+        self.cache = LRUCache(cache_bytes, sizeof=decoded_bytes)
+        self.__cache_lock = threading.Lock()
+        self.__doc_lengths = {}  # post id -> number of tokens, over all segments
+        self.__total_length = 0
+        self.__last_id = 0
+        self.__active = Segment()
+        self.__sealed = []
+        self.__lock = threading.Lock()
+        self.__merger = None
+
+    def __len__(self):
+        return len(self.__doc_lengths)
+
+    def segments(self):
+        with self.__lock:
+            return self.__sealed + [self.__active]
+
+    def add(self, post_id, text):
+        if post_id <= self.__last_id:
+            raise ValueError(f"post ids must be positive and increasing: "
+                             f"got {post_id} after {self.__last_id}")
+        tokens = tokenize(text)
+        self.__active.add(post_id, tokens)
+        self.__last_id = post_id
+        self.__doc_lengths[post_id] = len(tokens)
+        self.__total_length += len(tokens)
+        if len(self.__active) >= self.segment_docs:
+            self.__seal()
+
+    def __seal(self):
+        self.__active.sealed = True
+        with self.__lock:
+            self.__sealed.append(self.__active)
+            self.__active = Segment()
+            too_many = len(self.__sealed) > self.max_segments
+
+        if too_many:
+            if not self.background:
+                self.merge()
+            elif self.__merger is None or not self.__merger.is_alive():
+                self.__merger = threading.Thread(target=self.merge, daemon=True)
+                self.__merger.start()
+
+    def merge(self):
+        """
+        Merges sealed segments until at most max_segments are left.
+        Logic: Always merges the adjacent pair with the fewest documents
+        (keeps post id order and avoids re-merging one huge segment).
+        """
+        while True:
+            with self.__lock:
+                sealed = list(self.__sealed)
+            if len(sealed) <= self.max_segments:
+                return
+
+            i = min(range(len(sealed) - 1), key=lambda j: len(sealed[j]) + len(sealed[j + 1]))
+            merged = Segment.merge(sealed[i:i + 2])
+
+            with self.__lock:
+                # Sealed segments are only ever appended meanwhile, so i is still valid
+                self.__sealed[i:i + 2] = [merged]
+            self.merges += 1
+            with self.__cache_lock:
+                for seg in sealed[i:i + 2]:
+                    for term in seg.postings:
+                        self.cache.discard((seg, term))
+
+    def wait_for_merges(self):
+        if self.__merger is not None:
+            self.__merger.join()
+
+    # ------------------------------------------------------------------
+    # Querying
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def parse(query):
+        """
+        Splits a query into (mode, clauses); a clause is a list of terms
+        (more than one term = phrase).
+        """
+        clauses = []
+        mode = "and"
+        for phrase, word in QUERY.findall(query):
+            if word == "OR":
+                mode = "or"
+                continue
+            terms = tokenize(phrase if phrase else word)
+            if terms:
+                clauses.append(terms)
+        return mode, clauses
+
+    def __matches(self, seg, term):
+        """
+        Decoded postings of one term in one segment; sealed segments go
+        through the cache (the active one still changes).
+        """
+        if not seg.sealed:
+            return seg.matches(term)
+        key = (seg, term)
+        with self.__cache_lock:
+            found = self.cache.get(key)
+        if found is None:
+            found = seg.matches(term)
+            with self.__cache_lock:
+                self.cache.put(key, found)
+        return found
+
+    def search(self, query, k=10):
+        segments = self.segments()
+        mode, clauses = self.parse(query)
+        if not clauses:
+            return []
+
+        lengths = self.__doc_lengths
+        n_docs = len(lengths)
+        avg_length = self.__total_length / max(n_docs, 1)
+
+        postings = {t: Postings([self.__matches(seg, t) for seg in segments])
+                    for clause in clauses for t in clause}
+
+        def rarity(terms):
+            return min(len(postings[t]) for t in terms)
+
+        # Documents matching each clause (a phrase needs consecutive positions).
+        # Every clause starts from its rarest term; in AND mode the rarest
+        # clause goes first and the others only filter its documents.
+        candidates = None
+        clause_docs = []
+        for terms in (sorted(clauses, key=rarity) if mode == "and" else clauses):
+            by_df = sorted(terms, key=lambda t: len(postings[t]))
+            docs = candidates if candidates is not None else postings[by_df[0]]
+            for t in by_df[candidates is None:]:
+                p = postings[t]
+                docs = [d for d in docs if p.get(d) is not None]
+            if len(terms) > 1:
+                docs = [d for d in docs if self.__has_phrase(d, terms, postings)]
+            if mode == "and":
+                candidates = docs
+                if not docs:
+                    break
+            else:
+                clause_docs.append(docs)
+
+        if mode == "or":
+            candidates = set().union(*clause_docs)
+
+        # BM25, one term at a time: walk whichever is shorter, the term's
+        # posting list or the candidates
+        k1, b = self.k1, self.b
+        norms = {doc: k1 * (1 - b + b * lengths[doc] / avg_length) for doc in candidates}
+        scores = dict.fromkeys(norms, 0.0)
+        for p in postings.values():
+            idf = math.log(1 + (n_docs - len(p) + 0.5) / (len(p) + 0.5))
+            if len(p) <= len(norms):
+                hits = ((doc, hit) for doc, hit in p.items() if doc in norms)
+            else:
+                hits = ((doc, p.get(doc)) for doc in norms)
+            for doc, hit in hits:
+                if hit is not None:
+                    tf = hit[0]
+                    scores[doc] += idf * tf * (k1 + 1) / (tf + norms[doc])
+
+        return heapq.nlargest(k, ((s, d) for d, s in scores.items()))
+
+    @staticmethod
+    def __has_phrase(doc, terms, postings):
+        starts = postings[terms[0]].get(doc)[1]
+        later = [set(postings[t].get(doc)[1]) for t in terms[1:]]
+        return any(all(p + i + 1 in pos for i, pos in enumerate(later)) for p in starts)
+
+
+class SearchMixin:
+    """
+    Cooperative mixin that indexes every published post.
+    Logic: Must come before PostLogMixin in the MRO so the post id exists.
+    """
+    search_index = None  # Assign a SearchIndex
+
+    def publish(self, txt):
+        super().publish(txt)
+        self.search_index.add(self.last_post_id, txt)
+
+
+class SearchableChatbook(SearchMixin, PostLogMixin, chatbook):
+    """chatbook whose posts are stored and full-text searchable"""
+
+
+def benchmark(n=200_000, vocabulary=20_000, words_per_post=12, seed=3):
+    """
+    Indexes n synthetic posts and measures query latency as the corpus grows.
+    """
+    rng = random.Random(seed)
+    words = [f"w{i}" for i in range(vocabulary)]
+    # Zipf-like word frequency
+    cum_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(vocabulary)))
+    queries = ["w10 w200", "w5 OR w3000", '"w1 w2"', "w50 w60 w70"]
+
+    # AND of rarer words stays flat; OR and phrases of the most common words
+    # match a fixed share of all posts, so they grow with the corpus
+    print("ms/query: " + ", ".join(queries))
+    index = SearchIndex(segment_docs=5_000)
+    start = time.perf_counter()
+    for post_id in range(1, n + 1):
+        index.add(post_id, " ".join(rng.choices(words, cum_weights=cum_weights, k=words_per_post)))
+        if post_id % (n // 4) == 0:
+            elapsed = time.perf_counter() - start
+            t0 = time.perf_counter()
+            latency = []
+            for q in queries:
+                t1 = time.perf_counter()
+                for _ in range(5):
+                    index.search(q)
+                latency.append((time.perf_counter() - t1) / 5)
+            print(f"{post_id:>8,} posts: {post_id / elapsed:>9,.0f} adds/sec, "
+                  f"{len(index.segments()):>2} segments, ms/query "
+                  + " ".join(f"{t * 1000:7.2f}" for t in latency))
+            start += time.perf_counter() - t0
+    index.wait_for_merges()
+    stats = index.cache.stats()
+    print(f"background merges: {index.merges}, decoded postings cache "
+          f"{stats['bytes'] / 2**20:.1f} of {stats['max_bytes'] / 2**20:.0f} MB, "
+          f"hit ratio {stats['hit_ratio']:.2f}")
+
+
+if __name__ == "__main__":
+    index = SearchIndex()
+    index.add(1, "Hello Chatbook !!")
+    index.add(2, "Chatbook says hello to the world")
+    index.add(3, "Goodbye world")
+    print(index.search("hello chatbook"))  # posts 1 and 2
+    print(index.search('"hello chatbook"'))  # only post 1
+    print(index.search("hello OR goodbye"))  # posts 1, 2 and 3
+
+    benchmark()
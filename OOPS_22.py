@@ -0,0 +1,195 @@
+# ============================================================================
+# HEADLESS WORKLOAD BENCHMARK HARNESS FOR CHATBOOK FLOWS
+# ============================================================================
+"""
+Drives chatbook (OOPS_3.py) through signup -> signin -> post -> message
+workloads without a keyboard or a terminal:
+
+- input: every operation is replayed through menu(commands)
+- output: every message goes to an injected output function (discarded here)
+
+Workloads are generated from a seed, so two runs with the same arguments do
+exactly the same work. Each operation type gets a latency histogram
+(p50/p95/p99), and the results are written as JSON. Running again with
+--baseline compares against an earlier result and exits with status 1 when
+an operation got slower than the allowed tolerance.
+
+    python OOPS_22.py --users 20000 --output baseline.json
+    python OOPS_22.py --users 20000 --baseline baseline.json
+"""
+import argparse
+import json
+import math
+import platform
+import random
+import sys
+import time
+
+from OOPS_3 import chatbook
+
+OPERATIONS = ("signup", "signin", "my_post", "sendmsg")
+
+
+class LatencyHistogram:
+    """
+    Log-scale latency histogram (fixed memory, ~2% relative precision).
+    Logic:
+    - A latency of ns nanoseconds lands in bucket floor(log(ns) / log(1.02))
+    - Percentiles walk the cumulative counts and report the bucket's upper edge
+    """
+    GROWTH = 1.02
+
+    def __init__(self):
+        self.counts = {}
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        self.__log_growth = math.log(self.GROWTH)
+
+    def record(self, ns):
+        bucket = int(math.log(max(ns, 1)) / self.__log_growth)
+        self.counts[bucket] = self.counts.get(bucket, 0) + 1
+        self.count += 1
+        self.total_ns += ns
+        if ns > self.max_ns:
+            self.max_ns = ns
+
+    def percentile(self, pct):
+        if not self.count:
+            return 0.0
+        rank = math.ceil(self.count * pct / 100)
+        seen = 0
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+            if seen >= rank:
+                return min(self.GROWTH ** (bucket + 1), self.max_ns)
+        return float(self.max_ns)
+
+    def summary(self):
+        secs = self.total_ns / 1e9
+        return {
+            "count": self.count,
+            "mean_us": round(self.total_ns / max(self.count, 1) / 1000, 3),
+            "p50_us": round(self.percentile(50) / 1000, 3),
+            "p95_us": round(self.percentile(95) / 1000, 3),
+            "p99_us": round(self.percentile(99) / 1000, 3),
+            "max_us": round(self.max_ns / 1000, 3),
+            "ops_per_sec": round(self.count / secs) if secs else 0,
+        }
+
+
+def generate_workload(seed, users, posts_per_user, messages_per_user):
+    """
+    Yields (user number, operation, menu commands) for a seeded workload.
+    Logic:
+    - Every user signs up and signs in first
+    - Posts and messages are then shuffled per user; message recipients and
+      the number of words per post come from the same seeded generator
+    """
+    rng = random.Random(seed)
+    for u in range(users):
+        email = f"user{u}@chatbook.com"
+        password = f"pwd{rng.randrange(10**6)}"
+        yield u, "signup", ["1", email, password]
+        yield u, "signin", ["2", email, password]
+
+        actions = ["my_post"] * posts_per_user + ["sendmsg"] * messages_per_user
+        rng.shuffle(actions)
+        for action in actions:
+            if action == "my_post":
+                words = " ".join(f"w{rng.randrange(1000)}" for _ in range(rng.randint(3, 20)))
+                yield u, action, ["3", words]
+            else:
+                friend = f"user{rng.randrange(users)}@chatbook.com"
+                yield u, action, ["4", f"hi from user{u}", friend]
+
+
+def run_workload(cls=chatbook, seed=42, users=10_000, posts_per_user=5, messages_per_user=5):
+    """
+    Replays a generated workload and returns the results as a dict.
+    """
+    def discard(text):
+        pass
+
+    histograms = {op: LatencyHistogram() for op in OPERATIONS}
+    clock = time.perf_counter_ns
+    sessions = {}
+
+    start = time.perf_counter()
+    for u, op, commands in generate_workload(seed, users, posts_per_user, messages_per_user):
+        user = sessions.get(u)
+        if user is None:
+            user = sessions[u] = cls(output=discard)
+        t0 = clock()
+        user.menu(commands)
+        histograms[op].record(clock() - t0)
+    wall = time.perf_counter() - start
+
+    total = sum(h.count for h in histograms.values())
+    return {
+        "meta": {
+            "class": cls.__name__,
+            "seed": seed,
+            "users": users,
+            "posts_per_user": posts_per_user,
+            "messages_per_user": messages_per_user,
+            "python": platform.python_version(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "operations": {op: h.summary() for op, h in histograms.items()},
+        "total": {"ops": total, "seconds": round(wall, 3), "ops_per_sec": round(total / wall)},
+    }
+
+
+def compare(results, baseline, tolerance=0.2):
+    """
+    Lists operations that regressed by more than tolerance (0.2 = 20%).
+    Logic: Regression = p99 latency went up, or throughput went down.
+    """
+    regressions = []
+    for op, now in results["operations"].items():
+        before = baseline.get("operations", {}).get(op)
+        if not before or not now["count"]:
+            continue
+        if now["p99_us"] > before["p99_us"] * (1 + tolerance):
+            regressions.append(f"{op}: p99 {before['p99_us']}us -> {now['p99_us']}us")
+        if now["ops_per_sec"] < before["ops_per_sec"] * (1 - tolerance):
+            regressions.append(f"{op}: {before['ops_per_sec']} -> {now['ops_per_sec']} ops/sec")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless chatbook workload benchmark")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--posts", type=int, default=5, help="posts per user")
+    parser.add_argument("--messages", type=int, default=5, help="messages per user")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare against this JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    results = run_workload(seed=args.seed, users=args.users,
+                           posts_per_user=args.posts, messages_per_user=args.messages)
+
+    for op, stats in results["operations"].items():
+        print(f"{op:<8} {stats['count']:>9,} ops  {stats['ops_per_sec']:>10,} ops/sec  "
+              f"p50 {stats['p50_us']:>7.2f}us  p95 {stats['p95_us']:>7.2f}us  "
+              f"p99 {stats['p99_us']:>7.2f}us")
+    print(f"total    {results['total']['ops']:>9,} ops  {results['total']['ops_per_sec']:>10,} ops/sec")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,278 @@
+# ============================================================================
+# COMPACT USER STORAGE: __SLOTS__ RECORDS AND COLUMNAR STORE
+# ============================================================================
+"""
+Every chatbook object (OOPS_3.py) carries its own __dict__ holding id,
+username, password, loggedin, the private name and the input/output hooks of
+the menu. That is hundreds of bytes per user before counting the strings.
+Two compact alternatives with the same get_name/set_name API:
+
+1. SlottedUser - one object per user, but with __slots__:
+   no per-instance __dict__, attributes live in fixed slots in the object.
+
+2. UserColumns - no object per user at all. Each attribute is a column:
+
+       ids        array('q')   8 bytes per user
+       loggedin   bytearray    1 byte per user
+       username   array('q')   offset into a StringPool (UTF-8 bytes)
+       password   array('q')   offset into a StringPool
+       name       array('q')   offset into an interned StringPool
+                               ("Default User" is stored once for everybody)
+
+   store[row] returns a small UserRecord view that reads/writes the columns.
+
+Both only hold user data; the interactive menu stays on chatbook.
+"""
+import sys
+from array import array
+from bisect import bisect_left
+from itertools import islice
+
+from OOPS_3 import chatbook
+from OOPS_13 import measure_memory, serve_measure
+
+DEFAULT_NAME = "Default User"
+
+
+class SlottedUser:
+    """
+    chatbook user record without a per-instance __dict__.
+    Logic: __slots__ fixes the attribute set; __name is name-mangled just like
+    chatbook's private attribute.
+    """
+    __slots__ = ("id", "username", "password", "loggedin", "__name")
+
+    def __init__(self, username="", password="", user_id=None):
+        self.id = chatbook.new_id() if user_id is None else user_id
+        self.__name = DEFAULT_NAME
+        self.username = username
+        self.password = password
+        self.loggedin = False
+
+    def get_name(self):
+        return self.__name
+
+    def set_name(self, value):
+        self.__name = value
+
+
+class StringPool:
+    """
+    Append-only string storage: UTF-8 bytes in one bytearray plus offsets.
+    Logic:
+    - add() returns a reference (an int) that get() turns back into a str
+    - With intern=True an already-stored string returns its old reference,
+      which suits columns with few distinct values (e.g. display names)
+    """
+
+    def __init__(self, intern=False):
+        self.__data = bytearray()
+        self.__offsets = array("q", [0])  # string i = data[offsets[i]:offsets[i + 1]]
+        self.__interned = {} if intern else None
+
+    def __len__(self):
+        return len(self.__offsets) - 1
+
+    def add(self, text):
+        if self.__interned is not None:
+            ref = self.__interned.get(text)
+            if ref is not None:
+                return ref
+
+        ref = len(self.__offsets) - 1
+        self.__data += text.encode()
+        self.__offsets.append(len(self.__data))
+        if self.__interned is not None:
+            self.__interned[text] = ref
+        return ref
+
+    def get(self, ref):
+        return self.__data[self.__offsets[ref]:self.__offsets[ref + 1]].decode()
+
+    def nbytes(self):
+        return len(self.__data) + self.__offsets.itemsize * len(self.__offsets)
+
+
+class UserRecord:
+    """
+    View of one row of a UserColumns store with the chatbook attribute API.
+    """
+    __slots__ = ("_columns", "_row")
+
+    def __init__(self, columns, row):
+        self._columns = columns
+        self._row = row
+
+    @property
+    def id(self):
+        return self._columns.ids[self._row]
+
+    @property
+    def username(self):
+        return self._columns.get_text("username", self._row)
+
+    @username.setter
+    def username(self, value):
+        self._columns.set_text("username", self._row, value)
+
+    @property
+    def password(self):
+        return self._columns.get_text("password", self._row)
+
+    @password.setter
+    def password(self, value):
+        self._columns.set_text("password", self._row, value)
+
+    @property
+    def loggedin(self):
+        return bool(self._columns.loggedin[self._row])
+
+    @loggedin.setter
+    def loggedin(self, value):
+        self._columns.loggedin[self._row] = 1 if value else 0
+
+    def get_name(self):
+        return self._columns.get_text("name", self._row)
+
+    def set_name(self, value):
+        self._columns.set_text("name", self._row, value)
+
+
+class UserColumns:
+    """
+    Columnar store of chatbook users (parallel arrays, one row per user).
+    Logic:
+    - append()/extend() add rows; ids come from the chatbook counter
+    - Changing a string appends the new value to its pool (old bytes are
+      not reclaimed - strings rarely change compared to how often they are read)
+    - row_of() finds a row by user id with bisect while ids were appended
+      in increasing order (the normal case); after the first out-of-order id
+      an id -> row dict (__rows) is built once and kept up to date
+    """
+
+    def __init__(self):
+        self.ids = array("q")
+        self.loggedin = bytearray()
+        self.__refs = {"username": array("q"), "password": array("q"), "name": array("q")}
+        self.__pools = {"username": StringPool(), "password": StringPool(),
+                        "name": StringPool(intern=True)}
+        self.__rows = None  # id -> row, only once ids are out of order
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, row):
+        if not 0 <= row < len(self.ids):
+            raise IndexError(row)
+        return UserRecord(self, row)
+
+    def __iter__(self):
+        for row in range(len(self.ids)):
+            yield UserRecord(self, row)
+
+    def append(self, username="", password="", name=DEFAULT_NAME, user_id=None):
+        user_id = chatbook.new_id() if user_id is None else user_id
+        if self.__rows is None and self.ids and user_id <= self.ids[-1]:
+            self.__rows = {}
+            for row, existing in enumerate(self.ids):
+                self.__rows.setdefault(existing, row)
+        if self.__rows is not None:
+            self.__rows.setdefault(user_id, len(self.ids))
+
+        self.ids.append(user_id)
+        self.loggedin.append(0)
+        for column, text in (("username", username), ("password", password), ("name", name)):
+            self.__refs[column].append(self.__pools[column].add(text))
+        return UserRecord(self, len(self.ids) - 1)
+
+    def extend(self, credentials):
+        """
+        Appends many (username, password) pairs, reserving chatbook ids in blocks.
+        Logic: Consumes the iterable chunk by chunk, so a generator never has
+        to be materialized.
+        """
+        credentials = iter(credentials)
+        while True:
+            chunk = list(islice(credentials, 10_000))
+            if not chunk:
+                return
+            for user_id, (username, password) in zip(chatbook.reserve_ids(len(chunk)), chunk):
+                self.append(username, password, user_id=user_id)
+
+    def get_text(self, column, row):
+        return self.__pools[column].get(self.__refs[column][row])
+
+    def set_text(self, column, row, value):
+        self.__refs[column][row] = self.__pools[column].add(value)
+
+    def row_of(self, user_id):
+        if self.__rows is not None:
+            return self.__rows.get(user_id)
+        row = bisect_left(self.ids, user_id)
+        if row < len(self.ids) and self.ids[row] == user_id:
+            return row
+        return None
+
+    def nbytes(self):
+        """
+        Bytes held by the columns and string pools.
+        """
+        size = self.ids.itemsize * len(self.ids) + len(self.loggedin)
+        size += sum(r.itemsize * len(r) for r in self.__refs.values())
+        size += sum(p.nbytes() for p in self.__pools.values())
+        return size
+
+
+def build(kind, n):
+    """
+    Creates n users of one kind: "chatbook", "slots" or "columns".
+    """
+    credentials = ((f"user{i}@chatbook.com", f"pwd{i}") for i in range(n))
+    if kind == "columns":
+        store = UserColumns()
+        store.extend(credentials)
+        return store
+
+    users = []
+    for user_id, (username, password) in zip(chatbook.reserve_ids(n), credentials):
+        if kind == "chatbook":
+            user = chatbook(user_id=user_id)
+            user.username = username
+            user.password = password
+        else:
+            user = SlottedUser(username, password, user_id=user_id)
+        users.append(user)
+    return users
+
+
+def benchmark(sizes=(1_000_000, 10_000_000), kinds=("chatbook", "slots", "columns")):
+    """
+    Memory per user of each storage kind; every measurement runs in its own
+    process so the peak resident memory of one does not hide the next.
+    """
+    for n in sizes:
+        for kind in kinds:
+            try:
+                stats = measure_memory(__file__, kind, n)
+            except RuntimeError as e:
+                print(f"{kind:<8} {n:>11,} users: failed ({e})")
+                continue
+            print(f"{kind:<8} {n:>11,} users: {stats['mb']:>9,.1f} MB "
+                  f"({stats['mb'] * 1024 * 1024 / n:>6,.0f} bytes/user)")
+
+
+if __name__ == "__main__":
+    serve_measure(build)
+
+    store = UserColumns()
+    user = store.append("nitish@gmail.com", "1234")
+    print(user.get_name())  # Default User
+    user.set_name("Agent X")
+    print(user.get_name())  # Agent X
+    print(store[store.row_of(user.id)].username)  # nitish@gmail.com
+
+    slotted = SlottedUser("ankit@gmail.com", "abcd")
+    slotted.set_name("Agent Y")
+    print(slotted.get_name())  # Agent Y
+
+    benchmark(sizes=[int(n) for n in sys.argv[1:]] or (1_000_000, 10_000_000))
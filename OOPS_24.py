@@ -0,0 +1,274 @@
+# ============================================================================
+# VECTORIZED BATCH LEDGER FOR ATM ACCOUNTS
+# ============================================================================
+"""
+Atm.withdraw / Atm.set_balance (OOPS_11.py) change one account per Python
+method call. Nightly settlement applies millions of debits, and at that
+volume the per-call overhead is the bottleneck. AtmLedger keeps every balance
+in one NumPy int64 array indexed by cid and applies a whole batch of
+withdrawals and deposits in a few vectorized passes.
+
+The rules of Atm.withdraw still hold for every row (settlement rows are
+already authorized, so there is no PIN check):
+- amount <= 0 or not a whole number -> INVALID_AMOUNT ('Invalid amount')
+  (never truncated: 0.5 is rejected, not applied as 0)
+- amount > balance at that point   -> INSUFFICIENT_FUNDS ('Insufficient funds')
+Rows are applied as if one after another in batch order, so a rejected row
+does not change the balance, and a deposit earlier in the batch can pay for
+a later withdrawal on the same account.
+
+How the batch is applied:
+1. Validate all rows at once (unknown cid, amount <= 0)
+2. Stable-sort the valid rows by cid, so each account's rows are adjacent
+   and still in batch order
+3. Running balance per account = balance + cumulative sum of its deltas
+4. Where an account's running balance first goes negative, that row is
+   rejected; the rows before it are final. Step 3 is repeated only for the
+   rows after it (accounts without a problem finish in the first round)
+5. Final rows are added with one np.add.reduceat per round
+6. Each round settles only one rejection per account, so an account with
+   thousands of overdrafts would need thousands of rounds. After MAX_ROUNDS
+   the rows still left are settled by one linear scalar pass instead
+   (a later, smaller withdrawal can still succeed after a rejected one, so
+   the rest cannot simply be rejected in bulk)
+"""
+import random
+import time
+
+import numpy as np
+
+from OOPS_11 import Atm, quiet
+
+OK = 0
+INVALID_AMOUNT = 1
+INSUFFICIENT_FUNDS = 2
+UNKNOWN_ACCOUNT = 3
+STATUS_NAMES = {
+    OK: "ok",
+    INVALID_AMOUNT: "Invalid amount",
+    INSUFFICIENT_FUNDS: "Insufficient funds",
+    UNKNOWN_ACCOUNT: "Unknown account",
+}
+
+
+class AtmLedger:
+    """
+    Balances of many Atm accounts in one int64 array indexed by cid.
+    Logic:
+    - open_account()/from_atms() register accounts; the arrays grow as needed
+    - withdraw_batch()/deposit_batch()/apply_batch() return one status code
+      per row (see STATUS_NAMES)
+    """
+    MAX_ROUNDS = 4  # vectorized rounds before the scalar pass
+
+    def __init__(self, capacity=1024):
+        self.__balances = np.zeros(capacity, dtype=np.int64)
+        self.__open = np.zeros(capacity, dtype=bool)
+
+    def __len__(self):
+        return int(self.__open.sum())
+
+    def __grow(self, cid):
+        size = len(self.__balances)
+        if cid < size:
+            return
+        new_size = max(cid + 1, size * 2)
+        self.__balances = np.concatenate([self.__balances, np.zeros(new_size - size, np.int64)])
+        self.__open = np.concatenate([self.__open, np.zeros(new_size - size, bool)])
+
+    def open_account(self, cid, balance=0):
+        if not isinstance(balance, int) or balance < 0:
+            raise ValueError("Invalid balance amount")
+        self.__grow(cid)
+        self.__balances[cid] = balance
+        self.__open[cid] = True
+
+    @classmethod
+    def from_atms(cls, atms):
+        atms = list(atms)
+        ledger = cls(max((a.cid for a in atms), default=0) + 1)
+        cids = np.fromiter((a.cid for a in atms), np.int64, len(atms))
+        ledger.__balances[cids] = np.fromiter((a.get_balance() for a in atms), np.int64, len(atms))
+        ledger.__open[cids] = True
+        return ledger
+
+    def to_atms(self, atms):
+        """
+        Writes the ledger balances back through Atm.set_balance.
+        """
+        for atm in atms:
+            atm.set_balance(int(self.__balances[atm.cid]))
+
+    def balance(self, cid):
+        if 0 <= cid < len(self.__balances) and self.__open[cid]:
+            return int(self.__balances[cid])
+        return None
+
+    def withdraw_batch(self, cids, amounts):
+        return self.apply_batch(cids, amounts, True)
+
+    def deposit_batch(self, cids, amounts):
+        return self.apply_batch(cids, amounts, False)
+
+    @staticmethod
+    def __whole_amounts(amounts):
+        """
+        (int64 amounts, bool array: row holds a whole number).
+        Logic: Integer input passes as is; for anything else (floats, mixed
+        objects) only finite whole values in int64 range are kept, the other
+        rows become 0 and are flagged, instead of being truncated by the cast.
+        """
+        raw = np.asarray(amounts)
+        if raw.dtype.kind in "iu":
+            return raw.astype(np.int64, copy=False), np.ones(raw.shape, dtype=bool)
+        values = raw.astype(np.float64)
+        whole = np.isfinite(values) & (np.floor(values) == values) & (np.abs(values) < 2.0 ** 63)
+        return np.where(whole, values, 0).astype(np.int64), whole
+
+    def apply_batch(self, cids, amounts, is_withdrawal):
+        """
+        Applies a batch of rows and returns an int8 status array (one per row).
+        Logic: is_withdrawal is a bool or a bool array (one flag per row).
+        """
+        cids = np.asarray(cids, dtype=np.int64)
+        amounts, whole = self.__whole_amounts(amounts)
+        withdrawal = np.broadcast_to(np.asarray(is_withdrawal, dtype=bool), cids.shape)
+        balances = self.__balances
+
+        # 1. Row validation
+        status = np.zeros(len(cids), dtype=np.int8)
+        known = (cids >= 0) & (cids < len(balances))
+        known[known] = self.__open[cids[known]]
+        status[~known] = UNKNOWN_ACCOUNT
+        status[known & ((amounts <= 0) | ~whole)] = INVALID_AMOUNT
+
+        delta = np.where(withdrawal, -amounts, amounts)
+
+        # 2. Valid rows grouped by account, batch order kept inside each group
+        rows = np.flatnonzero(status == OK)
+        rows = rows[np.argsort(cids[rows], kind="stable")]
+
+        # 3./4. Rows before an account's first overdraft are final and get
+        # applied; that row is rejected; only the rows after it go another round
+        for _ in range(self.MAX_ROUNDS):
+            if not len(rows):
+                break
+            c = cids[rows]
+            d = delta[rows]
+            starts = np.flatnonzero(np.r_[True, c[1:] != c[:-1]])
+            group = np.repeat(np.arange(len(starts)), np.diff(np.r_[starts, len(rows)]))
+
+            running = np.cumsum(d)
+            offset = running[starts] - d[starts]
+            running = balances[c] + running - offset[group]
+
+            bad = np.flatnonzero(running < 0)
+            if not len(bad):
+                self.__credit(c, d, starts)
+                break
+
+            bad_groups, first = np.unique(group[bad], return_index=True)
+            cut = np.full(len(starts), len(rows))  # position of the rejected row per account
+            cut[bad_groups] = bad[first]
+            position = np.arange(len(rows))
+            row_cut = cut[group]
+
+            done = position < row_cut
+            self.__credit(c[done], d[done])
+            status[rows[bad[first]]] = INSUFFICIENT_FUNDS
+            rows = rows[position > row_cut]
+        else:
+            if len(rows):
+                self.__settle(rows, cids[rows], delta[rows], status)
+
+        return status
+
+    def __settle(self, rows, c, d, status):
+        """
+        6. One sequential pass over the remaining rows (sorted by cid, batch
+        order inside each account), with plain Python ints.
+        """
+        balances = self.__balances
+        rejected = []
+        current = balance = None
+        for row, cid, delta in zip(rows.tolist(), c.tolist(), d.tolist()):
+            if cid != current:
+                if current is not None:
+                    balances[current] = balance
+                current, balance = cid, int(balances[cid])
+            if balance + delta < 0:
+                rejected.append(row)
+            else:
+                balance += delta
+        balances[current] = balance
+        status[rejected] = INSUFFICIENT_FUNDS
+
+    def __credit(self, c, d, starts=None):
+        """
+        5. Adds the deltas d to the accounts c (sorted by cid), one sum per account.
+        """
+        if not len(c):
+            return
+        if starts is None:
+            starts = np.flatnonzero(np.r_[True, c[1:] != c[:-1]])
+        self.__balances[c[starts]] += np.add.reduceat(d, starts)
+
+    @staticmethod
+    def rejections(status, cids):
+        """
+        Lists (row, cid, reason) for every rejected row of a batch.
+        """
+        rows = np.flatnonzero(status != OK)
+        return [(int(r), int(cids[r]), STATUS_NAMES[int(status[r])]) for r in rows]
+
+
+def benchmark(accounts=100_000, rows=1_000_000, seed=11):
+    """
+    Per-object Atm.withdraw loop vs. one vectorized AtmLedger batch.
+    Logic: Both apply the same withdrawals; the final balances must match.
+    """
+    rng = random.Random(seed)
+    atms = []
+    with quiet():
+        for _ in range(accounts):
+            atm = Atm()
+            atm.create_pin("1234", rng.randrange(0, 5_000))
+            atms.append(atm)
+    ledger = AtmLedger.from_atms(atms)
+
+    by_cid = {atm.cid: atm for atm in atms}
+    cids = [atms[rng.randrange(accounts)].cid for _ in range(rows)]
+    amounts = [rng.randrange(-10, 500) for _ in range(rows)]
+
+    start = time.perf_counter()
+    with quiet():  # Atm.withdraw prints on every call
+        for cid, amount in zip(cids, amounts):
+            by_cid[cid].withdraw("1234", amount)
+    loop_secs = time.perf_counter() - start
+
+    cid_array = np.array(cids, dtype=np.int64)  # settlement files load straight into arrays
+    amount_array = np.array(amounts, dtype=np.int64)
+    start = time.perf_counter()
+    status = ledger.withdraw_batch(cid_array, amount_array)
+    vector_secs = time.perf_counter() - start
+
+    assert all(ledger.balance(a.cid) == a.get_balance() for a in atms)
+    counts = np.bincount(status, minlength=len(STATUS_NAMES))
+    print(f"rows       : {rows:,} over {accounts:,} accounts")
+    print(f"outcomes   : " + ", ".join(f"{STATUS_NAMES[s]} {counts[s]:,}" for s in STATUS_NAMES))
+    print(f"Atm loop   : {rows / loop_secs:>12,.0f} rows/sec")
+    print(f"AtmLedger  : {rows / vector_secs:>12,.0f} rows/sec ({loop_secs / vector_secs:.0f}x)")
+
+
+if __name__ == "__main__":
+    ledger = AtmLedger()
+    ledger.open_account(1, 1000)
+    ledger.open_account(2, 50)
+    cids = [1, 2, 2, 1, 3, 2]
+    amounts = [200, 80, 30, -5, 10, 20]
+    status = ledger.withdraw_batch(cids, amounts)
+    print(ledger.balance(1), ledger.balance(2))  # 800 0
+    print(AtmLedger.rejections(status, cids))
+    # [(1, 2, 'Insufficient funds'), (3, 1, 'Invalid amount'), (4, 3, 'Unknown account')]
+
+    benchmark()
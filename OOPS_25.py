@@ -0,0 +1,304 @@
+# ============================================================================
+# CONCURRENT ATM WITHDRAWALS WITH LOCK STRIPING
+# ============================================================================
+"""
+Atm.withdraw (OOPS_11.py) checks `amount <= balance` and then subtracts.
+Two threads can both pass the check before either subtracts, and the
+account is overdrawn (check-then-act race).
+
+AccountService makes every balance change atomic without one global lock:
+
+- Lock striping: a fixed array of locks, account cid -> lock[cid % stripes].
+  Threads working on different accounts almost never wait for each other,
+  and the number of locks stays fixed no matter how many accounts exist.
+- transfer(): needs two accounts. Both stripe locks are always taken in
+  ascending stripe order, so two opposite transfers (A->B and B->A) can
+  never hold one lock each and wait forever (no deadlock).
+- Optimistic path (optimistic=True): read balance and version without any
+  lock, compute, then compare-and-swap - commit only if the version is still
+  the one that was read, otherwise retry. The lock is held only for the
+  compare + write; after max_retries failed attempts it falls back to the
+  normal locked path.
+
+Every operation returns "ok" or the message Atm prints for that case.
+"""
+import random
+import sys
+import threading
+import time
+
+from OOPS_11 import Atm
+
+OK = "ok"
+
+
+class AccountService:
+    """
+    Thread-safe balance changes over a set of Atm accounts.
+    Logic:
+    - Accounts are Atm objects, looked up by cid
+    - All reads and writes of a balance happen under the account's stripe lock
+    - __versions counts committed changes per account (for compare-and-swap)
+    """
+
+    def __init__(self, stripes=64, max_retries=8):
+        self.stripes = stripes
+        self.max_retries = max_retries
+        self.__locks = [threading.Lock() for _ in range(stripes)]
+        self.__accounts = {}  # cid -> Atm
+        self.__versions = {}  # cid -> number of committed changes
+        self.cas_retries = 0  # Statistics only (updated without a lock)
+        self.cas_fallbacks = 0
+
+    def __len__(self):
+        return len(self.__accounts)
+
+    def lock_for(self, cid):
+        return self.__locks[cid % self.stripes]
+
+    def open(self, user_pin, initial_balance):
+        """
+        Creates an Atm account and returns its cid.
+        """
+        atm = Atm()
+        atm.pin = user_pin  # Same as create_pin(), without the print
+        atm.set_balance(initial_balance)
+        with self.lock_for(atm.cid):
+            self.__accounts[atm.cid] = atm
+            self.__versions[atm.cid] = 0
+        return atm.cid
+
+    def add(self, atm):
+        with self.lock_for(atm.cid):
+            self.__accounts[atm.cid] = atm
+            self.__versions[atm.cid] = 0
+
+    def balance(self, cid, user_pin):
+        atm = self.__accounts.get(cid)
+        if atm is None or user_pin != atm.pin:
+            return None
+        with self.lock_for(cid):
+            return atm.get_balance()
+
+    def check_balance(self, cid, user_pin):
+        """
+        (status, balance) with the same status strings as the other
+        operations; balance is None unless status is "ok".
+        """
+        atm = self.__accounts.get(cid)
+        if atm is None:
+            return "Unknown account", None
+        if user_pin != atm.pin:
+            return "Incorrect PIN", None
+        with self.lock_for(cid):
+            return OK, atm.get_balance()
+
+    def total(self):
+        """
+        Sum of all balances, taken while holding every stripe (a consistent snapshot).
+        """
+        for lock in self.__locks:
+            lock.acquire()
+        try:
+            return sum(atm.get_balance() for atm in self.__accounts.values())
+        finally:
+            for lock in self.__locks:
+                lock.release()
+
+    @staticmethod
+    def __invalid_amount(amount):
+        """
+        Atm.set_balance only accepts ints, so any other amount would leave the
+        balance unchanged while the operation reported "ok".
+        """
+        return not isinstance(amount, int) or isinstance(amount, bool) or amount <= 0
+
+    @classmethod
+    def __check(cls, atm, user_pin, amount):
+        """
+        Atm.withdraw's rules before any balance is looked at.
+        """
+        if atm is None:
+            return "Unknown account"
+        if user_pin != atm.pin:
+            return "Incorrect PIN"
+        if cls.__invalid_amount(amount):
+            return "Invalid amount"
+        return None
+
+    def withdraw(self, cid, user_pin, amount, optimistic=False):
+        atm = self.__accounts.get(cid)
+        error = self.__check(atm, user_pin, amount)
+        if error:
+            return error
+
+        if optimistic:
+            result = self.__withdraw_cas(atm, amount)
+            if result is not None:
+                return result
+            self.cas_fallbacks += 1
+
+        with self.lock_for(cid):
+            balance = atm.get_balance()
+            if amount > balance:
+                return "Insufficient funds"
+            atm.set_balance(balance - amount)
+            self.__versions[cid] += 1
+        return OK
+
+    def __withdraw_cas(self, atm, amount):
+        """
+        Optimistic withdraw; returns None when every attempt lost the race.
+        """
+        cid = atm.cid
+        lock = self.lock_for(cid)
+        for _ in range(self.max_retries):
+            # Read without the lock; the version tells whether it stayed valid
+            version = self.__versions[cid]
+            balance = atm.get_balance()
+            if amount > balance:
+                if self.__versions[cid] == version:
+                    return "Insufficient funds"
+                continue
+
+            # Compare-and-swap: the lock only covers the compare + write
+            with lock:
+                if self.__versions[cid] == version:
+                    atm.set_balance(balance - amount)
+                    self.__versions[cid] = version + 1
+                    return OK
+            self.cas_retries += 1
+        return None
+
+    def change_pin(self, cid, old_pin, new_pin):
+        atm = self.__accounts.get(cid)
+        if atm is None:
+            return "Unknown account"
+        with self.lock_for(cid):
+            if old_pin != atm.pin:
+                return "Incorrect old PIN"
+            atm.pin = new_pin
+        return OK
+
+    def deposit(self, cid, amount):
+        atm = self.__accounts.get(cid)
+        if atm is None:
+            return "Unknown account"
+        if self.__invalid_amount(amount):
+            return "Invalid amount"
+        with self.lock_for(cid):
+            atm.set_balance(atm.get_balance() + amount)
+            self.__versions[cid] += 1
+        return OK
+
+    def transfer(self, from_cid, user_pin, to_cid, amount):
+        """
+        Moves amount between two accounts atomically.
+        Logic: Stripe locks are acquired in ascending stripe order (deadlock-free);
+        two accounts on the same stripe need that one lock only.
+        """
+        source = self.__accounts.get(from_cid)
+        error = self.__check(source, user_pin, amount)
+        if error:
+            return error
+        target = self.__accounts.get(to_cid)
+        if target is None:
+            return "Unknown account"
+        if from_cid == to_cid:
+            return OK
+
+        locks = [self.__locks[i] for i in sorted({from_cid % self.stripes, to_cid % self.stripes})]
+        for lock in locks:
+            lock.acquire()
+        try:
+            balance = source.get_balance()
+            if amount > balance:
+                return "Insufficient funds"
+            source.set_balance(balance - amount)
+            target.set_balance(target.get_balance() + amount)
+            self.__versions[from_cid] += 1
+            self.__versions[to_cid] += 1
+        finally:
+            for lock in reversed(locks):
+                lock.release()
+        return OK
+
+
+def stress(threads, accounts=1_000, ops_per_thread=50_000, optimistic=False, seed=14):
+    """
+    Random withdrawals, deposits and transfers from many threads.
+    Logic: money is conserved when
+        final total == initial total - withdrawn + deposited
+    and no balance is ever negative. Returns (ops/sec, service).
+    """
+    service = AccountService()
+    cids = [service.open("1234", 1_000) for _ in range(accounts)]
+    initial = service.total()
+    withdrawn = [0] * threads
+    deposited = [0] * threads
+    start_gate = threading.Barrier(threads + 1)
+
+    def worker(t):
+        rng = random.Random(seed + t)
+        start_gate.wait()
+        for _ in range(ops_per_thread):
+            op = rng.random()
+            cid = rng.choice(cids)
+            amount = rng.randint(1, 300)
+            if op < 0.4:
+                if service.withdraw(cid, "1234", amount, optimistic) == OK:
+                    withdrawn[t] += amount
+            elif op < 0.6:
+                service.deposit(cid, amount)
+                deposited[t] += amount
+            else:
+                service.transfer(cid, "1234", rng.choice(cids), amount)
+
+    workers = [threading.Thread(target=worker, args=(t,)) for t in range(threads)]
+    for w in workers:
+        w.start()
+    start_gate.wait()
+    start = time.perf_counter()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - start
+
+    final = service.total()
+    assert final == initial - sum(withdrawn) + sum(deposited), "money was created or lost"
+    assert all(service.balance(cid, "1234") >= 0 for cid in cids), "account overdrawn"
+    return threads * ops_per_thread / elapsed, service
+
+
+def benchmark(thread_counts=(1, 4, 16)):
+    """
+    Throughput of the locked and the optimistic path at several thread counts.
+    Logic:
+    - A short switch interval makes thread switches (and races) frequent
+    - With the GIL, threads do not run Python code in parallel; the numbers
+      show that throughput does not collapse as threads are added
+    """
+    previous = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        for optimistic in (False, True):
+            for threads in thread_counts:
+                rate, service = stress(threads, ops_per_thread=200_000 // threads,
+                                       optimistic=optimistic)
+                extra = f" (cas retries {service.cas_retries:,}, fallbacks " \
+                        f"{service.cas_fallbacks:,})" if optimistic else ""
+                print(f"{'optimistic' if optimistic else 'locked':<10} {threads:>2} threads: "
+                      f"{rate:>10,.0f} ops/sec, money conserved{extra}")
+    finally:
+        sys.setswitchinterval(previous)
+
+
+if __name__ == "__main__":
+    service = AccountService()
+    alice = service.open("1234", 1000)
+    bob = service.open("4321", 500)
+    print(service.withdraw(alice, "1234", 200))  # ok
+    print(service.transfer(alice, "1234", bob, 300))  # ok
+    print(service.withdraw(bob, "4321", 5000))  # Insufficient funds
+    print(service.balance(alice, "1234"), service.balance(bob, "4321"))  # 500 800
+
+    benchmark()
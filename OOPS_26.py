@@ -0,0 +1,479 @@
+# ============================================================================
+# WRITE-AHEAD LOG WITH GROUP COMMIT FOR ATM BALANCE CHANGES
+# ============================================================================
+"""
+Atm balances (OOPS_11.py) only live in memory. DurableAtm writes every state
+change to a write-ahead log on local disk before the call returns, so the
+accounts can be rebuilt after a restart (DurableAtm.recover).
+
+    atm_wal/
+      00000000000000000001.wal   <- segment (file name = lsn of its first record)
+
+Record layout (little endian):
+    | crc32 (4) | lsn (8) | op (1) | cid (8) | amount (8) | pin hash (16, PIN ops only) |
+
+    op  CREATE_PIN   amount = initial balance, pin hash
+        WITHDRAW     amount = money taken out (only successful withdrawals)
+        SET_BALANCE  amount = new balance
+        CHANGE_PIN   pin hash
+PINs never reach the disk, only a salted hash (the hash is also what the
+DurableAtm object keeps in memory).
+
+Group commit
+- append() adds a record to an in-memory buffer and returns its lsn (log
+  sequence number); commit(lsn) returns once that lsn is on disk.
+- The first committer that finds no flush running becomes the leader: it
+  takes the whole buffer, writes it and calls fsync once. Everybody who
+  appended meanwhile waits and is covered by that same fsync, so 16 threads
+  do not pay for 16 fsyncs.
+- group_window_ms lets the leader wait a little before flushing so more
+  commits can join the group.
+
+sync modes (durability vs. latency)
+- "commit"   : commit() waits for fsync - nothing acknowledged is ever lost
+- "interval" : commit() returns at once, a background thread fsyncs every
+               interval_ms - a crash loses at most that much
+- "never"    : commit() waits for write() but never fsyncs - survives a
+               process crash, not a power loss
+"""
+import hashlib
+import os
+import struct
+import tempfile
+import threading
+import time
+import zlib
+
+from OOPS_11 import Atm, quiet
+
+HEADER = struct.Struct("<IQBQq")  # crc32, lsn, op, cid, amount
+PIN_BYTES = 16
+
+CREATE_PIN = 1
+WITHDRAW = 2
+SET_BALANCE = 3
+CHANGE_PIN = 4
+PIN_OPS = (CREATE_PIN, CHANGE_PIN)
+
+SYNC_MODES = ("commit", "interval", "never")
+
+
+def pin_hash(cid, user_pin):
+    """
+    16-byte hash of a PIN, salted with the account's cid.
+    """
+    return hashlib.blake2b(str(user_pin).encode(), digest_size=PIN_BYTES,
+                           salt=cid.to_bytes(16, "little")).digest()
+
+
+def first_lsn(path):
+    """
+    lsn of the first record of a segment (its file name).
+    """
+    return int(os.path.basename(path)[:-4])
+
+
+def encode_record(lsn, op, cid, amount, pin=b""):
+    body = HEADER.pack(0, lsn, op, cid, amount)[4:] + (pin if op in PIN_OPS else b"")
+    return struct.pack("<I", zlib.crc32(body)) + body
+
+
+def decode_records(data, pos=0):
+    """
+    Yields (end offset, (lsn, op, cid, amount, pin hash)) for every intact
+    record; stops at the first torn or corrupt one.
+    """
+    while pos + HEADER.size <= len(data):
+        crc, lsn, op, cid, amount = HEADER.unpack_from(data, pos)
+        end = pos + HEADER.size + (PIN_BYTES if op in PIN_OPS else 0)
+        if end > len(data) or zlib.crc32(data[pos + 4:end]) != crc:
+            return
+        pin = bytes(data[pos + HEADER.size:end])
+        yield end, (lsn, op, cid, amount, pin)
+        pos = end
+
+
+class WriteAheadLog:
+    """
+    Append-only, segmented, group-committed log of Atm state changes.
+    Logic:
+    - lsns are consecutive, starting at 1
+    - A torn record at the end of the last segment (crash in the middle of a
+      write) is cut off when the log is reopened
+    - lock is public: callers that must apply a change and append its record
+      atomically hold it around both (it is re-entrant)
+    - A failed write or fsync is final: the records of that flush are not
+      durable, so every later append()/commit() raises (reopen the log)
+    - accounts: cid -> account for every account the log knows (filled by
+      DurableAtm.create_pin and recover()); snapshots are taken of it
+    """
+
+    def __init__(self, directory, sync="commit", interval_ms=10, group_window_ms=0):
+        if sync not in SYNC_MODES:
+            raise ValueError(f"sync must be one of {SYNC_MODES}")
+        self.directory = directory
+        self.sync = sync
+        self.interval = interval_ms / 1000
+        self.group_window = group_window_ms / 1000
+        os.makedirs(directory, exist_ok=True)
+
+        self.lock = threading.RLock()
+        self.__flushed = threading.Condition(self.lock)
+        self.__buffer = bytearray()
+        self.__flushing = False
+        self.__next_lsn = 1
+        self.__durable_lsn = 0
+        self.__fd = None
+        self.__closed = False
+        self.__failed = None  # exception of a failed flush
+        self.flushes = 0
+        self.accounts = {}
+
+        self.__load()
+
+        self.__syncer = None
+        if sync == "interval":
+            self.__syncer = threading.Thread(target=self.__sync_loop, daemon=True)
+            self.__syncer.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def next_lsn(self):
+        return self.__next_lsn
+
+    @property
+    def durable_lsn(self):
+        return self.__durable_lsn
+
+    def segments(self):
+        names = sorted(f for f in os.listdir(self.directory) if f.endswith(".wal"))
+        return [os.path.join(self.directory, name) for name in names]
+
+    def __load(self):
+        segments = self.segments()
+        if not segments:
+            self.__open_segment()
+            return
+
+        last = segments[-1]
+        with open(last, "rb") as f:
+            data = f.read()
+        self.__next_lsn = first_lsn(last)
+        end = 0
+        for end, record in decode_records(data):
+            self.__next_lsn = record[0] + 1
+        if end < len(data):
+            with open(last, "r+b") as f:
+                f.truncate(end)
+
+        self.__durable_lsn = self.__next_lsn - 1
+        self.__fd = os.open(last, os.O_WRONLY | os.O_APPEND)
+
+    def __open_segment(self):
+        path = os.path.join(self.directory, f"{self.__next_lsn:020d}.wal")
+        self.__fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+
+    # ------------------------------------------------------------------
+    # Writing
+    # ------------------------------------------------------------------
+
+    def append(self, op, cid, amount=0, pin=b""):
+        """
+        Buffers one record and returns its lsn (not durable until commit()).
+        """
+        with self.lock:
+            if self.__closed:
+                raise ValueError("write-ahead log is closed")
+            self.__check_failed()
+            lsn = self.__next_lsn
+            record = encode_record(lsn, op, cid, amount, pin)  # may raise: nothing used up yet
+            self.__next_lsn += 1
+            self.__buffer += record
+            return lsn
+
+    def commit(self, lsn):
+        """
+        Returns once the record with this lsn is durable (per the sync mode).
+        Logic: Leader/follower group commit - one flush covers every record
+        buffered before it started.
+        """
+        if self.sync == "interval":
+            self.__check_failed()
+            return
+        with self.lock:
+            while self.__durable_lsn < lsn:
+                self.__check_failed()
+                if self.__flushing:
+                    self.__flushed.wait()
+                    continue
+                self.__flushing = True
+                if self.group_window:
+                    self.__flushed.wait(self.group_window)  # let more commits join
+                self.__flush_locked()
+
+    def __check_failed(self):
+        if self.__failed is not None:
+            raise OSError("write-ahead log failed to flush; records may be lost") from self.__failed
+
+    def __flush_locked(self):
+        """
+        Writes (and fsyncs) the buffer; drops the lock during the I/O.
+        Logic: durable_lsn only moves on success; on failure the error is
+        kept for the waiting committers and re-raised here.
+        """
+        self.__flushing = True
+        data, self.__buffer = self.__buffer, bytearray()
+        upto = self.__next_lsn - 1
+        self.lock.release()
+        error = None
+        try:
+            self.__write(data)
+        except BaseException as exc:
+            error = exc
+            raise
+        finally:
+            self.lock.acquire()
+            if error is None:
+                self.__durable_lsn = max(self.__durable_lsn, upto)
+            else:
+                self.__failed = error
+            self.__flushing = False
+            self.__flushed.notify_all()
+
+    def __write(self, data):
+        view = memoryview(data)
+        while view:
+            written = os.write(self.__fd, view)
+            view = view[written:]
+        if self.sync != "never":
+            os.fsync(self.__fd)
+        self.flushes += 1
+
+    def __sync_loop(self):
+        while True:
+            time.sleep(self.interval)
+            with self.lock:
+                if self.__closed or self.__failed is not None:
+                    return
+                if self.__buffer and not self.__flushing:
+                    try:
+                        self.__flush_locked()
+                    except OSError:
+                        return  # kept in __failed, raised by the next commit()
+
+    def flush(self):
+        """
+        Makes everything appended so far durable (in every sync mode).
+        """
+        with self.lock:
+            while self.__flushing:
+                self.__flushed.wait()
+            self.__check_failed()
+            if self.__buffer:
+                self.__flush_locked()
+
+    def rotate(self):
+        """
+        Makes everything durable and starts a new segment at next_lsn.
+        Logic: Returns the last lsn of the closed segment; older segments can
+        then be dropped with purge() once a snapshot covers them.
+        """
+        with self.lock:
+            self.flush()
+            os.close(self.__fd)
+            self.__open_segment()
+            return self.__next_lsn - 1
+
+    def purge(self, upto_lsn):
+        """
+        Deletes every segment whose records all have lsn <= upto_lsn.
+        """
+        with self.lock:
+            segments = self.segments()
+            for path, following in zip(segments, segments[1:]):
+                if first_lsn(following) <= upto_lsn + 1:
+                    os.remove(path)
+
+    def close(self):
+        with self.lock:
+            if self.__closed:
+                return
+            try:
+                if self.__failed is None:
+                    self.flush()
+            finally:
+                self.__closed = True
+                os.close(self.__fd)
+        if self.__syncer is not None:
+            self.__syncer.join()
+
+    # ------------------------------------------------------------------
+    # Reading
+    # ------------------------------------------------------------------
+
+    def replay(self, after_lsn=0):
+        """
+        Yields (lsn, op, cid, amount, pin hash) for every durable record with
+        lsn > after_lsn, oldest first.
+        """
+        segments = self.segments()
+        for i, path in enumerate(segments):
+            # Skip segments that end before after_lsn
+            if i + 1 < len(segments) and first_lsn(segments[i + 1]) <= after_lsn + 1:
+                continue
+            with open(path, "rb") as f:
+                data = f.read()
+            for _, record in decode_records(data):
+                if record[0] > after_lsn:
+                    yield record
+
+
+def apply_record(accounts, record, cls=Atm):
+    """
+    Applies one log record to a dict cid -> Atm (redo, without logging again).
+    """
+    lsn, op, cid, amount, pin = record
+    atm = accounts.get(cid)
+    if op == CREATE_PIN:
+        if atm is None:
+            atm = accounts[cid] = cls.__new__(cls)  # no new id from the counter
+            atm.cid = cid
+        atm.pin = pin
+        Atm.set_balance(atm, amount)
+    elif atm is None:
+        raise ValueError(f"lsn {lsn}: account {cid} was never created")
+    elif op == WITHDRAW:
+        Atm.set_balance(atm, atm.get_balance() - amount)
+    elif op == SET_BALANCE:
+        Atm.set_balance(atm, amount)
+    elif op == CHANGE_PIN:
+        atm.pin = pin
+
+
+class DurableAtm(Atm):
+    """
+    Atm whose state changes are written ahead to a WriteAheadLog.
+    Logic:
+    - The change and its record happen under the log's lock, so records of
+      one account are in the same order as the changes
+    - Write-ahead: the record is appended first and the account only changes
+      once that succeeded (a value the log cannot hold, e.g. a float amount,
+      raises before anything changed)
+    - Each method returns only after commit(), i.e. once the record is durable
+    - self.pin holds the PIN hash; every PIN argument is hashed before Atm
+      compares it
+    """
+    wal = None  # Assign a WriteAheadLog (shared by all accounts)
+
+    def create_pin(self, user_pin, initial_balance):
+        pin = pin_hash(self.cid, user_pin)
+        with self.wal.lock:
+            lsn = self.wal.append(CREATE_PIN, self.cid, initial_balance, pin)
+            super().create_pin(pin, initial_balance)
+            self.wal.accounts[self.cid] = self
+        self.wal.commit(lsn)
+
+    def change_pin(self, old_pin, new_pin):
+        old, new = pin_hash(self.cid, old_pin), pin_hash(self.cid, new_pin)
+        with self.wal.lock:
+            lsn = self.wal.append(CHANGE_PIN, self.cid, 0, new) if old == self.pin else None
+            super().change_pin(old, new)
+        if lsn is not None:
+            self.wal.commit(lsn)
+
+    def check_balance(self, user_pin):
+        super().check_balance(pin_hash(self.cid, user_pin))
+
+    def withdraw(self, user_pin, amount):
+        pin = pin_hash(self.cid, user_pin)
+        with self.wal.lock:
+            # Same checks as Atm.withdraw: log only what it is going to accept
+            accepted = pin == self.pin and 0 < amount <= self.get_balance()
+            lsn = self.wal.append(WITHDRAW, self.cid, amount) if accepted else None
+            super().withdraw(pin, amount)
+        if lsn is not None:
+            self.wal.commit(lsn)
+
+    def set_balance(self, new_value):
+        with self.wal.lock:
+            valid = isinstance(new_value, int) and new_value >= 0
+            lsn = self.wal.append(SET_BALANCE, self.cid, new_value) if valid else None
+            super().set_balance(new_value)
+        if lsn is not None:
+            self.wal.commit(lsn)
+
+    @classmethod
+    def recover(cls, after_lsn=0, accounts=None):
+        """
+        Rebuilds the accounts (dict cid -> DurableAtm) by replaying the log.
+        Logic:
+        - The result becomes the log's account registry (wal.accounts)
+        - The Atm id allocator (whichever is installed) is moved past the
+          highest recovered cid, so new accounts never reuse an id
+        """
+        accounts = {} if accounts is None else accounts
+        for record in cls.wal.replay(after_lsn):
+            apply_record(accounts, record, cls)
+        if accounts:
+            Atm.advance_counter(max(accounts) + 1)
+        with cls.wal.lock:
+            for cid, atm in cls.wal.accounts.items():  # created since the log was opened
+                accounts.setdefault(cid, atm)
+            cls.wal.accounts = accounts
+        return accounts
+
+
+def benchmark(thread_counts=(1, 16), seconds=2.0):
+    """
+    Withdrawal commits/sec for every sync mode, with 1 and many threads.
+    Logic: Each thread withdraws from its own account in a loop; records per
+    flush shows how many commits shared one write/fsync.
+    """
+    for sync in SYNC_MODES:
+        for threads in thread_counts:
+            with tempfile.TemporaryDirectory() as directory:
+                DurableAtm.wal = wal = WriteAheadLog(directory, sync=sync)
+                commits = [0] * threads
+                stop = time.perf_counter() + seconds
+
+                def worker(t):
+                    atm = DurableAtm()
+                    atm.create_pin("1234", 10 ** 12)
+                    while time.perf_counter() < stop:
+                        atm.withdraw("1234", 1)
+                        commits[t] += 1
+
+                with quiet():
+                    workers = [threading.Thread(target=worker, args=(t,)) for t in range(threads)]
+                    for w in workers:
+                        w.start()
+                    for w in workers:
+                        w.join()
+                wal.close()
+
+                total = sum(commits)
+                print(f"sync={sync:<8} {threads:>2} threads: {total / seconds:>10,.0f} commits/sec, "
+                      f"{(total + threads) / max(wal.flushes, 1):>7,.1f} records/flush")
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as directory:
+        DurableAtm.wal = WriteAheadLog(directory)
+        atm1 = DurableAtm()
+        atm1.create_pin('1234', 1000)  # PIN created successfully
+        atm1.withdraw('1234', 200)  # Withdrawal successful. Balance: $800
+        atm1.change_pin('1234', '4321')  # PIN changed successfully
+        DurableAtm.wal.close()
+
+        # "Restart": rebuild the accounts from the log alone
+        DurableAtm.wal = WriteAheadLog(directory)
+        accounts = DurableAtm.recover()
+        accounts[atm1.cid].check_balance('4321')  # Your balance is: $800
+        DurableAtm.wal.close()
+
+    benchmark()
@@ -0,0 +1,343 @@
+# ============================================================================
+# SNAPSHOTS AND FAST REPLAY FOR ATM STATE ON RESTART
+# ============================================================================
+"""
+DurableAtm.recover (OOPS_26.py) replays the whole write-ahead log, so restart
+time grows with every transaction ever made. SnapshotStore bounds it:
+
+    atm_state/
+      wal/00000000000000000001.wal        <- log segments (OOPS_26.py)
+      wal/00000000000004200001.wal
+      00000000000004200000.snap           <- all accounts as of lsn 4,200,000
+
+Restart = load the latest snapshot + replay only the log records after its
+lsn. The snapshot has one row per account, so restart time depends on the
+number of accounts and on the log tail, not on the length of the history.
+
+Snapshot layout (little endian, fixed-size rows sorted by cid, so the file can
+be memory-mapped and searched with a binary search without loading it):
+    header | magic "ATMSNAP1" (8) | lsn (8) | row count (8) |
+    row    | cid (8) | balance (8) | pin hash (16) |
+
+A snapshot covers the log's account registry (wal.accounts: every account
+whose CREATE_PIN was logged, plus everything recovered), never a caller's
+subset - the log segments it replaces are deleted afterwards, so an account
+missing from it would be lost.
+
+Taking a snapshot only blocks account changes for a moment:
+- "fork": under the log lock, rotate the log and fork(). The child process
+  sees a copy-on-write image of every account frozen at that lsn and writes
+  the file; the parent releases the lock right after fork(). Only allowed
+  while the process has a single thread (forking next to running threads can
+  leave the child stuck on a lock one of them held), so it suits a
+  single-threaded server - not sync="interval", whose syncer is a thread.
+- "copy" (default when other threads run): under the log lock, copy (cid,
+  pin, balance) of every account into a list; a background thread writes
+  the file from that list.
+The file is written under a temporary name, fsynced and renamed, so a crash
+never leaves a half-written snapshot behind. Afterwards the log segments and
+snapshots it makes obsolete are deleted.
+"""
+import mmap
+import os
+import random
+import struct
+import threading
+import time
+
+from OOPS_11 import Atm, quiet
+from OOPS_26 import DurableAtm, WriteAheadLog
+
+SNAP_HEADER = struct.Struct("<8sQQ")  # magic, lsn, row count
+SNAP_ROW = struct.Struct("<Qq16s")  # cid, balance, pin hash
+MAGIC = b"ATMSNAP1"
+
+
+def write_snapshot(path, lsn, rows):
+    """
+    Writes (cid, pin hash, balance) rows as a snapshot file, atomically.
+    """
+    rows = sorted(rows)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(SNAP_HEADER.pack(MAGIC, lsn, len(rows)))
+        pack = SNAP_ROW.pack
+        for start in range(0, len(rows), 65_536):
+            f.write(b"".join(pack(cid, balance, pin)
+                             for cid, pin, balance in rows[start:start + 65_536]))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class SnapshotJob(threading.Thread):
+    """
+    Thread that writes (or waits for) one snapshot.
+    Logic: An error of the job is kept and re-raised by join(), so the
+    caller learns that the snapshot failed (its log segments stay).
+    """
+
+    def __init__(self, target, args):
+        super().__init__(target=target, args=args)
+        self.error = None
+
+    def run(self):
+        try:
+            super().run()
+        except BaseException as e:
+            self.error = e
+
+    def join(self, timeout=None):
+        super().join(timeout)
+        if self.error is not None:
+            raise self.error
+
+
+class Snapshot:
+    """
+    Read-only, memory-mapped view of one snapshot file.
+    Logic: Rows are fixed-size and sorted by cid - row i starts at
+    header + i * row size, and find() is a binary search over the mapping.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self.__view = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, self.lsn, self.count = SNAP_HEADER.unpack_from(self.__view, 0)
+        except struct.error:
+            magic = None  # shorter than a header: incomplete
+        if magic != MAGIC or len(self.__view) != SNAP_HEADER.size + self.count * SNAP_ROW.size:
+            self.__view.close()
+            raise ValueError(f"{path} is not a complete snapshot")
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        """
+        Yields (cid, balance, pin hash) rows in cid order.
+        """
+        body = memoryview(self.__view)[SNAP_HEADER.size:]
+        yield from SNAP_ROW.iter_unpack(body)
+        body.release()
+
+    def row(self, i):
+        return SNAP_ROW.unpack_from(self.__view, SNAP_HEADER.size + i * SNAP_ROW.size)
+
+    def find(self, cid):
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            row = self.row(mid)
+            if row[0] < cid:
+                lo = mid + 1
+            elif row[0] > cid:
+                hi = mid
+            else:
+                return row
+        return None
+
+    def close(self):
+        self.__view.close()
+
+
+class SnapshotStore:
+    """
+    Periodic snapshots of DurableAtm accounts next to their write-ahead log.
+    Logic:
+    - take() snapshots wal.accounts without a long pause
+    - load() rebuilds it from the latest snapshot + the log tail
+    - keep = how many snapshots stay on disk (older ones are deleted)
+    """
+
+    def __init__(self, directory, wal, keep=2):
+        self.directory = directory
+        self.wal = wal
+        self.keep = keep
+        self.last_pause = 0.0  # seconds account changes were blocked by the last take()
+        os.makedirs(directory, exist_ok=True)
+
+    def snapshots(self):
+        names = sorted(f for f in os.listdir(self.directory) if f.endswith(".snap"))
+        return [os.path.join(self.directory, name) for name in names]
+
+    @staticmethod
+    def can_fork():
+        return hasattr(os, "fork") and threading.active_count() == 1
+
+    def take(self, mode=None):
+        """
+        Starts a snapshot of every account of the log and returns a
+        SnapshotJob to join() on (join() raises if the snapshot failed).
+        Logic: Only the rotate + fork (or copy) happens under the log lock.
+        """
+        if mode is None:
+            mode = "fork" if self.can_fork() else "copy"
+        if mode not in ("fork", "copy"):
+            raise ValueError("mode must be 'fork' or 'copy'")
+        if mode == "fork" and not self.can_fork():
+            raise RuntimeError("fork mode needs a single-threaded process; use mode='copy'")
+
+        start = time.perf_counter()
+        with self.wal.lock:
+            lsn = self.wal.rotate()  # every record <= lsn is durable now
+            accounts = self.wal.accounts
+            path = os.path.join(self.directory, f"{lsn:020d}.snap")
+            if mode == "fork":
+                pid = os.fork()
+                if pid == 0:
+                    self.__child(path, lsn, accounts)
+                job = (self.__wait_for_child, (pid,))
+            else:
+                rows = [(cid, atm.pin, atm.get_balance()) for cid, atm in accounts.items()]
+                job = (self.__write, (path, lsn, rows))
+        self.last_pause = time.perf_counter() - start
+
+        worker = SnapshotJob(target=job[0], args=job[1])
+        worker.start()
+        return worker
+
+    @staticmethod
+    def __child(path, lsn, accounts):
+        """
+        Runs in the forked child: writes the snapshot and exits immediately.
+        """
+        status = 1
+        try:
+            write_snapshot(path, lsn, ((cid, atm.pin, atm.get_balance())
+                                       for cid, atm in accounts.items()))
+            status = 0
+        finally:
+            os._exit(status)
+
+    def __wait_for_child(self, pid):
+        _, status = os.waitpid(pid, 0)
+        if status != 0:
+            raise ChildProcessError(f"snapshot child exited with status "
+                                    f"{os.waitstatus_to_exitcode(status)}")
+        self.__cleanup()
+
+    def __write(self, path, lsn, rows):
+        write_snapshot(path, lsn, rows)
+        self.__cleanup()
+
+    def __cleanup(self):
+        """
+        Deletes the log segments covered by the snapshot and old snapshots.
+        """
+        for path in self.snapshots()[:-self.keep]:
+            os.remove(path)
+        oldest = self.snapshots()[0]
+        self.wal.purge(int(os.path.basename(oldest)[:-5]))
+
+    def latest(self):
+        """
+        The newest complete snapshot (or None).
+        """
+        for path in reversed(self.snapshots()):
+            try:
+                return Snapshot(path)
+            except ValueError:
+                continue
+        return None
+
+    def load(self, cls=DurableAtm):
+        """
+        Rebuilds dict cid -> account: latest snapshot + log records after it.
+        """
+        accounts = {}
+        lsn = 0
+        snapshot = self.latest()
+        if snapshot is not None:
+            for cid, balance, pin in snapshot:
+                atm = accounts[cid] = cls.__new__(cls)  # no new id from the counter
+                atm.cid = cid
+                atm.pin = pin
+                Atm.set_balance(atm, balance)
+            lsn = snapshot.lsn
+            snapshot.close()
+        return cls.recover(after_lsn=lsn, accounts=accounts)
+
+
+def benchmark(directory, accounts=100_000, rounds=3, withdrawals_per_round=1_000_000):
+    """
+    Restart time with and without snapshots as the history grows, and how
+    long each snapshot mode blocks withdrawals.
+    """
+    import shutil
+    shutil.rmtree(directory, ignore_errors=True)
+    rng = random.Random(16)
+    wal = WriteAheadLog(os.path.join(directory, "wal"), sync="never")
+    store = SnapshotStore(directory, wal, keep=1)
+    DurableAtm.wal = wal
+
+    with quiet():
+        live = {}
+        for _ in range(accounts):
+            atm = DurableAtm()
+            atm.create_pin("1234", 10 ** 9)
+            live[atm.cid] = atm
+    cids = list(live)
+
+    full_log = os.path.join(directory, "full_history")  # a copy of every segment
+    os.makedirs(full_log)
+
+    for r in range(1, rounds + 1):
+        with quiet():
+            for _ in range(withdrawals_per_round):
+                live[rng.choice(cids)].withdraw("1234", 1)
+        wal.flush()
+        for path in wal.segments():  # before take() purges them
+            shutil.copy(path, full_log)
+
+        for mode in ("copy", "fork"):
+            store.take(mode=mode).join()
+            print(f"round {r}: snapshot ({mode:<4}) blocked withdrawals for "
+                  f"{store.last_pause * 1000:7.1f} ms")
+        history = sum(os.path.getsize(os.path.join(full_log, f)) for f in os.listdir(full_log))
+
+        # Restart from the full log vs. snapshot + tail
+        DurableAtm.wal = WriteAheadLog(full_log, sync="never")
+        start = time.perf_counter()
+        replayed = DurableAtm.recover()
+        full_secs = time.perf_counter() - start
+        DurableAtm.wal.close()
+
+        # Restart: a fresh log handle, so the live registry stays untouched
+        DurableAtm.wal = WriteAheadLog(wal.directory, sync="never")
+        start = time.perf_counter()
+        loaded = SnapshotStore(directory, DurableAtm.wal).load()
+        snap_secs = time.perf_counter() - start
+        DurableAtm.wal.close()
+        DurableAtm.wal = wal
+
+        assert all(loaded[c].get_balance() == live[c].get_balance() == replayed[c].get_balance()
+                   for c in cids)
+        print(f"round {r}: history {history / 2**20:6.1f} MB - restart: full replay "
+              f"{full_secs:5.2f} s, snapshot + tail {snap_secs:5.2f} s")
+    wal.close()
+
+
+if __name__ == "__main__":
+    import tempfile
+
+    directory = os.path.join(tempfile.gettempdir(), "atm_state")
+    DurableAtm.wal = WriteAheadLog(os.path.join(directory, "wal"))
+    store = SnapshotStore(directory, DurableAtm.wal)
+    accounts = store.load()  # empty on the first run
+
+    atm1 = DurableAtm()
+    atm1.create_pin('1234', 1000)  # registered in DurableAtm.wal.accounts
+    store.take().join()
+    atm1.withdraw('1234', 200)  # Withdrawal successful. Balance: $800
+    DurableAtm.wal.close()
+
+    # Restart: snapshot (balance 1000) + log tail (the withdrawal)
+    DurableAtm.wal = WriteAheadLog(os.path.join(directory, "wal"))
+    accounts = SnapshotStore(directory, DurableAtm.wal).load()
+    accounts[atm1.cid].check_balance('1234')  # Your balance is: $800
+    DurableAtm.wal.close()
+
+    benchmark(os.path.join(tempfile.gettempdir(), "atm_state_bench"))
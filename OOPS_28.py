@@ -0,0 +1,390 @@
+# ============================================================================
+# ASYNCIO ATM NETWORK SERVICE WITH REQUEST PIPELINING
+# ============================================================================
+"""
+AtmServer puts the Atm accounts of an AccountService (OOPS_25.py) behind a
+local TCP port. One event loop serves every connection - no thread per client.
+
+Frames (little endian), each prefixed with its length:
+    request  | length (4) | request id (4) | op (1) | cid (8) | amount (8) | pin (8) | new pin (8) |
+    response | length (4) | request id (4) | status (1) | balance (8) |
+
+    op  CHECK_BALANCE  pin                 -> balance
+        WITHDRAW       pin, amount         -> balance after the withdrawal
+        CHANGE_PIN     pin, new pin
+PINs are up to 8 bytes, zero padded.
+
+- Pipelining: a client may send any number of requests without waiting for
+  the answers; the request id pairs every response with its request.
+- Batched responses: the server handles every complete frame it has received
+  and answers all of them with one write() (and one drain()).
+- The client side batches too: frames queued during one event loop iteration
+  go out in a single write. ClientPool spreads requests over a few
+  connections, so thousands of terminals share a handful of sockets.
+"""
+import asyncio
+import itertools
+import multiprocessing
+import random
+import struct
+import time
+
+from OOPS_22 import LatencyHistogram
+from OOPS_25 import OK as SERVICE_OK
+from OOPS_25 import AccountService
+
+LENGTH = struct.Struct("<I")
+REQUEST = struct.Struct("<IBQq8s8s")  # request id, op, cid, amount, pin, new pin
+RESPONSE = struct.Struct("<IBq")  # request id, status, balance
+
+CHECK_BALANCE = 1
+WITHDRAW = 2
+CHANGE_PIN = 3
+
+OK = 0
+INCORRECT_PIN = 1
+INVALID_AMOUNT = 2
+INSUFFICIENT_FUNDS = 3
+UNKNOWN_ACCOUNT = 4
+BAD_REQUEST = 5
+STATUS_NAMES = {
+    OK: "ok",
+    INCORRECT_PIN: "Incorrect PIN",
+    INVALID_AMOUNT: "Invalid amount",
+    INSUFFICIENT_FUNDS: "Insufficient funds",
+    UNKNOWN_ACCOUNT: "Unknown account",
+    BAD_REQUEST: "Bad request",
+}
+STATUS_CODES = {name: code for code, name in STATUS_NAMES.items()}
+STATUS_CODES[SERVICE_OK] = OK
+STATUS_CODES["Incorrect old PIN"] = INCORRECT_PIN
+
+
+def encode_pin(pin):
+    data = str(pin).encode()
+    if len(data) > 8:
+        raise ValueError("PIN longer than 8 bytes")
+    return data
+
+
+def split_frames(buf, size):
+    """
+    Yields (start, end) of every complete frame body in buf, and finally
+    the offset of the first incomplete frame.
+    Logic: Every frame must be `size` bytes long; any other length prefix
+    raises ValueError as soon as it is seen, so a bogus length never makes
+    the caller buffer more data.
+    """
+    pos = 0
+    while len(buf) - pos >= LENGTH.size:
+        (length,) = LENGTH.unpack_from(buf, pos)
+        if length != size:
+            raise ValueError(f"frame length {length}, expected {size}")
+        end = pos + LENGTH.size + length
+        if end > len(buf):
+            break
+        yield pos + LENGTH.size, end
+        pos = end
+    yield pos, None
+
+
+class AtmServer:
+    """
+    Asyncio TCP front end of an AccountService.
+    Logic: Every connection reads whatever arrived, answers all complete
+    requests in one write, and waits for the socket to drain (backpressure).
+    A frame with the wrong length closes the connection (after answering the
+    requests before it); the client then fails its pending requests.
+    """
+
+    def __init__(self, service):
+        self.service = service
+        self.requests = 0
+        self.__server = None
+
+    async def start(self, host="127.0.0.1", port=0):
+        self.__server = await asyncio.start_server(self.__handle, host, port)
+        return self.__server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self):
+        async with self.__server:
+            await self.__server.serve_forever()
+
+    async def close(self):
+        self.__server.close()
+        await self.__server.wait_closed()
+
+    def handle_request(self, body):
+        """
+        Decodes one request body and returns its encoded response frame.
+        Logic: A malformed body is answered with BAD_REQUEST under its request
+        id; a body too short to even hold an id raises ValueError (nobody could
+        be answered, so the connection gets closed).
+        """
+        if len(body) != REQUEST.size:
+            if len(body) < LENGTH.size:
+                raise ValueError("frame too short for a request id")
+            (request_id,) = LENGTH.unpack_from(body)  # same layout: 4-byte id first
+            return LENGTH.pack(RESPONSE.size) + RESPONSE.pack(request_id, BAD_REQUEST, 0)
+        request_id, op, cid, amount, pin, new_pin = REQUEST.unpack(body)
+        try:
+            pin = pin.rstrip(b"\0").decode()
+            new_pin = new_pin.rstrip(b"\0").decode()
+        except UnicodeDecodeError:
+            return LENGTH.pack(RESPONSE.size) + RESPONSE.pack(request_id, BAD_REQUEST, 0)
+        service = self.service
+        balance = 0
+
+        if op == CHECK_BALANCE:
+            result, balance = service.check_balance(cid, pin)
+            status = STATUS_CODES[result]
+        elif op == WITHDRAW:
+            status = STATUS_CODES[service.withdraw(cid, pin, amount)]
+            if status == OK:
+                balance = service.balance(cid, pin)
+        elif op == CHANGE_PIN:
+            status = STATUS_CODES[service.change_pin(cid, pin, new_pin)]
+        else:
+            status = BAD_REQUEST
+
+        self.requests += 1
+        return LENGTH.pack(RESPONSE.size) + RESPONSE.pack(request_id, status, balance or 0)
+
+    async def __handle(self, reader, writer):
+        buf = bytearray()
+        try:
+            while True:
+                data = await reader.read(65_536)
+                if not data:
+                    break
+                buf += data
+                responses = bytearray()
+                unanswerable = False
+                try:
+                    for start, end in split_frames(buf, REQUEST.size):
+                        if end is None:
+                            del buf[:start]
+                            break
+                        responses += self.handle_request(bytes(buf[start:end]))
+                except ValueError:
+                    unanswerable = True
+                if responses:
+                    writer.write(responses)  # one write for the whole batch
+                    await writer.drain()
+                if unanswerable:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+class AtmClient:
+    """
+    One pipelined connection to an AtmServer.
+    Logic:
+    - Every request gets a future, stored under its request id
+    - Frames are queued and written once per event loop iteration
+    - A reader task resolves futures as responses arrive, in any order
+    """
+    HIGH_WATER = 1 << 20
+
+    def __init__(self, reader, writer):
+        self.__reader = reader
+        self.__writer = writer
+        self.__ids = itertools.count(1)
+        self.__pending = {}  # request id -> future
+        self.__out = bytearray()
+        self.__flush_scheduled = False
+        self.__reading = asyncio.get_running_loop().create_task(self.__read_loop())
+
+    @classmethod
+    async def connect(cls, host, port):
+        reader, writer = await asyncio.open_connection(host, port)
+        return cls(reader, writer)
+
+    def __len__(self):
+        return len(self.__pending)
+
+    async def request(self, op, cid, user_pin, amount=0, new_pin=""):
+        """
+        Sends one request and returns (status, balance).
+        Logic: Raises ConnectionError once the reader task has ended - nothing
+        would ever resolve the future.
+        """
+        if self.__reading.done():
+            raise ConnectionError("connection to the ATM service lost")
+        request_id = next(self.__ids) & 0xFFFFFFFF
+        # Frame first: a bad PIN or amount raises before anything is pending
+        body = REQUEST.pack(request_id, op, cid, amount, encode_pin(user_pin), encode_pin(new_pin))
+        future = asyncio.get_running_loop().create_future()
+        self.__pending[request_id] = future
+
+        self.__out += LENGTH.pack(len(body))
+        self.__out += body
+        if not self.__flush_scheduled:
+            self.__flush_scheduled = True
+            asyncio.get_running_loop().call_soon(self.__flush)
+        if self.__writer.transport.get_write_buffer_size() > self.HIGH_WATER:
+            await self.__writer.drain()
+        return await future
+
+    def __flush(self):
+        self.__flush_scheduled = False
+        if self.__out:
+            self.__writer.write(self.__out)
+            self.__out = bytearray()
+
+    async def __read_loop(self):
+        buf = bytearray()
+        try:
+            while True:
+                data = await self.__reader.read(65_536)
+                if not data:
+                    break
+                buf += data
+                for start, end in split_frames(buf, RESPONSE.size):
+                    if end is None:
+                        del buf[:start]
+                        break
+                    request_id, status, balance = RESPONSE.unpack_from(buf, start)
+                    future = self.__pending.pop(request_id, None)
+                    if future is not None and not future.done():
+                        future.set_result((status, balance))
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            for future in self.__pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("connection to the ATM service lost"))
+            self.__pending.clear()
+
+    async def check_balance(self, cid, user_pin):
+        return await self.request(CHECK_BALANCE, cid, user_pin)
+
+    async def withdraw(self, cid, user_pin, amount):
+        return await self.request(WITHDRAW, cid, user_pin, amount)
+
+    async def change_pin(self, cid, old_pin, new_pin):
+        return await self.request(CHANGE_PIN, cid, old_pin, new_pin=new_pin)
+
+    async def close(self):
+        self.__flush()
+        self.__writer.close()
+        await self.__writer.wait_closed()
+        await self.__reading
+
+
+class ClientPool:
+    """
+    A fixed number of AtmClient connections shared by many callers.
+    Logic: Each request goes to the connection with the fewest requests in flight.
+    """
+
+    def __init__(self, clients):
+        self.__clients = clients
+
+    @classmethod
+    async def connect(cls, host, port, size=4):
+        return cls(list(await asyncio.gather(*(AtmClient.connect(host, port) for _ in range(size)))))
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    def __pick(self):
+        return min(self.__clients, key=len)
+
+    async def check_balance(self, cid, user_pin):
+        return await self.__pick().check_balance(cid, user_pin)
+
+    async def withdraw(self, cid, user_pin, amount):
+        return await self.__pick().withdraw(cid, user_pin, amount)
+
+    async def change_pin(self, cid, old_pin, new_pin):
+        return await self.__pick().change_pin(cid, old_pin, new_pin)
+
+    async def close(self):
+        await asyncio.gather(*(c.close() for c in self.__clients))
+
+
+def _serve(accounts, ready):
+    """
+    Server process for the benchmark: opens the accounts and reports
+    (port, first cid, last cid) through the ready queue.
+    """
+    async def main():
+        service = AccountService()
+        cids = [service.open("1234", 10 ** 12) for _ in range(accounts)]
+        server = AtmServer(service)
+        port = await server.start()
+        ready.put((port, cids[0], cids[-1]))
+        await server.serve_forever()
+
+    asyncio.run(main())
+
+
+async def _load(port, first, last, terminals, requests_per_terminal, connections, seed):
+    histogram = LatencyHistogram()
+    clock = time.perf_counter_ns
+
+    async def terminal(t):
+        rng = random.Random(seed + t)
+        for _ in range(requests_per_terminal):
+            cid = rng.randint(first, last)
+            t0 = clock()
+            if rng.random() < 0.5:
+                status, _ = await pool.check_balance(cid, "1234")
+            else:
+                status, _ = await pool.withdraw(cid, "1234", rng.randint(1, 100))
+            histogram.record(clock() - t0)
+            assert status == OK, STATUS_NAMES[status]
+
+    async with await ClientPool.connect("127.0.0.1", port, connections) as pool:
+        start = time.perf_counter()
+        await asyncio.gather(*(terminal(t) for t in range(terminals)))
+        secs = time.perf_counter() - start
+    return histogram, secs
+
+
+def benchmark(terminals=(100, 1_000, 5_000), requests=200_000, accounts=10_000, connections=4):
+    """
+    Load generator: many simulated terminals, each sending requests one
+    after another, over a small client connection pool to a server process.
+    """
+    ready = multiprocessing.Queue()
+    server = multiprocessing.Process(target=_serve, args=(accounts, ready), daemon=True)
+    server.start()
+    port, first, last = ready.get()
+    try:
+        for count in terminals:
+            histogram, secs = asyncio.run(
+                _load(port, first, last, count, requests // count, connections, seed=17))
+            stats = histogram.summary()
+            print(f"{count:>6,} terminals: {histogram.count / secs:>9,.0f} req/sec  "
+                  f"p50 {stats['p50_us'] / 1000:6.2f} ms  p99 {stats['p99_us'] / 1000:6.2f} ms  "
+                  f"max {stats['max_us'] / 1000:6.2f} ms")
+    finally:
+        server.terminate()
+        server.join()
+
+
+if __name__ == "__main__":
+    async def demo():
+        service = AccountService()
+        cid = service.open("1234", 1000)
+        server = AtmServer(service)
+        port = await server.start()
+        async with await ClientPool.connect("127.0.0.1", port, size=2) as pool:
+            print(await pool.check_balance(cid, "1234"))  # (0, 1000)
+            # Pipelined: both requests are in flight at the same time
+            print(await asyncio.gather(pool.withdraw(cid, "1234", 200),
+                                       pool.withdraw(cid, "0000", 200)))
+            # [(0, 800), (1, 0)] -> ok, Incorrect PIN
+            print(await pool.change_pin(cid, "1234", "4321"))  # (0, 0)
+        await server.close()
+
+    asyncio.run(demo())
+    benchmark()
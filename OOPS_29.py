@@ -0,0 +1,352 @@
+# ============================================================================
+# STREAMING SLIDING-WINDOW WITHDRAWAL STATS FOR ATM
+# ============================================================================
+"""
+WithdrawalStats keeps live withdrawal statistics up to date as withdrawals
+happen, instead of recomputing them from a history on every query:
+
+- Global: withdrawals per minute, sum and average amount over the window
+- Per account: withdrawals and outflow over the window (estimated)
+- Top-k accounts by outflow over the window (heavy hitters)
+
+Sliding windows are bucketed ring buffers. A 60 s window with 12 buckets is
+12 slots of 5 s; a new slot starts every 5 s and the oldest one is subtracted
+from the running totals at that moment, so adding and querying are O(1):
+
+    [ b0 | b1 | b2 | ... | b11 ]   totals = sum of live buckets
+           ^ current
+
+Per-account numbers would need one window per account (unbounded memory),
+so they come from a Count-Min sketch instead: depth rows of width counters,
+every account hashed to one counter per row. An account's estimate is the
+smallest of its depth counters - never too low, too high by at most
+~ e / width of the window total with probability 1 - e^-depth. Each bucket
+has its own sketch, so expiring a bucket subtracts exactly what it added.
+
+Top-k keeps a bounded set of candidate accounts: an account enters when its
+estimate beats the smallest candidate (the Count-Min + heap method).
+
+Memory is fixed by window, width and depth - it does not depend on how many
+accounts exist.
+"""
+import heapq
+import random
+import time
+from array import array
+
+import numpy as np
+
+from OOPS_11 import Atm
+
+PRIME = (1 << 61) - 1  # Mersenne prime for the row hashes
+
+
+class SlidingWindow:
+    """
+    Count and sum of values over the last `window` seconds.
+    Logic: Ring of buckets plus running totals; buckets that fall out of the
+    window are subtracted once, when the clock passes them.
+    """
+
+    def __init__(self, window=60.0, buckets=12, clock=time.monotonic):
+        self.window = window
+        self.bucket_secs = window / buckets
+        self.clock = clock
+        self.__counts = [0] * buckets
+        self.__sums = [0] * buckets
+        self.__slot = int(clock() / self.bucket_secs)  # absolute bucket number
+        self.count = 0
+        self.total = 0
+
+    def advance(self, now=None):
+        """
+        Expires the buckets the clock has moved past.
+        """
+        slot = int((self.clock() if now is None else now) / self.bucket_secs)
+        size = len(self.__counts)
+        for expired in range(self.__slot + 1, min(slot, self.__slot + size) + 1):
+            i = expired % size
+            self.count -= self.__counts[i]
+            self.total -= self.__sums[i]
+            self.__counts[i] = 0
+            self.__sums[i] = 0
+        self.__slot = max(self.__slot, slot)
+
+    def add(self, value, now=None):
+        self.advance(now)
+        i = self.__slot % len(self.__counts)
+        self.__counts[i] += 1
+        self.__sums[i] += value
+        self.count += 1
+        self.total += value
+
+    def average(self):
+        return self.total / self.count if self.count else 0.0
+
+    def per_minute(self):
+        return self.count * 60 / self.window
+
+
+class WindowedCountMin:
+    """
+    Count-Min sketch over a sliding window: one (count, amount) sketch per
+    bucket plus their running sum.
+    Logic: add() updates the current bucket and the sum in O(depth); when a
+    bucket expires its counters are subtracted from the sum and zeroed in one
+    NumPy pass over views of the same arrays (no per-cell Python loop).
+    """
+
+    def __init__(self, width=4096, depth=4, window=60.0, buckets=12, clock=time.monotonic,
+                 seed=18):
+        self.width = width
+        self.depth = depth
+        self.bucket_secs = window / buckets
+        self.clock = clock
+        rng = random.Random(seed)
+        self.__hashes = [(rng.randrange(1, PRIME), rng.randrange(PRIME)) for _ in range(depth)]
+
+        # array('q') for fast per-cell updates in add(), NumPy views of the same
+        # memory for the bulk subtract/zero when a bucket expires
+        cells = width * depth
+        self.__bucket_counts = [array("q", bytes(8 * cells)) for _ in range(buckets)]
+        self.__bucket_amounts = [array("q", bytes(8 * cells)) for _ in range(buckets)]
+        self.__counts = array("q", bytes(8 * cells))  # sum over live buckets
+        self.__amounts = array("q", bytes(8 * cells))
+        self.__bucket_views = [(np.frombuffer(c, np.int64), np.frombuffer(a, np.int64))
+                               for c, a in zip(self.__bucket_counts, self.__bucket_amounts)]
+        self.__total_views = (np.frombuffer(self.__counts, np.int64),
+                              np.frombuffer(self.__amounts, np.int64))
+        self.__slot = int(clock() / self.bucket_secs)
+
+    def cells(self, key):
+        width = self.width
+        return [row * width + (a * key + b) % PRIME % width
+                for row, (a, b) in enumerate(self.__hashes)]
+
+    def advance(self, now=None):
+        slot = int((self.clock() if now is None else now) / self.bucket_secs)
+        size = len(self.__bucket_counts)
+        total_counts, total_amounts = self.__total_views
+        for expired in range(self.__slot + 1, min(slot, self.__slot + size) + 1):
+            counts, amounts = self.__bucket_views[expired % size]
+            np.subtract(total_counts, counts, out=total_counts)
+            np.subtract(total_amounts, amounts, out=total_amounts)
+            counts.fill(0)
+            amounts.fill(0)
+        self.__slot = max(self.__slot, slot)
+
+    def add(self, key, amount, now=None):
+        """
+        Records one event of `amount` for key; returns the key's new
+        (count, amount) estimate.
+        """
+        self.advance(now)
+        i = self.__slot % len(self.__bucket_counts)
+        bucket_counts, bucket_amounts = self.__bucket_counts[i], self.__bucket_amounts[i]
+        counts, amounts = self.__counts, self.__amounts
+        best_count = best_amount = None
+        for c in self.cells(key):
+            bucket_counts[c] += 1
+            bucket_amounts[c] += amount
+            counts[c] += 1
+            amounts[c] += amount
+            if best_count is None or counts[c] < best_count:
+                best_count = counts[c]
+            if best_amount is None or amounts[c] < best_amount:
+                best_amount = amounts[c]
+        return best_count, best_amount
+
+    def estimate(self, key, now=None):
+        self.advance(now)
+        cells = self.cells(key)
+        return min(self.__counts[c] for c in cells), min(self.__amounts[c] for c in cells)
+
+    def nbytes(self):
+        per_table = 8 * self.width * self.depth
+        return per_table * (2 * len(self.__bucket_counts) + 2)
+
+
+class WithdrawalStats:
+    """
+    Incrementally maintained withdrawal statistics (global, per account, top-k).
+    Logic:
+    - record() is called once per successful withdrawal; amounts are counted
+      in whole units (rounded) by the sketch
+    - __candidates: account -> outflow estimate, at most `candidates` accounts;
+      __heap holds (estimate, account) entries, stale ones are skipped lazily
+    - Estimates shrink as the window slides, so before a newcomer is compared
+      with the smallest candidate, that candidate is re-estimated (and dropped
+      if its withdrawals all left the window)
+    """
+
+    def __init__(self, window=60.0, buckets=12, width=4096, depth=4, candidates=64,
+                 clock=time.monotonic):
+        self.clock = clock
+        self.window = SlidingWindow(window, buckets, clock)
+        self.sketch = WindowedCountMin(width, depth, window, buckets, clock)
+        self.capacity = candidates
+        self.__candidates = {}
+        self.__heap = []
+        self.__fresh = set()  # candidates re-estimated since the current bucket began
+        self.__fresh_slot = None
+
+    def record(self, cid, amount, now=None):
+        now = self.clock() if now is None else now
+        amount = round(amount)  # validated before anything is updated
+        self.window.add(amount, now)
+        _, outflow = self.sketch.add(cid, amount, now)
+        self.__offer(cid, outflow, now)
+
+    def __smallest(self, now):
+        """
+        The smallest candidate on top of the heap, with a current estimate;
+        candidates whose estimate fell to 0 are dropped on the way.
+        """
+        candidates, heap = self.__candidates, self.__heap
+        slot = int(now / self.sketch.bucket_secs)
+        if slot != self.__fresh_slot:
+            # Estimates only shrink when a bucket expires: verify again
+            self.__fresh_slot = slot
+            self.__fresh.clear()
+        while heap:
+            estimate, cid = heap[0]
+            if candidates.get(cid) != estimate:
+                heapq.heappop(heap)  # stale entry
+                continue
+            if cid in self.__fresh:
+                return heap[0]
+            current = self.sketch.estimate(cid, now)[1]
+            if current == estimate:
+                self.__fresh.add(cid)
+                return heap[0]
+            if current <= 0:
+                heapq.heappop(heap)
+                del candidates[cid]
+                self.__fresh.discard(cid)
+            else:
+                candidates[cid] = current
+                heapq.heapreplace(heap, (current, cid))
+        return None
+
+    def __offer(self, cid, outflow, now):
+        candidates = self.__candidates
+        if cid not in candidates and len(candidates) >= self.capacity:
+            smallest = self.__smallest(now)
+            if len(candidates) >= self.capacity:
+                if smallest[0] >= outflow:
+                    return
+                heapq.heappop(self.__heap)
+                del candidates[smallest[1]]
+                self.__fresh.discard(smallest[1])
+
+        candidates[cid] = outflow
+        heapq.heappush(self.__heap, (outflow, cid))
+        if len(self.__heap) > 4 * self.capacity:
+            self.__heap = [(v, c) for c, v in candidates.items()]
+            heapq.heapify(self.__heap)
+
+    def summary(self, now=None):
+        """
+        Global stats over the window.
+        """
+        self.window.advance(now)
+        return {
+            "withdrawals": self.window.count,
+            "per_minute": self.window.per_minute(),
+            "sum": self.window.total,
+            "average": self.window.average(),
+        }
+
+    def account(self, cid, now=None):
+        """
+        (withdrawals, outflow) estimate of one account over the window.
+        """
+        return self.sketch.estimate(cid, now)
+
+    def top(self, k=10, now=None):
+        """
+        Up to k (outflow, cid) pairs, largest first, re-estimated right now
+        (candidates whose withdrawals expired drop out).
+        """
+        self.sketch.advance(now)
+        current = [(self.sketch.estimate(cid)[1], cid) for cid in self.__candidates]
+        return heapq.nlargest(k, (item for item in current if item[0] > 0))
+
+    def nbytes(self):
+        return self.sketch.nbytes()
+
+
+class WithdrawalStatsMixin:
+    """
+    Cooperative mixin that feeds every successful withdrawal into a
+    shared WithdrawalStats.
+    """
+    withdrawal_stats = None  # Assign a WithdrawalStats
+
+    def withdraw(self, user_pin, amount):
+        before = self.get_balance()
+        super().withdraw(user_pin, amount)
+        spent = before - self.get_balance()
+        if spent:
+            self.withdrawal_stats.record(self.cid, spent)
+
+
+class TrackedAtm(WithdrawalStatsMixin, Atm):
+    """Atm whose withdrawals show up in live statistics"""
+
+
+def benchmark(n=1_000_000, accounts=1_000_000, k=10, seed=18):
+    """
+    Records n withdrawals from a skewed account distribution (a few heavy
+    accounts) and compares the streamed top-k with an exact count.
+    Logic: A fake clock runs the stream over 10 minutes, so the window slides.
+    """
+    now = [0.0]
+    stats = WithdrawalStats(window=60.0, clock=lambda: now[0])
+    rng = random.Random(seed)
+    heavy = [rng.randrange(accounts) for _ in range(20)]
+    events = []
+    for i in range(n):
+        cid = rng.choice(heavy) if rng.random() < 0.05 else rng.randrange(accounts)
+        events.append((i * 600 / n, cid, rng.randint(20, 500)))
+
+    start = time.perf_counter()
+    for ts, cid, amount in events:
+        now[0] = ts
+        stats.record(cid, amount, ts)
+    secs = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(1_000):
+        stats.summary()
+        stats.top(k)
+    query_us = (time.perf_counter() - start) / 1_000 * 1e6
+
+    exact = {}
+    for ts, cid, amount in events:
+        if ts > now[0] - 60:
+            exact[cid] = exact.get(cid, 0) + amount
+    true_top = {cid for cid, _ in heapq.nlargest(k, exact.items(), key=lambda item: item[1])}
+    found = {cid for _, cid in stats.top(k)}
+
+    summary = stats.summary()
+    print(f"recorded   : {n:,} withdrawals over {accounts:,} accounts, "
+          f"{n / secs:,.0f} withdrawals/sec")
+    print(f"window     : {summary['withdrawals']:,} withdrawals, "
+          f"{summary['per_minute']:,.0f}/min, average ${summary['average']:,.2f}")
+    print(f"queries    : {query_us:,.1f} us for summary + top-{k}")
+    print(f"top-{k} recall: {len(found & true_top)}/{k}, sketch memory {stats.nbytes() / 2**20:.1f} MB")
+
+
+if __name__ == "__main__":
+    TrackedAtm.withdrawal_stats = WithdrawalStats()
+    atm1 = TrackedAtm()
+    atm1.create_pin('1234', 1000)
+    atm1.withdraw('1234', 200)
+    atm1.withdraw('1234', 100)
+    atm1.withdraw('0000', 100)  # Incorrect PIN (not counted)
+    print(TrackedAtm.withdrawal_stats.summary())  # 2 withdrawals, sum 300
+    print(TrackedAtm.withdrawal_stats.account(atm1.cid))  # (2, 300)
+    print(TrackedAtm.withdrawal_stats.top(3))  # [(300, cid of atm1)]
+
+    benchmark()
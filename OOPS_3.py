@@ -1,26 +1,31 @@
+from OOPS_17 import IdAllocator
+
+
 class chatbook:
     """
     A simple social media application class that simulates user registration,
     login, posting, and messaging functionality.
     """
 
-    # Class variable (private) - shared across all instances to track unique user IDs
+    # Class variable (private) - shared across all instances to hand out unique user IDs
     # The double underscore (__) makes it name-mangled for privacy
-    __user_id = 1
+    # IdAllocator gives every thread its own block of IDs, so creating users from
+    # many threads never hands out the same ID twice (see OOPS_17.py)
+    __user_id = IdAllocator(start=1)
 
-    def __init__(self):
+    def __init__(self, commands=None, user_id=None, output=None):
         """
         Constructor method that initializes a new user instance.
         Logic:
-        - Assigns a unique ID to each user by using the class variable __user_id
-        - Increments the class variable so the next user gets a different ID
+        - Assigns a unique ID to each user from the class-level ID allocator
+        - The allocator moves on, so the next user gets a different ID
+        - An ID reserved earlier with reserve_ids() can be passed in instead
         - Initializes user attributes with default values
+        - Reads commands from input() unless a scripted stream is passed
+        - Shows messages with print() unless another output function is passed
         """
-        # Assign current class-level user_id to this instance
-        self.id = chatbook.__user_id
-        
-        # Increment class-level user_id for next user (auto-increment pattern)
-        chatbook.__user_id += 1
+        # Assign the next class-level user_id to this instance (thread-safe auto-increment)
+        self.id = chatbook.new_id() if user_id is None else user_id
 
         # Private attribute for user's display name (name-mangled with __)
         self.__name = "Default User"
@@ -29,15 +34,61 @@ class chatbook:
         self.username = ''  # Stores email/username
         self.password = ''  # Stores password (should be hashed in production)
         self.loggedin = False  # Tracks login state
+
+        # Source of every answer the user types (menu choice, email, message...)
+        # input() by default, or the next line of a scripted command stream
+        self.__input = input if commands is None else chatbook.scripted_input(commands)
+
+        # Destination of every message shown to the user (print() by default)
+        self.__output = print if output is None else output
         # self.menu()
 
     @staticmethod
     def get_id():
         """
         Static method to retrieve the current value of the class-level user_id counter.
-        Logic: Returns the next ID that will be assigned to a new user
+        Logic: Returns the next ID that will be assigned to a new user (by this thread)
         """
-        return chatbook.__user_id
+        return chatbook.__user_id.peek()
+
+    @staticmethod
+    def scripted_input(commands):
+        """
+        Static method that turns a scripted command stream into an input() replacement.
+        Logic:
+        - Accepts any iterable of strings, e.g. a list or an open file (one answer per line)
+        - Each call returns the next answer with its trailing newline removed
+        - Raises EOFError once the stream is exhausted, exactly like input() does
+        """
+        lines = iter(commands)
+
+        def read(prompt=""):
+            try:
+                return next(lines).rstrip("\r\n")
+            except StopIteration:
+                raise EOFError("scripted command stream exhausted") from None
+
+        return read
+
+    def ask(self, prompt):
+        """
+        Reads one answer from the user.
+        Logic:
+        - Shows the prompt and returns what the user typed (input() by default)
+        - With a scripted command stream, returns the next line of the stream instead
+        - Handlers (and subclasses) read through this so every answer has one source
+        """
+        return self.__input(prompt)
+
+    def say(self, text):
+        """
+        Shows one message to the user.
+        Logic:
+        - print() by default, or the output function passed to the constructor
+        - Handlers (and subclasses) write through this so tests and benchmarks
+          can capture or discard everything the app shows
+        """
+        self.__output(text)
 
     @staticmethod
     def set_id(val):
@@ -45,7 +96,31 @@ class chatbook:
         Static method to manually set the class-level user_id counter.
         Logic: Allows resetting or adjusting the ID counter (useful for testing)
         """
-        chatbook.__user_id = val
+        chatbook.__user_id.reset(val)
+
+    @staticmethod
+    def new_id():
+        """
+        Static method to take the next user ID from the class-level allocator.
+        Logic: Used by the constructor and by other user record types (OOPS_23.py)
+        """
+        return chatbook.__user_id.next_id()
+
+    @staticmethod
+    def reserve_ids(count):
+        """
+        Static method to reserve a block of consecutive user IDs in one step.
+        Logic: Returns a range of IDs nobody else will get (used for bulk imports)
+        """
+        return chatbook.__user_id.reserve(count)
+
+    @staticmethod
+    def set_id_allocator(allocator):
+        """
+        Static method to replace the class-level ID allocator.
+        Logic: e.g. IdAllocator(path=...) so IDs survive restarts
+        """
+        chatbook.__user_id = allocator
 
     def get_name(self):
         """
@@ -61,36 +136,39 @@ class chatbook:
         """
         self.__name = value
 
-    def menu(self):
+    def menu(self, commands=None):
         """
         Main menu display and navigation logic.
         Logic:
         - Displays menu options to user
-        - Takes user input and routes to appropriate method
-        - Acts as the central navigation hub for the application
+        - Takes user input and routes to appropriate method through the dispatch table
+        - Loops instead of recursing, so the stack depth stays constant however
+          many actions a session performs
+        - Optionally replays a scripted command stream (iterable or file) instead of input()
+        - Stops on the exit option or when the command stream runs out
+        - Returns the number of actions performed (useful for measuring throughput)
         """
-        user_input = input(""""Welcome to Chatbook !! How would you like to proceed?
-                           
-                           1. Press 1 to Sign Up
-                           2. Press 2 to Sign In
-                           3. Press 3 to Write a Post
-                           4. Press 4 to Message a Friend
-                           5. Press 5 to Exit
-                           \n
-                           -> """)
-        
-        # Route user to appropriate functionality based on input
-        if user_input == "1":
-            self.signup()
-        elif user_input == "2":
-            self.signin()
-        elif user_input == "3":
-            self.my_post()
-        elif user_input == "4":
-            self.sendmsg()
-        else:
-            print("Logged out sucessfully")
-            exit()  # Any other input exits the application
+        if commands is not None:
+            self.__input = chatbook.scripted_input(commands)
+
+        actions = 0
+        while True:
+            try:
+                user_input = self.ask(chatbook.__menu_prompt)
+
+                # Route user to appropriate functionality based on input
+                handler = chatbook.__dispatch.get(user_input)
+                if handler is None:
+                    self.say("Logged out sucessfully")
+                    break  # Any other input exits the application
+
+                getattr(self, handler)()
+                self.say("\n")
+                actions += 1
+            except EOFError:
+                break  # No more commands to read
+
+        return actions
 
     def signup(self):
         """
@@ -99,19 +177,15 @@ class chatbook:
         - Collects email and password from user
         - Stores credentials in instance attributes
         - Confirms successful signup
-        - Returns to main menu for next action
         """
-        email = input("Enter your email here -> ")
-        pwd = input("Setup your password here -> ")
+        email = self.ask("Enter your email here -> ")
+        pwd = self.ask("Setup your password here -> ")
 
         # Store credentials in instance variables
         self.username = email
         self.password = pwd
 
-        print("You have signed up successfully !!")
-
-        print("\n")
-        self.menu()  # Recursive call to display menu again
+        self.say("You have signed up successfully !!")
 
     def signin(self):
         """
@@ -121,44 +195,55 @@ class chatbook:
         - If signed up, prompts for login credentials
         - Validates credentials by comparing with stored values
         - Sets loggedin flag to True on successful authentication
-        - Returns to menu regardless of outcome
         """
         # Check if user has registered first
         if self.username == '' and self.password == '':
-            print("Please signup first by pressing 1 in the main menu")
+            self.say("Please signup first by pressing 1 in the main menu")
         else:
             # Prompt for credentials
-            uname = input("Enter your email/username here -> ")
-            pwd = input("Enter your password here -> ")
+            uname = self.ask("Enter your email/username here -> ")
+            pwd = self.ask("Enter your password here -> ")
 
             # Validate credentials by exact string match
             if self.username == uname and self.password == pwd:
-                print("You have signed in successfully !!")
+                self.say("You have signed in successfully !!")
                 self.loggedin = True  # Set authentication flag
             else:
-                print("Please input correct credentials..")
+                self.say("Please input correct credentials..")
 
-        print("\n")
-        self.menu()  # Return to menu
+    def is_authorized(self):
+        """
+        Authorization check used before posting or messaging.
+        Logic:
+        - The base class trusts the loggedin flag set by signin()
+        - Subclasses/mixins can check something else (e.g. a session token)
+        """
+        return self.loggedin == True
 
     def my_post(self):
         """
         Post creation logic.
         Logic:
         - Checks if user is logged in before allowing post
-        - If logged in, accepts post content and displays confirmation
+        - If logged in, accepts post content and hands it to publish()
         - If not logged in, prompts user to sign in first
-        - Returns to menu after operation
         """
         # Authorization check - must be logged in to post
-        if self.loggedin == True:
-            txt = input("Enter your message here -> ")
-            print(f"Following content has been posted -> {txt}")
+        if self.is_authorized():
+            txt = self.ask("Enter your message here -> ")
+            self.publish(txt)
         else:
-            print("You need to signin first to post something...")
+            self.say("You need to signin first to post something...")
 
-        print("\n")
-        self.menu()  # Return to menu
+    def publish(self, txt):
+        """
+        Stores a post written by this user.
+        Logic:
+        - The base class only displays a confirmation
+        - Subclasses/mixins override it to store or index the post and then
+          call super().publish(txt) so every layer in the MRO gets to run
+        """
+        self.say(f"Following content has been posted -> {txt}")
 
     def sendmsg(self):
         """
@@ -166,21 +251,54 @@ class chatbook:
         Logic:
         - Checks if user is logged in before allowing messaging
         - If logged in, accepts message content and recipient name
-        - Displays confirmation of message sent
+        - Hands the message to deliver() for the recipient
         - If not logged in, prompts user to sign in first
-        - Returns to menu after operation
         """
         # Authorization check - must be logged in to send messages
-        if self.loggedin == True:
-            txt = input("Enter your message here -> ")
-            frnd = input("Whom to send the msg? -> ")
-            print(f"Your message has been sent to {frnd}")
+        if self.is_authorized():
+            txt = self.ask("Enter your message here -> ")
+            frnd = self.ask("Whom to send the msg? -> ")
+            self.deliver(frnd, txt)
         else:
-            print("You need to signin first to post something...")
-            
-        print("\n")
-        self.menu()  # Return to menu
+            self.say("You need to signin first to post something...")
+
+    def deliver(self, frnd, txt):
+        """
+        Delivers a direct message to a friend.
+        Logic:
+        - The base class only displays a confirmation
+        - Subclasses/mixins override it for real delivery and call
+          super().deliver(frnd, txt) to keep the chain going
+        """
+        self.say(f"Your message has been sent to {frnd}")
+
+    # Menu text shown before every command
+    __menu_prompt = """"Welcome to Chatbook !! How would you like to proceed?
+                           
+                           1. Press 1 to Sign Up
+                           2. Press 2 to Sign In
+                           3. Press 3 to Write a Post
+                           4. Press 4 to Message a Friend
+                           5. Press 5 to Exit
+                           \n
+                           -> """
+
+    # Dispatch table: menu command -> name of the handler method
+    # Looked up by name so subclasses can override individual handlers
+    __dispatch = {
+        "1": "signup",
+        "2": "signin",
+        "3": "my_post",
+        "4": "sendmsg",
+    }
 
 
 # User instantiation (currently commented out)
-# user1 = chatbook()
\ No newline at end of file
+# user1 = chatbook()
+# user1.menu()
+
+# Replaying a scripted session instead of typing (e.g. from a file of commands)
+# user2 = chatbook()
+# user2.menu(["1", "a@b.com", "pwd", "2", "a@b.com", "pwd", "3", "Hello !!", "5"])
+# with open("session.txt") as commands:
+#     user2.menu(commands)
\ No newline at end of file
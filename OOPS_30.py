@@ -0,0 +1,278 @@
+# ============================================================================
+# PARALLEL, RESUMABLE BATCH JOBS OVER ALL ATM BALANCES
+# ============================================================================
+"""
+Month-end interest and fees touch every account. BalanceJob runs such a job
+over a process pool without pickling a single Atm object:
+
+    parent                                   worker processes
+    balances -> shared memory (int64) ------> attach by name, take a chunk
+                                              new = func(balance, *args)
+                                              valid? write it : flag the row
+    chunk finished -> results + journal  <--- (chunk index)
+
+- Shared memory: balances live in one multiprocessing.shared_memory block;
+  a worker only receives (block name, chunk range, function), never data.
+- Resumable: the input balances are saved once per job, and every finished
+  chunk is written to disk and recorded in a journal before the next one is
+  acknowledged. After a crash, running the same job again loads the saved
+  input and finished chunks and only computes the missing ones.
+- Validation: a new balance must be a non-negative int, the same rule as
+  Atm.set_balance; rows that fail it keep their old balance and are reported.
+  write_back() applies the results through Atm.set_balance itself.
+
+    month_end/
+      interest-2026-10.in        <- input balances (int64)
+      interest-2026-10.out       <- results, filled in chunk by chunk
+      interest-2026-10.rejected  <- one flag byte per row (failed validation)
+      interest-2026-10.journal   <- indexes of finished chunks
+"""
+import os
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+
+from OOPS_11 import Atm, quiet
+
+
+def valid_balance(value):
+    """
+    The rule of Atm.set_balance.
+    """
+    return isinstance(value, int) and value >= 0
+
+
+def month_end(balance, rate_bp, fee):
+    """
+    Monthly interest (basis points, rounded down to whole units) minus a fee.
+    """
+    return balance + balance * rate_bp // 10_000 - fee
+
+
+def _run_chunk(block, flags_block, start, end, func, args):
+    """
+    Worker: applies func to balances[start:end] in shared memory.
+    Returns (start, end, rejected rows).
+    """
+    shm = shared_memory.SharedMemory(name=block)
+    flags_shm = shared_memory.SharedMemory(name=flags_block)
+    balances = shm.buf.cast("q")
+    flags = flags_shm.buf
+    rejected = 0
+    try:
+        for i in range(start, end):
+            new = func(balances[i], *args)
+            if valid_balance(new):
+                balances[i] = new
+            else:
+                flags[i] = 1
+                rejected += 1
+    finally:
+        balances.release()
+        flags.release()
+        shm.close()
+        flags_shm.close()
+    return start, end, rejected
+
+
+class BalanceJob:
+    """
+    One named batch job over an array of balances.
+    Logic:
+    - run() returns (new balances as array('q'), rejected row indexes)
+    - max_chunks stops a run early (used to simulate a crash)
+    """
+
+    def __init__(self, name, directory, chunk_size=100_000, workers=None):
+        self.name = name
+        self.chunk_size = chunk_size
+        self.workers = workers
+        os.makedirs(directory, exist_ok=True)
+        self.__base = os.path.join(directory, name)
+        self.resumed_chunks = 0
+
+    def __path(self, ext):
+        return f"{self.__base}.{ext}"
+
+    def __load_input(self, balances):
+        """
+        The job's input: saved on the first run, reloaded when resuming.
+        """
+        path = self.__path("in")
+        if os.path.exists(path):
+            saved = array("q")
+            with open(path, "rb") as f:
+                saved.frombytes(f.read())
+            return saved
+
+        data = array("q", balances)
+        with open(path + ".tmp", "wb") as f:
+            data.tofile(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + ".tmp", path)
+        return data
+
+    def __finished(self):
+        path = self.__path("journal")
+        if not os.path.exists(path):
+            return set()
+        with open(path) as f:
+            return {int(line) for line in f if line.strip()}
+
+    def run(self, balances, func, *args, max_chunks=None):
+        data = self.__load_input(balances)
+        n = len(data)
+        chunks = range(0, n, self.chunk_size)
+        finished = self.__finished()
+        self.resumed_chunks = len(finished)
+
+        shm = shared_memory.SharedMemory(create=True, size=max(n * 8, 1))
+        flags_shm = shared_memory.SharedMemory(create=True, size=max(n, 1))
+        view = shm.buf.cast("q")
+        out = os.open(self.__path("out"), os.O_RDWR | os.O_CREAT, 0o644)
+        rejected_file = os.open(self.__path("rejected"), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            view[:n] = memoryview(data).cast("B").cast("q")
+            flags_shm.buf[:n] = bytes(n)
+
+            # Results of chunks finished before a crash come from disk
+            for start in chunks:
+                if start // self.chunk_size in finished:
+                    end = min(start + self.chunk_size, n)
+                    saved = os.pread(out, (end - start) * 8, start * 8)
+                    view[start:end] = memoryview(saved).cast("q")
+                    flags_shm.buf[start:end] = os.pread(rejected_file, end - start, start)
+
+            pending = [s for s in chunks if s // self.chunk_size not in finished]
+            if max_chunks is not None:
+                pending = pending[:max_chunks]
+            self.__run_pending(pending, n, shm, flags_shm, (out, rejected_file), func, args)
+
+            result = array("q", view[:n])
+            flags = flags_shm.buf[:n]
+            rejected = [i for i in range(n) if flags[i]] if any(flags) else []
+            flags.release()
+        finally:
+            view.release()
+            os.close(out)
+            os.close(rejected_file)
+            for block in (shm, flags_shm):
+                block.close()
+                block.unlink()
+        return result, rejected
+
+    def __run_pending(self, pending, n, shm, flags_shm, files, func, args):
+        out, rejected_file = files
+        with open(self.__path("journal"), "a") as journal, \
+                ProcessPoolExecutor(self.workers) as pool:
+            futures = [pool.submit(_run_chunk, shm.name, flags_shm.name, start,
+                                   min(start + self.chunk_size, n), func, args)
+                       for start in pending]
+            for future in as_completed(futures):
+                start, end, _ = future.result()
+                # Chunk result first, then the journal line that vouches for it
+                os.pwrite(out, shm.buf[start * 8:end * 8], start * 8)
+                os.pwrite(rejected_file, flags_shm.buf[start:end], start)
+                os.fsync(out)
+                os.fsync(rejected_file)
+                journal.write(f"{start // self.chunk_size}\n")
+                journal.flush()
+                os.fsync(journal.fileno())
+
+    def complete(self):
+        """
+        True once every chunk of the saved input is finished.
+        """
+        path = self.__path("in")
+        if not os.path.exists(path):
+            return False
+        n = os.path.getsize(path) // 8
+        return len(self.__finished()) == len(range(0, n, self.chunk_size))
+
+    def clear(self):
+        for ext in ("in", "out", "rejected", "journal"):
+            if os.path.exists(self.__path(ext)):
+                os.remove(self.__path(ext))
+
+
+def balances_of(atms):
+    return array("q", (atm.get_balance() for atm in atms))
+
+
+def write_back(atms, balances, rejected=()):
+    """
+    Applies job results through Atm.set_balance (its validation applies);
+    rejected rows are skipped.
+    """
+    skip = set(rejected)
+    for i, atm in enumerate(atms):
+        if i not in skip:
+            atm.set_balance(balances[i])
+
+
+def benchmark(directory, n=2_000_000, chunk_size=200_000):
+    """
+    Plain get_balance/set_balance loop vs. BalanceJob, including one
+    simulated crash and resume.
+    """
+    with quiet():
+        atms = []
+        for i in range(n):
+            atm = Atm()
+            atm.create_pin("1234", i % 10_000)
+            atms.append(atm)
+
+    start = time.perf_counter()
+    expected = []
+    for atm in atms:
+        new = month_end(atm.get_balance(), 25, 5)
+        expected.append(new if valid_balance(new) else atm.get_balance())
+    loop_secs = time.perf_counter() - start
+
+    job = BalanceJob("interest-bench", directory, chunk_size=chunk_size)
+    job.clear()
+    balances = balances_of(atms)
+
+    start = time.perf_counter()
+    job.run(balances, month_end, 25, 5, max_chunks=4)  # "crash" after 4 chunks
+    first_secs = time.perf_counter() - start
+
+    start = time.perf_counter()
+    result, rejected = job.run(balances, month_end, 25, 5)  # resume
+    resume_secs = time.perf_counter() - start
+    assert job.complete() and list(result) == expected
+
+    start = time.perf_counter()
+    with quiet():
+        write_back(atms, result, rejected)
+    write_secs = time.perf_counter() - start
+    job.clear()
+
+    chunks = len(range(0, n, chunk_size))
+    print(f"accounts     : {n:,} in {chunks} chunks on {os.cpu_count()} CPU(s)")
+    print(f"plain loop   : {n / loop_secs:>12,.0f} accounts/sec (compute only)")
+    print(f"run (crash)  : 4/{chunks} chunks in {first_secs:.2f} s")
+    print(f"resume       : {chunks - job.resumed_chunks}/{chunks} chunks in {resume_secs:.2f} s, "
+          f"{len(rejected):,} rows rejected by validation")
+    print(f"write back   : {n / write_secs:>12,.0f} accounts/sec through set_balance")
+
+
+if __name__ == "__main__":
+    import tempfile
+
+    directory = os.path.join(tempfile.gettempdir(), "month_end")
+    atm1, atm2 = Atm(), Atm()
+    atm1.create_pin('1234', 1000)
+    atm2.create_pin('4321', 3)
+
+    job = BalanceJob("interest-demo", directory, chunk_size=1)
+    job.clear()
+    balances, rejected = job.run(balances_of([atm1, atm2]), month_end, 100, 5)
+    print(list(balances), rejected)  # [1005, 3] [1] -> the fee would overdraw atm2
+    write_back([atm1, atm2], balances, rejected)
+    atm1.check_balance('1234')  # Your balance is: $1005
+    job.clear()
+
+    benchmark(directory)
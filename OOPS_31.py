@@ -0,0 +1,184 @@
+# ============================================================================
+# ADDRESS INTERNING (FLYWEIGHT) FOR CUSTOMER RECORDS
+# ============================================================================
+"""
+Every Customer (OOPS_10.py) owns an Address object, and every Address owns
+its own city and state strings - even though millions of customers share a
+few thousand (city, pin, state) combinations.
+
+AddressPool hands out one canonical, immutable SharedAddress per combination
+(the flyweight pattern), and stores each distinct city/state string once:
+
+    customer 1 --\\
+    customer 2 ---+--> SharedAddress('Gurgaon', 122011, 'Haryana')
+    customer 3 --/          |              |
+                         'Gurgaon'     'Haryana'   <- one string each
+
+Because an address is shared, it can never change in place. Editing is copy
+on write: CompactCustomer.edit_address()/edit_profile() point that one
+customer at the canonical address for the new values (created on first
+use), and every other customer keeps the old one.
+
+CompactCustomer also uses __slots__ (no per-instance __dict__) and interns
+gender, the only other low-cardinality field.
+"""
+import sys
+
+from OOPS_10 import Address, Customer
+from OOPS_13 import measure_memory, serve_measure
+
+
+class SharedAddress:
+    """
+    Immutable address with the read API of Address.
+    Logic: Read-only properties; edit_address() is refused because other
+    customers may share this object.
+    """
+    __slots__ = ("__city", "__pin", "__state")
+
+    def __init__(self, city, pin, state):
+        self.__city = city
+        self.__pin = pin
+        self.__state = state
+
+    def get_city(self):
+        return self.__city
+
+    @property
+    def pin(self):
+        return self.__pin
+
+    @property
+    def state(self):
+        return self.__state
+
+    def edit_address(self, new_city, new_pin, new_state):
+        raise TypeError("SharedAddress is shared and immutable; "
+                        "use CompactCustomer.edit_address() instead")
+
+    def __repr__(self):
+        return f"SharedAddress({self.__city!r}, {self.__pin!r}, {self.__state!r})"
+
+
+class AddressPool:
+    """
+    Interning layer for addresses and low-cardinality strings.
+    Logic:
+    - __strings: str -> its canonical copy
+    - __addresses: (city, pin, state) -> canonical SharedAddress
+    """
+
+    def __init__(self):
+        self.__strings = {}
+        self.__addresses = {}
+
+    def __len__(self):
+        return len(self.__addresses)
+
+    def intern(self, text):
+        canonical = self.__strings.get(text)
+        if canonical is None:
+            canonical = self.__strings[text] = text
+        return canonical
+
+    def address(self, city, pin, state):
+        key = (city, pin, state)
+        shared = self.__addresses.get(key)
+        if shared is None:
+            shared = SharedAddress(self.intern(city), pin, self.intern(state))
+            self.__addresses[(shared.get_city(), pin, shared.state)] = shared
+        return shared
+
+    def from_address(self, address):
+        """
+        Canonical SharedAddress for an existing (mutable) Address.
+        """
+        return self.address(address.get_city(), address.pin, address.state)
+
+
+class CompactCustomer:
+    """
+    Customer with a shared, interned address and no per-instance __dict__.
+    Logic: All customers created through the same pool share its addresses.
+    """
+    __slots__ = ("name", "gender", "address")
+    pool = AddressPool()  # Shared by all customers (class variable)
+
+    def __init__(self, name, gender, address):
+        self.name = name
+        self.gender = self.pool.intern(gender)
+        if not isinstance(address, SharedAddress):
+            address = self.pool.from_address(address)
+        self.address = address
+
+    @classmethod
+    def from_customer(cls, customer):
+        return cls(customer.name, customer.gender, customer.address)
+
+    def print_address(self):
+        print(f"{self.address.get_city()}, "
+              f"{self.address.pin}, "
+              f"{self.address.state}")
+
+    def edit_address(self, new_city, new_pin, new_state):
+        """
+        Copy on write: only this customer moves to the new address.
+        """
+        self.address = self.pool.address(new_city, new_pin, new_state)
+
+    def edit_profile(self, new_name, new_city, new_pin, new_state):
+        self.name = new_name
+        self.edit_address(new_city, new_pin, new_state)
+
+
+def _rows(n, places=5_000):
+    """
+    n customer rows; strings are built per row, as a parser would produce
+    them, so equal values are still distinct str objects.
+    """
+    for i in range(n):
+        p = i % places
+        yield (f"Customer {i}", "female" if i % 2 else "male",
+               f"City{p}", 100_000 + p, f"State{p % 36}")
+
+
+def build(kind, n):
+    """
+    Creates n customers of one kind: "customer" (OOPS_10) or "compact".
+    """
+    if kind == "customer":
+        return [Customer(name, gender, Address(city, pin, state))
+                for name, gender, city, pin, state in _rows(n)]
+    pool = CompactCustomer.pool
+    return [CompactCustomer(name, gender, pool.address(city, pin, state))
+            for name, gender, city, pin, state in _rows(n)]
+
+
+def benchmark(sizes=(1_000_000, 5_000_000), kinds=("customer", "compact")):
+    """
+    Memory per customer before (Customer + Address) and after (interned);
+    every measurement runs in its own process.
+    """
+    for n in sizes:
+        for kind in kinds:
+            try:
+                stats = measure_memory(__file__, kind, n)
+            except RuntimeError as e:
+                print(f"{kind:<8} {n:>10,} customers: failed ({e})")
+                continue
+            print(f"{kind:<8} {n:>10,} customers: {stats['mb']:>8,.1f} MB "
+                  f"({stats['mb'] * 1024 * 1024 / n:>5,.0f} bytes/customer)")
+
+
+if __name__ == "__main__":
+    serve_measure(build)
+
+    cust1 = CompactCustomer('Nitish', 'male', Address('Gurgaon', 122011, 'Haryana'))
+    cust2 = CompactCustomer('Rahul', 'male', Address('Gurgaon', 122011, 'Haryana'))
+    print(cust1.address is cust2.address)  # True (one shared address)
+
+    cust1.edit_profile('Ankit', 'Mumbai', 111111, 'Maharashtra')
+    cust1.print_address()  # Mumbai, 111111, Maharashtra
+    cust2.print_address()  # Gurgaon, 122011, Haryana (unchanged)
+
+    benchmark(sizes=[int(n) for n in sys.argv[1:]] or (1_000_000, 5_000_000))
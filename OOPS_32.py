@@ -0,0 +1,325 @@
+# ============================================================================
+# SECONDARY INDEXES AND RANGE QUERIES OVER CUSTOMER ADDRESSES
+# ============================================================================
+"""
+Finding every customer in a state, or with a PIN code in a range, used to
+mean scanning every Customer (OOPS_10.py). CustomerStore keeps indexes that
+answer these in O(1) / O(log n + k) (k = number of matches):
+
+    state          --(hash index: dict -> set of ids)-->   customers
+    (state, city)  --(hash index: dict -> set of ids)-->   customers
+    pin            --(sorted index, bisect)----------->   customers in [lo, hi]
+
+The sorted index stores one int64 key per customer, pin << 32 | customer id,
+so equal pins stay distinct and sort by id (so PINs must be ints in
+[0, 2**31) - anything else is rejected with ValueError). Keys live in sorted blocks of at
+most 2 * BLOCK entries (array('q')), plus a list with the largest key of
+every block:
+
+    maxes  [ 110001..| 122011..| 400001..]      bisect -> block
+    blocks [ ...     ][ ...     ][ ...     ]     bisect -> position
+
+Inserting or deleting a key only shifts entries inside one block, not the
+whole index, and a range query bisects once and then walks forward.
+
+IndexedCustomer (a CompactCustomer from OOPS_31.py) tells its store when
+edit_address()/edit_profile() moves it, and the store updates the three
+indexes for that one customer.
+"""
+import random
+import sys
+import time
+from array import array
+from bisect import bisect_left, bisect_right, insort
+
+from OOPS_31 import CompactCustomer
+
+ID_BITS = 32
+ID_MASK = (1 << ID_BITS) - 1
+MAX_PIN = (1 << (63 - ID_BITS)) - 1  # pin << ID_BITS must fit a signed int64
+
+
+def check_pin(pin):
+    if not isinstance(pin, int) or not 0 <= pin <= MAX_PIN:
+        raise ValueError(f"PIN must be an int in [0, {MAX_PIN}], got {pin!r}")
+    return pin
+
+
+def pin_key(pin, cid):
+    """
+    Sorted-index key of one customer: pin << 32 | cid.
+    """
+    return check_pin(pin) << ID_BITS | cid
+
+
+class SortedIndex:
+    """
+    Sorted multiset of int64 keys kept in blocks.
+    Logic: Blocks split when they grow past 2 * BLOCK and disappear when empty.
+    """
+    BLOCK = 2048
+
+    def __init__(self):
+        self.__blocks = []
+        self.__maxes = []
+        self.__len = 0
+
+    def __len__(self):
+        return self.__len
+
+    def bulk_load(self, keys):
+        """
+        Replaces the contents with keys (any order) in one sort.
+        """
+        keys = sorted(keys)
+        self.__blocks = [array("q", keys[i:i + self.BLOCK]) for i in range(0, len(keys), self.BLOCK)]
+        self.__maxes = [block[-1] for block in self.__blocks]
+        self.__len = len(keys)
+
+    def add(self, key):
+        if not self.__blocks:
+            self.__blocks.append(array("q", [key]))
+            self.__maxes.append(key)
+            self.__len = 1
+            return
+        i = min(bisect_left(self.__maxes, key), len(self.__blocks) - 1)
+        block = self.__blocks[i]
+        insort(block, key)
+        self.__maxes[i] = block[-1]
+        self.__len += 1
+        if len(block) > 2 * self.BLOCK:
+            half = len(block) // 2
+            self.__blocks[i:i + 1] = [block[:half], block[half:]]
+            self.__maxes[i:i + 1] = [block[half - 1], block[-1]]
+
+    def remove(self, key):
+        i = bisect_left(self.__maxes, key)
+        if i == len(self.__blocks):
+            raise KeyError(key)
+        block = self.__blocks[i]
+        j = bisect_left(block, key)
+        if j == len(block) or block[j] != key:
+            raise KeyError(key)
+        del block[j]
+        self.__len -= 1
+        if block:
+            self.__maxes[i] = block[-1]
+        else:
+            del self.__blocks[i]
+            del self.__maxes[i]
+
+    def range(self, lo, hi):
+        """
+        Yields every key with lo <= key <= hi, in order.
+        """
+        i = bisect_left(self.__maxes, lo)
+        if i == len(self.__blocks):
+            return
+        j = bisect_left(self.__blocks[i], lo)
+        for block in self.__blocks[i:]:
+            end = bisect_right(block, hi, j)
+            yield from block[j:end]
+            if end < len(block):
+                return
+            j = 0
+
+
+class IndexedCustomer(CompactCustomer):
+    """
+    CompactCustomer that keeps its CustomerStore's indexes up to date.
+    Logic: store is the CustomerStore that indexes this customer (set by
+    add()/extend()) and cid its position there; None until it is stored.
+    """
+    __slots__ = ("cid", "store")
+
+    def __init__(self, name, gender, address):
+        super().__init__(name, gender, address)
+        self.cid = None
+        self.store = None
+
+    def edit_address(self, new_city, new_pin, new_state):
+        if self.store is not None:
+            check_pin(new_pin)  # before the address changes
+        old = self.address
+        super().edit_address(new_city, new_pin, new_state)
+        if self.store is not None and self.address is not old:
+            self.store.reindex(self, old)
+
+
+class CustomerStore:
+    """
+    All customers in one list plus hash and sorted indexes on their addresses.
+    """
+
+    def __init__(self):
+        self.__customers = []  # cid -> IndexedCustomer
+        self.__by_state = {}  # state -> set of cids
+        self.__by_city = {}  # (state, city) -> set of cids
+        self.__pins = SortedIndex()  # pin << 32 | cid
+
+    def __len__(self):
+        return len(self.__customers)
+
+    def __getitem__(self, cid):
+        return self.__customers[cid]
+
+    def __iter__(self):
+        return iter(self.__customers)
+
+    def __index(self, cid, address):
+        for index, key in ((self.__by_state, address.state),
+                           (self.__by_city, (address.state, address.get_city()))):
+            ids = index.get(key)
+            if ids is None:
+                ids = index[key] = set()
+            ids.add(cid)
+
+    def __unindex(self, cid, address):
+        for index, key in ((self.__by_state, address.state),
+                           (self.__by_city, (address.state, address.get_city()))):
+            ids = index[key]
+            ids.discard(cid)
+            if not ids:
+                del index[key]
+
+    def add(self, name, gender, city, pin, state):
+        """
+        Creates, stores and indexes one customer.
+        """
+        key = pin_key(pin, len(self.__customers))
+        customer = IndexedCustomer(name, gender, IndexedCustomer.pool.address(city, pin, state))
+        customer.cid = len(self.__customers)
+        customer.store = self
+        self.__customers.append(customer)
+        self.__index(customer.cid, customer.address)
+        self.__pins.add(key)
+        return customer
+
+    def extend(self, rows):
+        """
+        Adds many (name, gender, city, pin, state) rows.
+        Logic: On an empty pin index the keys are collected and sorted once.
+        A row with an invalid PIN raises ValueError; the rows before it are
+        stored and indexed.
+        """
+        bulk = len(self.__pins) == 0
+        keys = array("q")
+        address = IndexedCustomer.pool.address
+        try:
+            for name, gender, city, pin, state in rows:
+                key = pin_key(pin, len(self.__customers))
+                customer = IndexedCustomer(name, gender, address(city, pin, state))
+                customer.cid = len(self.__customers)
+                customer.store = self
+                self.__customers.append(customer)
+                self.__index(customer.cid, customer.address)
+                if bulk:
+                    keys.append(key)
+                else:
+                    self.__pins.add(key)
+        finally:
+            if bulk:
+                self.__pins.bulk_load(keys)
+
+    def reindex(self, customer, old_address):
+        """
+        Moves one customer from its old address's index entries to the new ones.
+        """
+        cid = customer.cid
+        key = pin_key(customer.address.pin, cid)
+        self.__unindex(cid, old_address)
+        self.__pins.remove(old_address.pin << ID_BITS | cid)
+        self.__index(cid, customer.address)
+        self.__pins.add(key)
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def in_state(self, state):
+        return [self.__customers[cid] for cid in self.__by_state.get(state, ())]
+
+    def in_city(self, city, state):
+        return [self.__customers[cid] for cid in self.__by_city.get((state, city), ())]
+
+    def count_in_state(self, state):
+        return len(self.__by_state.get(state, ()))
+
+    def pin_range(self, lo, hi):
+        """
+        Customers with lo <= pin <= hi, ordered by pin.
+        """
+        customers = self.__customers
+        return [customers[key & ID_MASK]
+                for key in self.__pins.range(lo << ID_BITS, hi << ID_BITS | ID_MASK)]
+
+
+def _rows(n, places=20_000, seed=21):
+    rng = random.Random(seed)
+    for i in range(n):
+        p = rng.randrange(places)
+        yield (f"Customer {i}", "female" if i % 2 else "male",
+               f"City{p}", 100_000 + p * 40, f"State{p % 36}")
+
+
+def benchmark(n=10_000_000, queries=200, edits=100_000, seed=21):
+    """
+    Index lookups vs. linear scans, and edit throughput with index upkeep.
+    """
+    store = CustomerStore()
+    start = time.perf_counter()
+    store.extend(_rows(n))
+    print(f"built      : {n:,} customers in {time.perf_counter() - start:.1f} s")
+
+    rng = random.Random(seed)
+    states = [f"State{rng.randrange(36)}" for _ in range(queries)]
+    ranges = [(lo, lo + 2_000) for lo in (rng.randrange(100_000, 900_000) for _ in range(queries))]
+
+    # Linear scans (a few only - each touches every customer)
+    start = time.perf_counter()
+    scan_state = [c for c in store if c.address.state == states[0]]
+    lo, hi = ranges[0]
+    scan_pin = [c for c in store if lo <= c.address.pin <= hi]
+    scan_secs = (time.perf_counter() - start) / 2
+    assert len(scan_state) == store.count_in_state(states[0])
+    assert sorted(c.cid for c in scan_pin) == sorted(c.cid for c in store.pin_range(lo, hi))
+
+    start = time.perf_counter()
+    for state in states:
+        store.count_in_state(state)
+    state_us = (time.perf_counter() - start) / queries * 1e6
+
+    start = time.perf_counter()
+    matches = 0
+    for lo, hi in ranges:
+        matches += len(store.pin_range(lo, hi))
+    range_us = (time.perf_counter() - start) / queries * 1e6
+
+    start = time.perf_counter()
+    for _ in range(edits):
+        customer = store[rng.randrange(n)]
+        p = rng.randrange(20_000)
+        customer.edit_profile(customer.name, f"City{p}", 100_000 + p * 40, f"State{p % 36}")
+    edit_secs = time.perf_counter() - start
+
+    lo, hi = ranges[0]
+    assert all(lo <= c.address.pin <= hi for c in store.pin_range(lo, hi))
+    print(f"linear scan: {scan_secs * 1000:,.0f} ms per query")
+    print(f"state      : {state_us:,.1f} us per count query")
+    print(f"pin range  : {range_us:,.1f} us per query ({matches / queries:,.0f} matches on average)")
+    print(f"edits      : {edits / edit_secs:,.0f} edit_profile/sec including index upkeep")
+
+
+if __name__ == "__main__":
+    store = CustomerStore()
+    store.add('Nitish', 'male', 'Gurgaon', 122011, 'Haryana')
+    store.add('Ankit', 'male', 'Mumbai', 400001, 'Maharashtra')
+    rahul = store.add('Rahul', 'male', 'Gurgaon', 122018, 'Haryana')
+    print([c.name for c in store.in_state('Haryana')])  # ['Nitish', 'Rahul']
+    print([c.name for c in store.pin_range(122000, 122100)])  # ['Nitish', 'Rahul']
+
+    rahul.edit_profile('Rahul', 'Pune', 411001, 'Maharashtra')
+    print([c.name for c in store.in_city('Pune', 'Maharashtra')])  # ['Rahul']
+    print([c.name for c in store.pin_range(122000, 122100)])  # ['Nitish']
+
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000_000)
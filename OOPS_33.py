@@ -0,0 +1,285 @@
+# ============================================================================
+# STREAMING CUSTOMER LOADER AND BUFFERED ADDRESS EXPORT
+# ============================================================================
+"""
+Loading customers used to mean one Address + one Customer (OOPS_10.py) per
+row, and exporting meant calling Customer.print_address() once per customer
+(one print() call, one write per row).
+
+Import:   file --read_records()--> tuples --chunked()--> CustomerLoader
+          (csv.reader / json,       (chunk_size at       (validate, build
+           one row at a time)        a time)              CompactCustomers)
+
+- Everything is a generator: memory stays constant however large the file
+- Rows become CompactCustomers (OOPS_31.py), whose addresses are interned,
+  so a million customers in a few thousand places share a few thousand
+  address objects
+- CustomerLoader.load_into() feeds the rows straight into a CustomerStore
+  (OOPS_32.py) with its indexes
+
+Export:   customers --chunk--> "city, pin, state\\n" lines --join--> one write
+- The same text as print_address(), but a whole chunk is joined into one
+  bytes object and written through one buffered binary file
+- A shared address is formatted and encoded once and then reused for
+  every customer that lives there
+"""
+import csv
+import io
+import json
+import os
+import tempfile
+import time
+from contextlib import redirect_stdout
+from itertools import islice
+from operator import attrgetter
+
+from OOPS_10 import Address, Customer
+from OOPS_13 import resident_memory_mb
+from OOPS_19 import chunked
+from OOPS_31 import CompactCustomer, SharedAddress
+
+FIELDS = ("name", "gender", "city", "pin", "state")
+
+
+def read_records(source, fmt=None):
+    """
+    Lazily yields (name, gender, city, pin, state) tuples from a CSV (with a
+    header row) or JSONL file; pin stays as read (validated later).
+    Logic: source is a path or an open text file; fmt defaults to the file
+    extension.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        fmt = fmt or os.path.splitext(source)[1].lstrip(".").lower()
+        with open(source, newline="", encoding="utf-8", buffering=1 << 20) as f:
+            yield from read_records(f, fmt)
+        return
+
+    if fmt == "csv":
+        reader = csv.reader(source)
+        header = next(reader, None)
+        if header is None:
+            return
+        positions = [header.index(field) for field in FIELDS]
+        width = len(header)
+        for row in reader:
+            if len(row) == width:
+                yield tuple(row[p] for p in positions)
+            elif row:
+                yield None  # malformed row
+    elif fmt in ("jsonl", "ndjson"):
+        for line in source:
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                yield tuple(record[field] for field in FIELDS)
+            except (ValueError, KeyError, TypeError):
+                yield None
+    else:
+        raise ValueError(f"unsupported import format: {fmt!r}")
+
+
+class CustomerLoader:
+    """
+    Streams customer rows into CompactCustomers.
+    Logic:
+    - Rows without all five fields or with a non-numeric pin are counted and
+      skipped; the first max_errors of them are kept with a reason
+    - rows/loaded/invalid counters accumulate over runs
+    """
+
+    def __init__(self, chunk_size=10_000, max_errors=100):
+        self.chunk_size = chunk_size
+        self.max_errors = max_errors
+        self.errors = []  # (row number, reason)
+        self.rows = 0
+        self.loaded = 0
+        self.invalid = 0
+
+    def __reject(self, row_number, reason):
+        self.invalid += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append((row_number, reason))
+
+    def records(self, source, fmt=None):
+        """
+        Yields validated (name, gender, city, pin, state) tuples, pin as int.
+        """
+        row_number = 0
+        for chunk in chunked(read_records(source, fmt), self.chunk_size):
+            valid = []
+            for record in chunk:
+                row_number += 1
+                if record is None:
+                    self.__reject(row_number, "malformed row")
+                    continue
+                name, gender, city, pin, state = record
+                try:
+                    pin = int(pin)
+                except (TypeError, ValueError):
+                    self.__reject(row_number, f"invalid pin {pin!r}")
+                    continue
+                valid.append((name, gender, city, pin, state))
+            self.rows += len(chunk)
+            self.loaded += len(valid)
+            yield from valid
+
+    def customers(self, source, fmt=None):
+        """
+        Lazily yields one CompactCustomer per valid row.
+        """
+        address = CompactCustomer.pool.address
+        for name, gender, city, pin, state in self.records(source, fmt):
+            yield CompactCustomer(name, gender, address(city, pin, state))
+
+    def load_into(self, store, source, fmt=None):
+        """
+        Loads every valid row into a CustomerStore (OOPS_32.py).
+        """
+        store.extend(self.records(source, fmt))
+        return store
+
+
+def address_line(address):
+    """
+    print_address()'s text for one address as bytes (newline included).
+    """
+    return f"{address.get_city()}, {address.pin}, {address.state}\n".encode()
+
+
+def address_bytes(customers, chunk_size=10_000):
+    """
+    Yields the addresses of customers as bytes, one chunk of lines at a time.
+    Logic:
+    - Lines of SharedAddresses are cached (same text for everybody there), so
+      most customers cost one dict lookup, done in C through map()
+    - Only misses (first use of an address, or a mutable Address) are formatted
+    """
+    cache = {}
+    address_of = attrgetter("address")
+    customers = iter(customers)
+    while True:
+        chunk = list(islice(customers, chunk_size))
+        if not chunk:
+            return
+        lines = list(map(cache.get, map(address_of, chunk)))
+        if None in lines:
+            for i, line in enumerate(lines):
+                if line is None:
+                    address = chunk[i].address
+                    line = lines[i] = address_line(address)
+                    if isinstance(address, SharedAddress):
+                        cache[address] = line
+        yield b"".join(lines)
+
+
+def export_addresses(customers, target, chunk_size=10_000):
+    """
+    Writes every customer's address to a path or a binary file; returns the
+    number of bytes written.
+    """
+    if isinstance(target, (str, os.PathLike)):
+        with open(target, "wb", buffering=1 << 20) as f:
+            return export_addresses(customers, f, chunk_size)
+
+    written = 0
+    for data in address_bytes(customers, chunk_size):
+        target.write(data)
+        written += len(data)
+    return written
+
+
+def write_sample(path, n, places=5_000):
+    """
+    Streams n generated customers (a few broken rows included) to a file.
+    """
+    jsonl = path.endswith(".jsonl")
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = None if jsonl else csv.writer(f)
+        if writer:
+            writer.writerow(FIELDS)
+        for i in range(n):
+            p = i % places
+            row = (f"Customer {i}", "female" if i % 2 else "male",
+                   f"City{p}", 100_000 + p if i % 10_000 else "n/a", f"State{p % 36}")
+            if jsonl:
+                f.write(json.dumps(dict(zip(FIELDS, row))) + "\n")
+            else:
+                writer.writerow(row)
+
+
+def benchmark(n=1_000_000):
+    """
+    Per-object load / print_address() loop vs. the streaming pipeline.
+    """
+    directory = tempfile.gettempdir()
+    csv_path = os.path.join(directory, "customers.csv")
+    write_sample(csv_path, n)
+
+    # Per-object: DictReader -> Address + Customer for every row
+    start = time.perf_counter()
+    customers = []
+    with open(csv_path, newline="") as f:
+        for row in csv.DictReader(f):
+            address = Address(row["city"], row["pin"], row["state"])
+            customers.append(Customer(row["name"], row["gender"], address))
+    naive_load = time.perf_counter() - start
+
+    # Per-object: one print() per customer, line buffered like a terminal or pipe
+    out_path = os.path.join(directory, "addresses.txt")
+    start = time.perf_counter()
+    with open(out_path, "w", buffering=1) as out, redirect_stdout(out):
+        for customer in customers:
+            customer.print_address()
+    print_secs = time.perf_counter() - start
+    del customers
+
+    # Streaming: lazy customers -> buffered export, nothing kept in memory
+    loader = CustomerLoader()
+    start = time.perf_counter()
+    export_addresses(loader.customers(csv_path), out_path)
+    pipeline_secs = time.perf_counter() - start
+
+    # Export only (customers already in memory, as print_address() had them)
+    customers = list(CustomerLoader().customers(csv_path))
+    start = time.perf_counter()
+    export_addresses(customers, out_path)
+    export_secs = time.perf_counter() - start
+    os.remove(csv_path)
+    os.remove(out_path)
+
+    # Same text as print_address()
+    printed = io.StringIO()
+    with redirect_stdout(printed):
+        for customer in customers[:1_000]:
+            customer.print_address()
+    exported = io.BytesIO()
+    export_addresses(customers[:1_000], exported)
+    assert exported.getvalue() == printed.getvalue().encode()
+    print(f"rows            : {loader.rows:,} ({loader.invalid:,} invalid)")
+    print(f"naive load      : {n / naive_load:>11,.0f} rows/sec (Address + Customer per row)")
+    print(f"print loop      : {n / print_secs:>11,.0f} customers/sec")
+    print(f"buffered export : {n / export_secs:>11,.0f} customers/sec "
+          f"({print_secs / export_secs:.0f}x the print loop)")
+    print(f"load + export   : {loader.rows / pipeline_secs:>11,.0f} rows/sec streamed end to end")
+    print(f"resident memory : {resident_memory_mb():,.1f} MB peak")
+
+
+if __name__ == "__main__":
+    sample = io.StringIO("name,gender,city,pin,state\n"
+                         "Nitish,male,Gurgaon,122011,Haryana\n"
+                         "Ankit,male,Mumbai,111111,Maharashtra\n"
+                         "Rahul,male,Gurgaon,122011,Haryana\n"
+                         "Broken,male,Nowhere,n/a,Nowhere\n")
+    loader = CustomerLoader()
+    customers = list(loader.customers(sample, fmt="csv"))
+    print(loader.errors)  # [(4, "invalid pin 'n/a'")]
+
+    out = io.BytesIO()
+    export_addresses(customers, out)
+    print(out.getvalue().decode(), end="")
+    # Gurgaon, 122011, Haryana
+    # Mumbai, 111111, Maharashtra
+    # Gurgaon, 122011, Haryana
+
+    benchmark()
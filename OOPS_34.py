@@ -0,0 +1,374 @@
+# ============================================================================
+# VERSIONED CUSTOMER PROFILES WITH A COMPACTED EDIT HISTORY
+# ============================================================================
+"""
+Customer.edit_profile() (OOPS_10.py) overwrites name and address in place, so
+the previous values are gone. VersionedCustomer keeps an audit trail of every
+change without copying the whole profile per edit:
+
+    version    0            1              2             3
+    time       t0           t1             t2            t3
+    change     (checkpoint) name='Ankit'   address=A2    name='Rahul'
+               name, gender, address        ^ only the changed fields
+
+- Structural sharing: a version stores only (field, value) for the fields
+  that changed; unchanged values are the same objects as before, and
+  addresses are interned SharedAddresses (OOPS_31.py), so an edit costs a
+  few references, not a new Customer + Address
+- Checkpoints: every `every` versions a full (name, gender, address) tuple
+  is stored. "Profile as of T" bisects the timestamps (O(log edits)), bisects
+  the checkpoints, and replays at most `every` changes:
+
+    times        [t0 t1 t2 ... t63 t64 ... t97]      bisect -> version 97
+    checkpoints  [0, 32, 64, 96]                     bisect -> 96, replay 1
+
+- Every history has its own lock, so edits and reads of different customers
+  never wait for each other, and compaction holds one history at a time
+- Compaction runs in the background: edits only append changes and mark the
+  history; HistoryCompactor's thread adds the missing checkpoints, and with
+  `retain` set it collapses versions older than the retention window into one
+  checkpoint (the history before that point is then no longer available)
+"""
+import random
+import threading
+import time
+import tracemalloc
+from array import array
+from bisect import bisect_right
+from collections import namedtuple
+from copy import deepcopy
+
+from OOPS_10 import Address, Customer
+from OOPS_31 import CompactCustomer
+
+FIELDS = ("name", "gender", "address")
+Profile = namedtuple("Profile", ("time",) + FIELDS)
+
+
+def _apply_changes(state, changes):
+    for k in range(0, len(changes), 2):
+        state[changes[k]] = changes[k + 1]
+
+
+class ProfileHistory:
+    """
+    Versions of one profile: timestamps, changed fields and checkpoints.
+    Logic:
+    - __changes[v]: flat tuple (field index, value, field index, value, ...);
+      None for version 0
+    - __checkpoint_versions / __checkpoint_states: full states at some versions
+      (version 0 always has one)
+    - __head: current state, for computing the next diff
+    - lock: guards every operation on this history (callers take it)
+    """
+    __slots__ = ("__times", "__changes", "__checkpoint_versions", "__checkpoint_states", "__head",
+                 "lock")
+
+    def __init__(self, now, state):
+        self.lock = threading.Lock()
+        self.__times = array("d", [now])
+        self.__changes = [None]
+        self.__checkpoint_versions = array("q", [0])
+        self.__checkpoint_states = [state]
+        self.__head = state
+
+    def __len__(self):
+        return len(self.__times)
+
+    def record(self, now, state):
+        """
+        Appends a version with the fields of state that differ from the head.
+        Returns the number of versions since the last checkpoint (0 if
+        nothing changed).
+        """
+        changes = ()
+        for i, (value, old) in enumerate(zip(state, self.__head)):
+            if value is not old and value != old:
+                changes += (i, value)
+        if not changes:
+            return 0
+        self.__times.append(max(now, self.__times[-1]))  # time never goes back
+        self.__changes.append(changes)
+        self.__head = state
+        return len(self.__times) - 1 - self.__checkpoint_versions[-1]
+
+    def __state_at(self, version):
+        """
+        Full state at version: nearest checkpoint at or before it, then replay.
+        """
+        c = bisect_right(self.__checkpoint_versions, version) - 1
+        state = list(self.__checkpoint_states[c])
+        for v in range(self.__checkpoint_versions[c] + 1, version + 1):
+            _apply_changes(state, self.__changes[v])
+        return state
+
+    def as_of(self, when):
+        """
+        Profile as it was at time `when`; None before the first version.
+        """
+        version = bisect_right(self.__times, when) - 1
+        if version < 0:
+            return None
+        return Profile(self.__times[version], *self.__state_at(version))
+
+    def versions(self):
+        """
+        Yields every retained version as a Profile, oldest first.
+        """
+        state = list(self.__checkpoint_states[0])
+        yield Profile(self.__times[0], *state)
+        for v in range(1, len(self.__times)):
+            _apply_changes(state, self.__changes[v])
+            yield Profile(self.__times[v], *state)
+
+    def compact(self, every):
+        """
+        Adds a checkpoint after every `every` versions of uncompacted tail.
+        """
+        last = self.__checkpoint_versions[-1]
+        if len(self.__times) - 1 - last < every:
+            return
+        state = self.__state_at(last)
+        for v in range(last + 1, len(self.__times)):
+            _apply_changes(state, self.__changes[v])
+            if v - last == every:
+                # State first: readers bisect the versions array
+                self.__checkpoint_states.append(tuple(state))
+                self.__checkpoint_versions.append(v)
+                last = v
+
+    def collapse(self, horizon):
+        """
+        Folds every version up to time `horizon` into one checkpoint (the
+        version in effect at horizon stays readable).
+        """
+        version = bisect_right(self.__times, horizon) - 1
+        if version <= 0:
+            return
+        state = tuple(self.__state_at(version))
+        kept = [(v - version, s) for v, s in zip(self.__checkpoint_versions, self.__checkpoint_states)
+                if v > version]
+        self.__times = self.__times[version:]
+        self.__changes = [None] + self.__changes[version + 1:]
+        self.__checkpoint_versions = array("q", [0] + [v for v, _ in kept])
+        self.__checkpoint_states = [state] + [s for _, s in kept]
+
+
+class HistoryCompactor:
+    """
+    Background thread that compacts the histories edits have marked.
+    Logic:
+    - lock only guards the set of marked histories; compaction takes each
+      history's own lock, so an edit or read waits at most for the
+      compaction of its own history
+    - Without a running thread, mark() compacts right away
+    """
+
+    def __init__(self, every=32, retain=None, interval=0.5, clock=time.time):
+        self.every = every
+        self.retain = retain  # seconds of full history to keep (None: all)
+        self.interval = interval
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.compacted = 0
+        self.__dirty = set()
+        self.__wake = threading.Event()
+        self.__stop = threading.Event()
+        self.__thread = None
+
+    def start(self):
+        self.__stop.clear()
+        self.__thread = threading.Thread(target=self.__run, name="history-compactor", daemon=True)
+        self.__thread.start()
+        return self
+
+    def stop(self):
+        if self.__thread is not None:
+            self.__stop.set()
+            self.__wake.set()
+            self.__thread.join()
+            self.__thread = None
+        self.run_once()
+
+    def mark(self, history):
+        """
+        Called after an edit left `every` or more versions without a
+        checkpoint (without holding the history's lock).
+        """
+        if self.__thread is None:
+            self.__compact(history)
+            return
+        with self.lock:
+            self.__dirty.add(history)
+            wake = len(self.__dirty) >= 1_000
+        if wake:
+            self.__wake.set()
+
+    def __compact(self, history):
+        with history.lock:
+            history.compact(self.every)
+            if self.retain is not None:
+                history.collapse(self.clock() - self.retain)
+        self.compacted += 1
+
+    def run_once(self):
+        with self.lock:
+            dirty, self.__dirty = self.__dirty, set()
+        for history in dirty:
+            self.__compact(history)
+
+    def __run(self):
+        while not self.__stop.is_set():
+            self.__wake.wait(self.interval)
+            self.__wake.clear()
+            self.run_once()
+
+
+class VersionedCustomer(CompactCustomer):
+    """
+    CompactCustomer whose edits are recorded in a ProfileHistory.
+    Logic: Edits go through edit_address()/edit_profile(); assigning name
+    directly is not recorded.
+    """
+    __slots__ = ("history",)
+    compactor = HistoryCompactor()  # Shared by all customers (class variable)
+
+    def __init__(self, name, gender, address):
+        super().__init__(name, gender, address)
+        self.history = ProfileHistory(self.compactor.clock(),
+                                      (self.name, self.gender, self.address))
+
+    def edit_address(self, new_city, new_pin, new_state):
+        # edit_profile() sets the name first and then comes here: one version
+        super().edit_address(new_city, new_pin, new_state)
+        compactor = self.compactor
+        history = self.history
+        with history.lock:
+            pending = history.record(compactor.clock(), (self.name, self.gender, self.address))
+        if pending >= compactor.every:
+            compactor.mark(history)
+
+    def as_of(self, when):
+        """
+        Profile (time, name, gender, address) in effect at time `when`.
+        """
+        with self.history.lock:
+            return self.history.as_of(when)
+
+    def print_history(self):
+        with self.history.lock:
+            versions = list(self.history.versions())
+        for version in versions:
+            print(f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(version.time))} "
+                  f"{version.name}: {version.address.get_city()}, "
+                  f"{version.address.pin}, {version.address.state}")
+
+
+def _edits(rng, n, places=5_000):
+    for i in range(n):
+        p = rng.randrange(places)
+        name = f"Customer {rng.randrange(1_000_000)}" if rng.random() < 0.3 else None
+        yield name, f"City{p}", 100_000 + p, f"State{p % 36}"
+
+
+def _apply(customer, edit):
+    name, city, pin, state = edit
+    if name is None:
+        customer.edit_address(city, pin, state)
+    else:
+        customer.edit_profile(name, city, pin, state)
+
+
+def benchmark(customers=50_000, edits_each=20, long_history=1_000_000, reads=10_000, seed=23):
+    """
+    Memory per edit (history vs. one full copy per edit), as-of reads on a
+    long history, and edit throughput with the compactor thread running.
+    """
+    rng = random.Random(seed)
+    now = [0.0]
+    compactor = VersionedCustomer.compactor = HistoryCompactor(every=32, clock=lambda: now[0])
+    edits = list(_edits(rng, customers * edits_each))
+    total = len(edits)
+
+    # Full copy per edit: OOPS_10 Customer + Address
+    tracemalloc.start()
+    plain = [Customer(f"Customer {i}", "male", Address("City0", 100_000, "State0"))
+             for i in range(customers)]
+    before = tracemalloc.get_traced_memory()[0]
+    copies = []
+    for i, (name, city, pin, state) in enumerate(edits):
+        customer = plain[i % customers]
+        copies.append(deepcopy(customer))
+        customer.edit_profile(name or customer.name, city, pin, state)
+    copy_bytes = tracemalloc.get_traced_memory()[0] - before
+    del plain, copies
+
+    # History: only the changed fields per edit (compacted inline)
+    def versioned():
+        return [VersionedCustomer(f"Customer {i}", "male", Address("City0", 100_000, "State0"))
+                for i in range(customers)]
+
+    def run_edits(customers_):
+        for i, edit in enumerate(edits):
+            now[0] = i
+            _apply(customers_[i % customers], edit)
+
+    now[0] = 0
+    history = versioned()
+    before = tracemalloc.get_traced_memory()[0]
+    run_edits(history)
+    history_bytes = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del history
+
+    # Edit throughput with the compactor thread doing the compaction
+    now[0] = 0
+    history = versioned()
+    compactor.start()
+    start = time.perf_counter()
+    run_edits(history)
+    edit_secs = time.perf_counter() - start
+    compactor.stop()
+    del history
+
+    # As-of reads on one long history vs. replaying it from the start
+    now[0] = 0
+    customer = VersionedCustomer("Nitish", "male", Address("Gurgaon", 122011, "Haryana"))
+    for i, edit in enumerate(_edits(rng, long_history)):
+        now[0] = i + 1
+        _apply(customer, edit)
+    times = [rng.uniform(0, long_history) for _ in range(reads)]
+    start = time.perf_counter()
+    found = [customer.as_of(t) for t in times]
+    as_of_us = (time.perf_counter() - start) / reads * 1e6
+
+    start = time.perf_counter()
+    for t, expected in zip(times[:5], found):
+        replayed = None
+        for version in customer.history.versions():
+            if version.time > t:
+                break
+            replayed = version
+        assert replayed == expected
+    replay_us = (time.perf_counter() - start) / 5 * 1e6
+
+    print(f"edits       : {total:,} over {customers:,} customers, "
+          f"{total / edit_secs:,.0f} edits/sec with the compactor running")
+    print(f"memory      : {history_bytes / total:,.0f} bytes/edit (history) vs. "
+          f"{copy_bytes / total:,.0f} bytes/edit (full copy)")
+    print(f"as-of read  : {as_of_us:,.1f} us on {long_history:,} versions "
+          f"(replay from the start: {replay_us / 1000:,.0f} ms)")
+    VersionedCustomer.compactor = HistoryCompactor()
+
+
+if __name__ == "__main__":
+    cust = VersionedCustomer('Nitish', 'male', Address('Gurgaon', 122011, 'Haryana'))
+    created = time.time()
+    time.sleep(0.01)
+    cust.edit_profile('Ankit', 'Mumbai', 111111, 'Maharashtra')
+    cust.edit_address('Pune', 411001, 'Maharashtra')
+    cust.print_history()  # 3 versions: Gurgaon -> Mumbai -> Pune
+    print(cust.as_of(created).name)  # Nitish
+    print(cust.as_of(time.time()).address)  # SharedAddress('Pune', 411001, 'Maharashtra')
+
+    benchmark()
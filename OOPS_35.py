@@ -0,0 +1,188 @@
+# ============================================================================
+# NUMPY-BACKED POINT ARRAY FOR VECTORIZED GEOMETRY
+# ============================================================================
+"""
+Point (OOPS_12.py) is one Python object per coordinate pair, and
+euclidean_distance()/distance_from_origin() do scalar arithmetic per call.
+With millions of points, object headers, boxed floats and one method call
+per point cost far more than the arithmetic itself.
+
+PointArray keeps all coordinates in two contiguous float64 arrays:
+
+    list of Points   [Point] [Point] [Point] ...   (~100+ bytes each)
+    PointArray       x: [x0 x1 x2 ...]              (16 bytes per point)
+                     y: [y0 y1 y2 ...]
+
+- Distances are computed for the whole array in a few in-place NumPy passes
+- pairwise_distances() fills an M x N matrix a block of rows at a time, so
+  the temporaries stay small next to the result
+- Indexing with an int returns a Point (the familiar single-element API);
+  slices and masks return a PointArray sharing the same data
+"""
+import time
+import tracemalloc
+
+import numpy as np
+
+from OOPS_12 import Point
+
+
+class PointArray:
+    """
+    Many 2D points as contiguous float64 x and y arrays.
+    Logic: Methods mirror Point's, but return one value per point.
+    """
+    BLOCK_BYTES = 1 << 24  # temporaries per block of pairwise_distances()
+
+    def __init__(self, x, y):
+        x = np.ascontiguousarray(x, dtype=np.float64)
+        y = np.ascontiguousarray(y, dtype=np.float64)
+        if x.ndim != 1 or x.shape != y.shape:
+            raise ValueError("x and y must be 1-D arrays of the same length")
+        self.__x = x
+        self.__y = y
+
+    @classmethod
+    def from_points(cls, points):
+        points = list(points)
+        n = len(points)
+        return cls(np.fromiter((p.x_cod for p in points), np.float64, n),
+                   np.fromiter((p.y_cod for p in points), np.float64, n))
+
+    def to_points(self):
+        return [Point(x, y) for x, y in zip(self.__x.tolist(), self.__y.tolist())]
+
+    @property
+    def x(self):
+        return self.__x
+
+    @property
+    def y(self):
+        return self.__y
+
+    @property
+    def nbytes(self):
+        return self.__x.nbytes + self.__y.nbytes
+
+    def __len__(self):
+        return len(self.__x)
+
+    def __getitem__(self, index):
+        if isinstance(index, (int, np.integer)):
+            return Point(float(self.__x[index]), float(self.__y[index]))
+        return PointArray(self.__x[index], self.__y[index])
+
+    def __iter__(self):
+        return iter(self.to_points())
+
+    def __str__(self):
+        if len(self) > 6:
+            shown = [str(self[i]) for i in range(3)] + ["..."] + \
+                    [str(self[i]) for i in range(len(self) - 3, len(self))]
+        else:
+            shown = [str(p) for p in self.to_points()]
+        return f"[{', '.join(shown)}]"
+
+    # ------------------------------------------------------------------
+    # Geometry
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def __norm(dx, dy):
+        """
+        sqrt(dx**2 + dy**2) computed in place in dx (dx and dy are temporaries).
+        """
+        np.multiply(dx, dx, out=dx)
+        np.multiply(dy, dy, out=dy)
+        np.add(dx, dy, out=dx)
+        return np.sqrt(dx, out=dx)
+
+    def euclidean_distance(self, other):
+        """
+        Distance of every point to `other`: one Point, or a PointArray of the
+        same length (element by element).
+        """
+        if isinstance(other, PointArray):
+            return self.__norm(self.__x - other.x, self.__y - other.y)
+        return self.__norm(self.__x - other.x_cod, self.__y - other.y_cod)
+
+    def distance_from_origin(self):
+        return self.__norm(self.__x.copy(), self.__y.copy())
+
+    def pairwise_distances(self, other=None, out=None):
+        """
+        M x N matrix of distances from every point here to every point of
+        other (default: self).
+        Logic: Rows are filled in blocks of about BLOCK_BYTES of temporaries.
+        """
+        other = self if other is None else other
+        m, n = len(self), len(other)
+        if out is None:
+            out = np.empty((m, n), dtype=np.float64)
+        rows = max(1, self.BLOCK_BYTES // (8 * max(n, 1)))
+        ox, oy = other.x, other.y
+        dy = np.empty((min(rows, m), n), dtype=np.float64)
+        for start in range(0, m, rows):
+            end = min(start + rows, m)
+            block = out[start:end]
+            np.subtract(self.__x[start:end, None], ox, out=block)
+            np.subtract(self.__y[start:end, None], oy, out=dy[:end - start])
+            self.__norm(block, dy[:end - start])
+        return out
+
+
+def benchmark(n=2_000_000, pairwise=2_000, seed=24):
+    """
+    Per-object Point loops vs. PointArray for the same distances.
+    """
+    rng = np.random.default_rng(seed)
+    xs, ys = rng.uniform(-1_000, 1_000, n), rng.uniform(-1_000, 1_000, n)
+
+    tracemalloc.start()
+    points = [Point(x, y) for x, y in zip(xs.tolist(), ys.tolist())]
+    point_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    target = Point(3.0, 4.0)
+
+    start = time.perf_counter()
+    loop_target = [p.euclidean_distance(target) for p in points]
+    loop_origin = [p.distance_from_origin() for p in points]
+    loop_secs = time.perf_counter() - start
+
+    start = time.perf_counter()
+    array = PointArray.from_points(points)
+    convert_secs = time.perf_counter() - start
+
+    start = time.perf_counter()
+    vec_target = array.euclidean_distance(target)
+    vec_origin = array.distance_from_origin()
+    vec_secs = time.perf_counter() - start
+    assert np.allclose(vec_target, loop_target) and np.allclose(vec_origin, loop_origin)
+
+    some = points[:pairwise]
+    start = time.perf_counter()
+    loop_matrix = [[p.euclidean_distance(q) for q in some] for p in some]
+    loop_pair_secs = time.perf_counter() - start
+    start = time.perf_counter()
+    matrix = array[:pairwise].pairwise_distances()
+    vec_pair_secs = time.perf_counter() - start
+    assert np.allclose(matrix, loop_matrix)
+
+    print(f"memory      : {point_bytes / n:,.0f} bytes/point (Point objects) vs. "
+          f"{array.nbytes / n:,.0f} (PointArray)")
+    print(f"from_points : {n / convert_secs:,.0f} points/sec")
+    print(f"distances   : loop {n * 2 / loop_secs:>13,.0f}/sec, "
+          f"vectorized {n * 2 / vec_secs:>13,.0f}/sec ({loop_secs / vec_secs:,.0f}x)")
+    print(f"pairwise    : {pairwise:,} x {pairwise:,} in {loop_pair_secs * 1000:,.0f} ms (loop) vs. "
+          f"{vec_pair_secs * 1000:,.1f} ms ({loop_pair_secs / vec_pair_secs:,.0f}x)")
+
+
+if __name__ == "__main__":
+    points = PointArray.from_points([Point(1, 2), Point(4, 6), Point(0, 3)])
+    print(points)  # [<1.0, 2.0>, <4.0, 6.0>, <0.0, 3.0>]
+    print(points[1])  # <4.0, 6.0> (a Point)
+    print(points.euclidean_distance(Point(1, 2)))  # [0.  5.  1.41421356]
+    print(points.distance_from_origin())  # [2.23606798 7.21110255 3.        ]
+    print(points.pairwise_distances()[0])  # [0.  5.  1.41421356]
+
+    benchmark()
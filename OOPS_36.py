@@ -0,0 +1,218 @@
+# ============================================================================
+# BATCHED POINT-TO-LINE DISTANCES AND TOLERANCE-AWARE ON-LINE TESTS
+# ============================================================================
+"""
+Line (OOPS_12.py) answers one point at a time:
+- shortest_distance() recomputes sqrt(A^2 + B^2) on every call
+- point_on_line() tests A*x + B*y + C == 0 exactly, which almost never holds
+  for computed floating-point coordinates (0.1 + 0.2 != 0.3)
+
+LineSet normalizes every line once, so that a^2 + b^2 = 1:
+
+    a, b, c = A / n, B / n, C / n      with n = sqrt(A^2 + B^2)
+    distance(line, point) = |a*x + b*y + c|
+
+Then the distances from M lines to N points are one matrix product:
+
+    [a b c]   (M x 3)   @   [x0 x1 ...]
+                            [y0 y1 ...]   (3 x N)   =   signed distances (M x N)
+                            [ 1  1 ...]
+
+- on_line() compares distances with a tolerance in distance units (the
+  normalization makes one tolerance mean the same for every line)
+- Work is split into blocks of at most BLOCK_BYTES, so memory stays bounded:
+  blocks() yields the matrix piece by piece, and nearest() (map matching:
+  closest line per point) never builds the M x N matrix at all
+"""
+import random
+import time
+
+import numpy as np
+
+from OOPS_12 import Line, Point
+from OOPS_35 import PointArray
+
+
+class LineSet:
+    """
+    Many lines Ax + By + C = 0 with precomputed normalized coefficients.
+    Logic:
+    - __coef: M x 3 array of (a, b, c), a^2 + b^2 = 1
+    - Points can be a PointArray (OOPS_35.py) or an iterable of Points
+    """
+    BLOCK_BYTES = 1 << 24  # size of one block of the distance matrix
+
+    def __init__(self, A, B, C):
+        coef = np.column_stack([np.asarray(v, dtype=np.float64).ravel() for v in (A, B, C)])
+        norm = np.sqrt(coef[:, 0] ** 2 + coef[:, 1] ** 2)
+        if np.any(norm == 0):
+            raise ValueError("A and B cannot both be 0")
+        self.__original = coef
+        self.__coef = np.ascontiguousarray(coef / norm[:, None])
+
+    @classmethod
+    def from_lines(cls, lines):
+        lines = list(lines)
+        return cls([l.A for l in lines], [l.B for l in lines], [l.C for l in lines])
+
+    def to_lines(self):
+        return [Line(*row) for row in self.__original.tolist()]
+
+    def __len__(self):
+        return len(self.__coef)
+
+    def __getitem__(self, index):
+        if isinstance(index, (int, np.integer)):
+            return Line(*self.__original[index].tolist())
+        rows = self.__original[index]
+        return LineSet(rows[:, 0], rows[:, 1], rows[:, 2])
+
+    @property
+    def coefficients(self):
+        """
+        Normalized (a, b, c) per line (read-only view).
+        """
+        view = self.__coef.view()
+        view.flags.writeable = False
+        return view
+
+    @staticmethod
+    def __homogeneous(points):
+        if not isinstance(points, PointArray):
+            points = PointArray.from_points(points)
+        return np.vstack([points.x, points.y, np.ones(len(points))])
+
+    def __block_shape(self, n):
+        """
+        (lines, points) per block so that one block is about BLOCK_BYTES.
+        Logic: All lines at once if at least 256 points still fit, so that
+        nearest() finishes each point in one block.
+        """
+        cells = max(1, self.BLOCK_BYTES // 8)
+        cols = max(1, min(n, max(cells // max(len(self), 1), 256)))
+        rows = max(1, min(len(self), cells // cols))
+        return rows, cols
+
+    def blocks(self, points, signed=False):
+        """
+        Yields (line slice, point slice, distances) blocks covering the M x N
+        matrix; each block is a new array of at most BLOCK_BYTES.
+        """
+        h = self.__homogeneous(points)
+        rows, cols = self.__block_shape(h.shape[1])
+        for j in range(0, h.shape[1], cols):
+            hp = h[:, j:j + cols]
+            for i in range(0, len(self), rows):
+                block = self.__coef[i:i + rows] @ hp
+                if not signed:
+                    np.abs(block, out=block)
+                yield slice(i, i + rows), slice(j, j + cols), block
+
+    def distances(self, points, signed=False, out=None):
+        """
+        M x N matrix of distances from every line to every point (signed:
+        which side of the line, in the direction of (A, B)).
+        """
+        n = len(points)
+        if out is None:
+            out = np.empty((len(self), n), dtype=np.float64)
+        for lines, cols, block in self.blocks(points, signed):
+            out[lines, cols] = block
+        return out
+
+    def on_line(self, points, tol=1e-9):
+        """
+        M x N booleans: point within tol (distance units) of the line.
+        """
+        n = len(points)
+        out = np.empty((len(self), n), dtype=bool)
+        for lines, cols, block in self.blocks(points):
+            np.less_equal(block, tol, out=out[lines, cols])
+        return out
+
+    def nearest(self, points):
+        """
+        For every point: index of the closest line and its distance.
+        Logic: Running minimum over line blocks; memory is one block.
+        """
+        n = len(points)
+        best = np.full(n, np.inf)
+        index = np.zeros(n, dtype=np.int64)
+        for lines, cols, block in self.blocks(points):
+            rows = block.argmin(axis=0)
+            found = block[rows, np.arange(block.shape[1])]
+            better = found < best[cols]
+            best[cols][better] = found[better]
+            index[cols][better] = rows[better] + lines.start
+        return index, best
+
+
+def benchmark(lines=1_000, points=5_000, matched=1_000_000, roads=2_000, seed=25):
+    """
+    Line.shortest_distance()/point_on_line() loops vs. LineSet, plus a
+    map-matching style nearest() over many points.
+    """
+    rng = random.Random(seed)
+    line_objs = []
+    for _ in range(lines):
+        # Through two random points: coefficients are not "nice" numbers
+        x1, y1, x2, y2 = (rng.uniform(-100, 100) for _ in range(4))
+        line_objs.append(Line(y2 - y1, x1 - x2, x2 * y1 - x1 * y2))
+    point_objs = []
+    for i in range(points):
+        if i % 10 == 0:
+            # On a line, computed in floating point
+            line = line_objs[rng.randrange(lines)]
+            x = rng.uniform(-100, 100)
+            point_objs.append(Point(x, -(line.A * x + line.C) / line.B))
+        else:
+            point_objs.append(Point(rng.uniform(-100, 100), rng.uniform(-100, 100)))
+
+    start = time.perf_counter()
+    loop_dist = [[line.shortest_distance(p) for p in point_objs] for line in line_objs]
+    loop_secs = time.perf_counter() - start
+    exact = sum(line.point_on_line(p) for line in line_objs for p in point_objs[::10])
+
+    line_set = LineSet.from_lines(line_objs)
+    array = PointArray.from_points(point_objs)
+    start = time.perf_counter()
+    matrix = line_set.distances(array)
+    vec_secs = time.perf_counter() - start
+    assert np.allclose(matrix, loop_dist)
+    start = time.perf_counter()
+    on = line_set.on_line(array)
+    on_secs = time.perf_counter() - start
+
+    # Map matching: closest road for each GPS point, in bounded memory
+    nprng = np.random.default_rng(seed)
+    road_set = LineSet(nprng.normal(size=roads), nprng.normal(size=roads),
+                       nprng.uniform(-100, 100, roads))
+    gps = PointArray(nprng.uniform(-100, 100, matched), nprng.uniform(-100, 100, matched))
+    start = time.perf_counter()
+    index, best = road_set.nearest(gps)
+    match_secs = time.perf_counter() - start
+    sample = nprng.integers(matched, size=200)
+    full = road_set.distances(gps[sample])
+    assert np.array_equal(full.argmin(axis=0), index[sample])
+
+    cells = lines * points
+    print(f"distances : {lines:,} lines x {points:,} points, loop {loop_secs:,.2f} s, "
+          f"LineSet {vec_secs * 1000:,.1f} ms ({loop_secs / vec_secs:,.0f}x)")
+    print(f"on line   : {on[:, ::10].sum():,} hits with tol=1e-9 in {on_secs * 1000:,.1f} ms "
+          f"vs. {exact:,} with point_on_line() == 0 ({points // 10:,} points built on a line)")
+    print(f"matching  : {matched:,} points x {roads:,} roads in {match_secs:,.2f} s "
+          f"({matched * roads / match_secs / 1e6:,.0f}M distances/sec, "
+          f"{LineSet.BLOCK_BYTES / 2**20:.0f} MB blocks instead of a "
+          f"{matched * roads * 8 / 2**30:,.1f} GB matrix)")
+    print(f"(loop rate: {cells / loop_secs / 1e6:,.1f}M distances/sec)")
+
+
+if __name__ == "__main__":
+    lines = LineSet.from_lines([Line(1, 1, -3), Line(1, -1, 0)])  # x + y = 3, y = x
+    points = PointArray.from_points([Point(1, 2), Point(1.5, 1.5), Point(0.1 + 0.2, 0.3)])
+    print(lines.distances(points))  # [[0. 0. 1.697...], [0.707... 0. 3.9e-17]]
+    print(lines.on_line(points))  # [[True True False], [False True True]]
+    print(Line(1, -1, 0).point_on_line(points[2]))  # False (0.30000000000000004 != 0.3)
+    print(lines.nearest(points)[0])  # [0 0 1]
+
+    benchmark()